@@ -0,0 +1,147 @@
+"""
+Compares the monthly account report before and after moving the
+aggregation into SQL. One account gets --bookings tagged bookings (100k
+by default) spread over two years, then the old path (every booking
+loaded as an ORM object and grouped in Python) and select_account_report
+are timed, for the full history and for a single month.
+
+Needs a seeded local database (tests/main.py) with at least one user
+account, schedule and person type. Seeded rows are removed at the end.
+
+Usage: python -m benchmarks.account_report [--bookings 100000]
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from dotenv import load_dotenv
+load_dotenv()
+
+import pymysql
+from sqlalchemy import select
+
+from benchmarks.booking_path import (
+    _TAG, _CHUNK, _code, _fetch_fixture, _clean
+)
+from src.crud.engine import engine, host, port, user, password, db
+from src.crud.models import BookingsRecord
+from src.crud.queries.bookings import select_account_report
+from src.crud.queries.utils import scalars_selection
+from src.schema.bookings import Reporting
+from src.utils.money import to_major
+
+_SPREAD_MINUTES = 2 * 365 * 24 * 60
+
+
+def _seed(connection, fixture: dict, amount: int) -> None:
+    query = (
+        "INSERT INTO booking (seat_no, schedule_id, status, account_id, "
+        "amount, person_type_id, serial_no, batch_ref, created, "
+        "assigned_user) "
+        "VALUES (%s, %s, 'ACTIVE', %s, 700, %s, %s, %s, "
+        "NOW() - INTERVAL %s MINUTE, %s)"
+    )
+    step = _SPREAD_MINUTES // amount or 1
+    with connection.cursor() as cursor:
+        for chunk in range(0, amount, _CHUNK):
+            rows = [
+                (
+                    f"{_TAG}{i}", fixture["schedule_id"],
+                    fixture["account_id"], fixture["person_type_id"],
+                    _code(26 ** 6 - 1 - i), f"{_TAG}{i}", i * step,
+                    fixture["user_id"]
+                ) for i in range(chunk, min(chunk + _CHUNK, amount))
+            ]
+            cursor.executemany(query, rows)
+            connection.commit()
+
+
+async def _legacy_report(account_id: int, since=None, until=None):
+    query = select(
+        BookingsRecord
+    ).where(
+        BookingsRecord.account_id == account_id
+    )
+    records = await scalars_selection(query)
+    monthly_data = defaultdict(Reporting)
+
+    for record in records:
+        if since is not None and record.created < since:
+            continue
+        if until is not None and record.created >= until:
+            continue
+        timeframe = record.created.strftime("%m-%Y")
+        report = monthly_data[timeframe]
+        report.amount += to_major(record.amount)
+        report.count += 1
+
+    return monthly_data
+
+
+async def _time(function, samples: int, *args) -> list:
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        await function(*args)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def _summary(name: str, timings: list) -> str:
+    timings = sorted(timings)
+    p95 = timings[max(int(len(timings) * 0.95) - 1, 0)]
+    return (
+        f"{name:<28} mean {statistics.mean(timings):9.2f}ms "
+        f"p50 {statistics.median(timings):9.2f}ms p95 {p95:9.2f}ms"
+    )
+
+
+async def main(bookings: int, samples: int):
+    connection = pymysql.connect(
+        host=host, port=port, user=user, password=password, database=db
+    )
+    fixture = _fetch_fixture(connection)
+    account_id = fixture["account_id"]
+    month_start = (datetime.now() - timedelta(days=180)).replace(
+        day=1, hour=0, minute=0, second=0, microsecond=0
+    )
+    month_end = (month_start + timedelta(days=32)).replace(day=1)
+
+    try:
+        _seed(connection, fixture, bookings)
+
+        legacy = await _legacy_report(account_id)
+        current = await select_account_report(account_id)
+        assert {k: v.count for k, v in legacy.items()} == \
+            {k: v.count for k, v in current.items()}, "reports differ"
+
+        print(f"{bookings} bookings on account {account_id}")
+        legacy_samples = max(samples // 10, 1)
+        for label, args in (
+                ("all months", (account_id,)),
+                ("one month", (account_id, month_start, month_end)),
+        ):
+            print(_summary(
+                f"legacy {label}",
+                await _time(_legacy_report, legacy_samples, *args)
+            ))
+            print(_summary(
+                f"sql {label}",
+                await _time(select_account_report, samples, *args)
+            ))
+    finally:
+        _clean(connection)
+        connection.close()
+        await engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--bookings", type=int, default=100_000)
+    parser.add_argument("--samples", type=int, default=50)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.bookings, args.samples))
@@ -0,0 +1,146 @@
+"""
+Shows that the database side of a user booking stays flat as the booking
+table grows. Bookings are seeded in steps up to --total (1M by default)
+and after each step the reads a single seat booking runs, get_details and
+select_batch, are timed next to the old path that also aggregated every
+booking into batch totals.
+
+Needs a seeded local database (tests/main.py) with at least one user
+account, schedule and person type. Seeded rows are tagged and removed at
+the end.
+
+Usage: python -m benchmarks.booking_path [--total 1000000] [--steps 5]
+"""
+import argparse
+import asyncio
+import statistics
+import string
+import time
+
+from dotenv import load_dotenv
+load_dotenv()
+
+import pymysql
+from sqlalchemy import text
+
+from src.crud.engine import engine, host, port, user, password, db
+from src.crud.queries.bookings import get_details, select_batch
+from src.crud.queries.utils import all_selection
+
+_TAG = "BENCH"
+_CHUNK = 10_000
+# the per request aggregate GET /bookings/batches used to run
+_ALL_BATCHES = text(
+    "SELECT batch_ref, MIN(created), COUNT(*), SUM(amount) "
+    "FROM booking GROUP BY batch_ref"
+)
+
+
+def _code(value: int) -> str:
+    letters = []
+    for _ in range(6):
+        value, digit = divmod(value, 26)
+        letters.append(string.ascii_uppercase[digit])
+    return "".join(reversed(letters))
+
+
+def _fetch_fixture(connection) -> dict:
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT id, entity_id FROM account "
+            "WHERE entity_type = 'USER' LIMIT 1"
+        )
+        account_id, user_id = cursor.fetchone()
+        cursor.execute("SELECT schedule_id FROM schedule LIMIT 1")
+        schedule_id, = cursor.fetchone()
+        cursor.execute("SELECT person_type_id FROM person_type LIMIT 1")
+        person_type_id, = cursor.fetchone()
+
+    return {
+        "account_id": account_id, "user_id": user_id,
+        "schedule_id": schedule_id, "person_type_id": person_type_id,
+    }
+
+
+def _seed(connection, fixture: dict, start: int, end: int) -> None:
+    query = (
+        "INSERT INTO booking (seat_no, schedule_id, status, account_id, "
+        "amount, person_type_id, serial_no, batch_ref, created, "
+        "assigned_user) "
+        "VALUES (%s, %s, 'ACTIVE', %s, 1, %s, %s, %s, NOW(), %s)"
+    )
+    with connection.cursor() as cursor:
+        for chunk in range(start, end, _CHUNK):
+            rows = [
+                (
+                    f"{_TAG}{i}", fixture["schedule_id"],
+                    fixture["account_id"], fixture["person_type_id"],
+                    # top of the code space, away from issued serials
+                    _code(26 ** 6 - 1 - i), f"{_TAG}{i}",
+                    fixture["user_id"]
+                ) for i in range(chunk, min(chunk + _CHUNK, end))
+            ]
+            cursor.executemany(query, rows)
+            connection.commit()
+
+
+def _clean(connection) -> None:
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "DELETE FROM booking WHERE batch_ref LIKE %s", (f"{_TAG}%",)
+        )
+    connection.commit()
+
+
+async def _time(function, samples: int) -> float:
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        await function()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+async def _measure(fixture: dict, samples: int) -> tuple[float, float]:
+    async def booking_reads():
+        await get_details(fixture["user_id"], "USER", fixture["schedule_id"])
+        await select_batch(f"{_TAG}0")
+
+    async def legacy_reads():
+        await booking_reads()
+        await all_selection(_ALL_BATCHES)
+
+    return await _time(booking_reads, samples), \
+        await _time(legacy_reads, max(samples // 10, 1))
+
+
+async def main(total: int, steps: int, samples: int):
+    connection = pymysql.connect(
+        host=host, port=port, user=user, password=password, database=db
+    )
+    fixture = _fetch_fixture(connection)
+
+    print(f"{'bookings':>10} {'current p50':>14} {'legacy p50':>14}")
+    seeded = 0
+    try:
+        for step in range(steps + 1):
+            target = total * step // steps
+            _seed(connection, fixture, seeded, target)
+            seeded = target
+
+            current, legacy = await _measure(fixture, samples)
+            print(f"{seeded:>10} {current:>12.2f}ms {legacy:>12.2f}ms")
+    finally:
+        _clean(connection)
+        connection.close()
+        await engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--total", type=int, default=1_000_000)
+    parser.add_argument("--steps", type=int, default=5)
+    parser.add_argument("--samples", type=int, default=50)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.total, args.steps, args.samples))
@@ -0,0 +1,76 @@
+"""
+Compares the database side of /token before and after the single query
+login path. Password verification is identical on both paths and left
+out so the numbers only reflect round trips and object building.
+
+Usage: python -m benchmarks.login --username <email> [--iterations 500]
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from src.crud.engine import engine
+from src.crud.queries.clubs import is_club_rep
+from src.crud.queries.user import select_user_by_email, select_login
+from src.schema.factories.user_factory import UserFactory
+
+
+async def _legacy_login(username: str):
+    user_data = await select_user_by_email(username)
+    user = UserFactory.create_full_user(user_data)
+    _is_club_rep = await is_club_rep(username)
+    return user.permissions, [x.name for x in user.roles], _is_club_rep
+
+
+async def _lean_login(username: str):
+    login = await select_login(username)
+    return login["permissions"], list(login["roles"].values()), \
+        login["is_club_rep"]
+
+
+async def _measure(function, username: str, iterations: int) -> list:
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        await function(username)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def _report(name: str, timings: list) -> None:
+    timings = sorted(timings)
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    print(
+        f"{name:<8} mean {statistics.mean(timings):7.3f}ms  "
+        f"p50 {statistics.median(timings):7.3f}ms  p95 {p95:7.3f}ms"
+    )
+
+
+async def main(username: str, iterations: int):
+    legacy = await _legacy_login(username)
+    lean = await _lean_login(username)
+    assert set(legacy[0]) == lean[0], "permissions differ"
+    assert sorted(legacy[1]) == sorted(lean[1]), "roles differ"
+    assert legacy[2] == lean[2], "club leader status differs"
+
+    # warm the pool so connection setup is not measured
+    await _measure(_legacy_login, username, 10)
+    await _measure(_lean_login, username, 10)
+
+    _report("legacy", await _measure(_legacy_login, username, iterations))
+    _report("lean", await _measure(_lean_login, username, iterations))
+
+    await engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--username", required=True)
+    parser.add_argument("--iterations", type=int, default=500)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.username, args.iterations))
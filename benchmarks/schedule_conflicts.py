@@ -0,0 +1,141 @@
+"""
+Compares the schedule conflict check before and after the per hall range
+query. --schedules shows (100k by default) are seeded back to back over
+every hall, starting in 2100 so they stay clear of real ones. Then the old
+check (every schedule with its film and hall, converted and scanned) and
+select_conflicting_schedules are timed for show times inside the seeded
+range.
+
+Needs a seeded local database (tests/main.py) with at least one film and
+hall. Seeded schedules are removed at the end.
+
+Usage: python -m benchmarks.schedule_conflicts [--schedules 100000]
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from dotenv import load_dotenv
+load_dotenv()
+
+import pymysql
+
+from src.crud.engine import engine, host, port, user, password, db
+from src.crud.queries.films import (
+    select_all_schedules, select_conflicting_schedules, CLEANING_GAP
+)
+from src.schema.factories.film_factories import FilmFactory
+
+_EPOCH = datetime(2100, 1, 1)
+_CHUNK = 10_000
+
+
+def _fetch_fixture(connection) -> dict:
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT film_id, duration_sec FROM film LIMIT 1")
+        film_id, duration = cursor.fetchone()
+        cursor.execute("SELECT hall_id FROM hall")
+        halls = [x[0] for x in cursor.fetchall()]
+
+    return {"film_id": film_id, "duration": duration, "halls": halls}
+
+
+def _seed(connection, fixture: dict, amount: int) -> timedelta:
+    """Back to back shows per hall, returns the time one show takes"""
+    slot = timedelta(seconds=fixture["duration"]) + CLEANING_GAP \
+        + timedelta(minutes=1)
+    halls = fixture["halls"]
+    query = (
+        "INSERT INTO schedule (hall_id, film_id, show_time, on_schedule, "
+        "ticket_price) VALUES (%s, %s, %s, 1, 700)"
+    )
+    with connection.cursor() as cursor:
+        for chunk in range(0, amount, _CHUNK):
+            rows = [
+                (
+                    halls[i % len(halls)], fixture["film_id"],
+                    _EPOCH + slot * (i // len(halls))
+                ) for i in range(chunk, min(chunk + _CHUNK, amount))
+            ]
+            cursor.executemany(query, rows)
+            connection.commit()
+    return slot
+
+
+def _clean(connection) -> None:
+    with connection.cursor() as cursor:
+        cursor.execute("DELETE FROM schedule WHERE show_time >= %s", (_EPOCH,))
+    connection.commit()
+
+
+async def _legacy_check(hall_id: int, start: datetime, end: datetime):
+    records = await select_all_schedules()
+    schedules = FilmFactory.get_detailed_schedules(records)
+    for schedule in schedules:
+        that_start = schedule.show_time.replace(tzinfo=None)
+        that_end = that_start + timedelta(
+            seconds=schedule.film.duration_sec
+        ) + CLEANING_GAP
+        if that_start <= start <= that_end or that_start <= end <= that_end:
+            return schedule.id
+
+
+async def _time(function, samples: list) -> list:
+    timings = []
+    for args in samples:
+        start = time.perf_counter()
+        await function(*args)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def _summary(name: str, timings: list) -> str:
+    timings = sorted(timings)
+    p95 = timings[max(int(len(timings) * 0.95) - 1, 0)]
+    return (
+        f"{name:<10} mean {statistics.mean(timings):9.2f}ms "
+        f"p50 {statistics.median(timings):9.2f}ms p95 {p95:9.2f}ms"
+    )
+
+
+async def main(schedules: int, samples: int):
+    connection = pymysql.connect(
+        host=host, port=port, user=user, password=password, database=db
+    )
+    fixture = _fetch_fixture(connection)
+    duration = timedelta(seconds=fixture["duration"]) + CLEANING_GAP
+
+    try:
+        slot = _seed(connection, fixture, schedules)
+        span = slot * (schedules // len(fixture["halls"]))
+
+        checks = []
+        for _ in range(samples):
+            start = _EPOCH + span * random.random()
+            checks.append(
+                (random.choice(fixture["halls"]), start, start + duration)
+            )
+
+        print(f"{schedules} schedules over {len(fixture['halls'])} halls")
+        print(_summary(
+            "legacy", await _time(_legacy_check, checks[:max(samples // 10, 1)])
+        ))
+        print(_summary(
+            "range", await _time(select_conflicting_schedules, checks)
+        ))
+    finally:
+        _clean(connection)
+        connection.close()
+        await engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--schedules", type=int, default=100_000)
+    parser.add_argument("--samples", type=int, default=200)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.schedules, args.samples))
@@ -0,0 +1,92 @@
+"""
+Per call cost of the booking statements before and after building them
+once with bound parameters. No database is needed, statements are
+compiled against the MySQL dialect the engine uses.
+
+Usage: python -m benchmarks.statements [--iterations 5000]
+"""
+import argparse
+import time
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from sqlalchemy import select, and_, asc
+from sqlalchemy.dialects.mysql.aiomysql import dialect as aiomysql_dialect
+
+from src.crud.models import (
+    BookingsRecord, SchedulesRecord, FilmsRecord, HallsRecord,
+    AccountsRecord, PersonTypesRecord
+)
+from src.crud.queries.bookings import _SELECT_USER_BOOKINGS
+
+DIALECT = aiomysql_dialect()
+
+
+def _legacy_user_bookings(start: int, limit: int, user_id: int):
+    """The builder select_user_bookings ran on every call"""
+    return select(
+        BookingsRecord, SchedulesRecord, FilmsRecord, HallsRecord,
+        AccountsRecord, PersonTypesRecord
+    ).join(
+        SchedulesRecord,
+        SchedulesRecord.schedule_id == BookingsRecord.schedule_id
+    ).join(
+        FilmsRecord, SchedulesRecord.film_id == FilmsRecord.film_id
+    ).join(
+        HallsRecord, HallsRecord.hall_id == SchedulesRecord.hall_id
+    ).join(
+        AccountsRecord, AccountsRecord.id == BookingsRecord.account_id
+    ).join(
+        PersonTypesRecord,
+        PersonTypesRecord.person_type_id == BookingsRecord.person_type_id
+    ).where(
+        and_(
+            BookingsRecord.id >= start,
+            AccountsRecord.entity_id == user_id,
+            AccountsRecord.entity_type == "USER"
+        )
+    ).limit(limit).order_by(asc(BookingsRecord.id))
+
+
+def _time(name: str, function, iterations: int) -> None:
+    start = time.perf_counter()
+    for i in range(iterations):
+        function(i)
+    elapsed = (time.perf_counter() - start) / iterations
+    print(f"{name:<40} {elapsed * 1_000_000:9.1f}us/call")
+
+
+def main(iterations: int):
+    # what the engine pays per execution when its compiled cache hits:
+    # building the statement plus generating its cache key
+    _time(
+        "legacy build + cache key",
+        lambda i: _legacy_user_bookings(i, 10, i)._generate_cache_key(),
+        iterations
+    )
+    _time(
+        "cached statement cache key",
+        lambda i: _SELECT_USER_BOOKINGS._generate_cache_key(),
+        iterations
+    )
+
+    # what a cache miss costs, paid once per process for the cached form
+    _time(
+        "legacy build + compile",
+        lambda i: _legacy_user_bookings(i, 10, i).compile(dialect=DIALECT),
+        iterations // 10
+    )
+    _time(
+        "cached statement compile",
+        lambda i: _SELECT_USER_BOOKINGS.compile(dialect=DIALECT),
+        iterations // 10
+    )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=5000)
+    args = parser.parse_args()
+
+    main(args.iterations)
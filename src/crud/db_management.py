@@ -3,16 +3,14 @@ import os
 
 from sqlalchemy import text
 
-from src.crud.engine import engine, Base, async_session
+from src.crud.engine import engine, Base, async_session, replica_engine
 from src.crud.models import (
     PermissionsRecord, RolesRecord, RolePermissionsRecord,
     UsersRecord, UserRolesRecord, AccountsRecord, PersonTypesRecord
 )
 from src.crud.queries.utils import add_object, add_objects
-from src.crud.queries.stored_procedures import (
-    generate_unique_string, generate_filename
-)
-from src.security.security import get_password_hash
+from src.crud.queries.stored_procedures import generate_filename
+from src.security.security import get_password_hash_async
 
 
 async def get_permissions():
@@ -55,6 +53,7 @@ async def get_permissions():
     read_accounts = PermissionsRecord(permission="read:accounts")
     write_accounts = PermissionsRecord(permission="write:accounts")
     read_reports = PermissionsRecord(permission="read:reports")
+    read_metrics = PermissionsRecord(permission="read:metrics")
 
     return [
         write_user, read_user, write_bookings, read_bookings,
@@ -64,7 +63,7 @@ async def get_permissions():
         write_schedules, read_films, write_films, read_images,
         write_images, read_role_perms, write_role_perms,
         read_person_type, write_person_type, read_accounts,
-        write_accounts, read_reports
+        write_accounts, read_reports, read_metrics
     ]
 
 
@@ -79,7 +78,6 @@ def admin_perms(count: int):
 async def initialise_db():
     async with async_session() as session:
         async with session.begin():
-            await session.execute(text(generate_unique_string()))
             await session.execute(text(generate_filename()))
 
     async with engine.begin() as connection:
@@ -94,7 +92,7 @@ async def initialise_db():
     _admin2_username = os.getenv("ADMIN2_EMAIL")
     _admin3_username = os.getenv("ADMIN3_EMAIL")
     _admin1_password = os.getenv("ADMIN1_PASSWORD")
-    hashed_pass = get_password_hash(_admin1_password)
+    hashed_pass = await get_password_hash_async(_admin1_password)
 
     objs2: list = admin_perms(len(objs))
     user1 = UsersRecord(
@@ -167,3 +165,5 @@ async def initialise_db():
 
 async def close_db():
     await engine.dispose()
+    if replica_engine is not None:
+        await replica_engine.dispose()
@@ -2,16 +2,61 @@ from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from os import getenv
 
+from src.crud.pool import TimedQueuePool
+
 db = getenv("DATABASE")
 host = getenv("DATABASE_HOST")
 port = int(getenv("DATABASE_PORT"))
 user = getenv("DATABASE_USERNAME")
 password = getenv("DATABASE_PASSWORD")
 url = f"mysql+aiomysql://{user}:{password}@{host}:{port}/{db}"
-engine = create_async_engine(url,)
+
+POOL_SIZE = int(getenv("DB_POOL_SIZE", 10))
+POOL_MAX_OVERFLOW = int(getenv("DB_POOL_MAX_OVERFLOW", 10))
+POOL_TIMEOUT = float(getenv("DB_POOL_TIMEOUT_SECONDS", 30))
+# below MySQL's wait_timeout so the server never drops a pooled connection
+POOL_RECYCLE = int(getenv("DB_POOL_RECYCLE_SECONDS", 1800))
+POOL_PRE_PING = bool(int(getenv("DB_POOL_PRE_PING", 1)))
+POOL_WARM_UP = min(int(getenv("DB_POOL_WARM_UP", POOL_SIZE)), POOL_SIZE)
+
+
+def _create_engine(_url: str):
+    return create_async_engine(
+        _url,
+        poolclass=TimedQueuePool,
+        pool_size=POOL_SIZE,
+        max_overflow=POOL_MAX_OVERFLOW,
+        pool_timeout=POOL_TIMEOUT,
+        pool_recycle=POOL_RECYCLE,
+        pool_pre_ping=POOL_PRE_PING,
+    )
+
+
+engine = _create_engine(url)
 async_session = async_sessionmaker(
     bind=engine,
     expire_on_commit=False,
     autoflush=False
 )
+
+# optional read replica, reads fall back to the primary when unset
+replica_host = getenv("REPLICA_DATABASE_HOST")
+if replica_host:
+    replica_port = int(getenv("REPLICA_DATABASE_PORT") or port)
+    replica_user = getenv("REPLICA_DATABASE_USERNAME") or user
+    replica_password = getenv("REPLICA_DATABASE_PASSWORD") or password
+    replica_url = (
+        f"mysql+aiomysql://{replica_user}:{replica_password}"
+        f"@{replica_host}:{replica_port}/{db}"
+    )
+    replica_engine = _create_engine(replica_url)
+    replica_session = async_sessionmaker(
+        bind=replica_engine,
+        expire_on_commit=False,
+        autoflush=False
+    )
+else:
+    replica_engine = None
+    replica_session = async_session
+
 Base = declarative_base()
@@ -1,8 +1,8 @@
 from sqlalchemy import (
-    Column, String, DateTime, Float, ForeignKey,
-    UniqueConstraint, Enum, Text, text, func, CheckConstraint
+    Column, String, DateTime, Date, ForeignKey,
+    UniqueConstraint, Enum, Text, text, func, CheckConstraint, Index
 )
-from sqlalchemy.dialects.mysql.types import BIT, INTEGER
+from sqlalchemy.dialects.mysql.types import BIT, INTEGER, BIGINT
 from src.crud.engine import Base
 
 _COLLATION = "utf8mb4_general_ci"
@@ -169,7 +169,7 @@ class UsersRecord(Base):
         nullable=False, unique=True
     )
     password = Column(
-        String(60, collation=_COLLATION),
+        String(255, collation=_COLLATION),
         nullable=False,
         default="$2b$12$9/pllRXci8nUSKQGZXyrxeSLZUK9CD8whlRURn0ZXsh0m2uA8LzVG"
     )
@@ -177,6 +177,10 @@ class UsersRecord(Base):
         Enum("ENABLED", "DISABLED", name="status", collation=_COLLATION),
         nullable=False, default="ENABLED"
     )
+    auth_version = Column(
+        INTEGER(unsigned=True),
+        nullable=False, default=0, server_default=text("0")
+    )
     # user_roles: Mapped[List["UserRolesRecord"]] = relationship(
     #     "UserRolesRecord", back_populates="user_permissions"
     # )
@@ -221,6 +225,9 @@ class CardsRecord(Base):
     #         name='_account-card'
     #     ),
     # )
+    __table_args__ = (
+        Index("ix_card_account", "account_id"),
+    )
 
 
 class ClubsRecord(Base):
@@ -314,8 +321,9 @@ class AccountsRecord(Base):
         ),
         nullable=False,
     )
+    # minor units, see src.utils.money
     balance = Column(
-        Float, default=0, nullable=False,
+        BIGINT, default=0, nullable=False,
     )
 
     __table_args__ = (
@@ -323,7 +331,7 @@ class AccountsRecord(Base):
             'entity_type', 'entity_id',
             name='_entity-name'
         ),
-        CheckConstraint('balance >= -100', name='balance_constraint')
+        CheckConstraint('balance >= -10000', name='balance_constraint')
     )
 
 
@@ -402,6 +410,10 @@ class FilmsRecord(Base):
     is_active = Column(
         BIT(1), nullable=False, default=b'0'
     )
+    __table_args__ = (
+        # MAX(duration_sec) bounds the schedule conflict window
+        Index("ix_film_duration", "duration_sec"),
+    )
 
 
 class FilmImagesRecord(Base):
@@ -426,6 +438,9 @@ class FilmImagesRecord(Base):
         INTEGER,
         nullable=False
     )
+    __table_args__ = (
+        Index("ix_film_image_film_batch", "film_id", "batch"),
+    )
 
 
 class SchedulesRecord(Base):
@@ -454,7 +469,7 @@ class SchedulesRecord(Base):
         BIT(1), nullable=False
     )
     ticket_price = Column(
-        Float(),
+        INTEGER(unsigned=True),
         nullable=False,
     )
     __table_args__ = (
@@ -462,6 +477,7 @@ class SchedulesRecord(Base):
             "show_time", "hall_id", "film_id",
             name='_schedule_details'
         ),
+        Index("ix_schedule_hall_show_time", "hall_id", "show_time"),
     )
 
 
@@ -493,7 +509,7 @@ class BookingsRecord(Base):
         nullable=True,
     )
     amount = Column(
-        Float(),
+        INTEGER(unsigned=True),
         nullable=False,
     )
     person_type_id = Column(
@@ -503,7 +519,7 @@ class BookingsRecord(Base):
     )
     serial_no = Column(
         String(6, collation=_COLLATION),
-        nullable=False, unique=True, default=text("generate_unique_string()")
+        nullable=False, unique=True
     )
     batch_ref = Column(
         String(50, collation=_COLLATION),
@@ -522,10 +538,91 @@ class BookingsRecord(Base):
             "seat_no", "schedule_id",
             name='_schedule_details'
         ),
+        Index("ix_booking_batch_ref", "batch_ref"),
+        Index("ix_booking_assigned_user", "assigned_user"),
+        Index("ix_booking_account_created", "account_id", "created"),
+        Index("ix_booking_created", "created"),
+        Index("ix_booking_schedule", "schedule_id"),
+    )
+
+
+class BookingBatchesRecord(Base):
+    """Per batch totals of active bookings, kept in step with booking writes"""
+    __tablename__ = "booking_batch"
+    id = Column(
+        INTEGER(unsigned=True),
+        primary_key=True,
+        autoincrement=True,
+        nullable=False,
+        unique=True,
+    )
+    batch_ref = Column(
+        String(50, collation=_COLLATION),
+        nullable=False, unique=True
+    )
+    created = Column(
+        DateTime(), default=func.now(), nullable=False
+    )
+    occurrences = Column(
+        INTEGER(unsigned=True),
+        nullable=False, default=0
+    )
+    total_amount = Column(
+        BIGINT,
+        nullable=False, default=0
+    )
+
+
+class SalesRollupsRecord(Base):
+    """
+    Active tickets and revenue per sale day, film, hall and person type,
+    kept in step with booking writes
+    """
+    __tablename__ = "sales_rollup"
+    id = Column(
+        INTEGER(unsigned=True),
+        primary_key=True,
+        autoincrement=True,
+        nullable=False,
+        unique=True,
+    )
+    day = Column(
+        Date(), nullable=False
+    )
+    film_id = Column(
+        INTEGER(unsigned=True),
+        ForeignKey("film.film_id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    hall_id = Column(
+        INTEGER(unsigned=True),
+        ForeignKey("hall.hall_id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    person_type_id = Column(
+        INTEGER(unsigned=True),
+        ForeignKey("person_type.person_type_id"),
+        nullable=False,
+    )
+    tickets = Column(
+        INTEGER(unsigned=True),
+        nullable=False, default=0
+    )
+    revenue = Column(
+        BIGINT,
+        nullable=False, default=0
+    )
+    __table_args__ = (
+        UniqueConstraint(
+            "day", "film_id", "hall_id", "person_type_id",
+            name="_sales_rollup_key"
+        ),
+        Index("ix_sales_rollup_film_day", "film_id", "day"),
     )
 
 
 class TransactionsRecord(Base):
+    """Append only ledger, credits are positive and debits negative"""
     __tablename__ = "transaction"
     id = Column(
         INTEGER(unsigned=True),
@@ -535,12 +632,12 @@ class TransactionsRecord(Base):
         unique=True,
     )
     amount = Column(
-        Float(),
+        BIGINT,
         nullable=False,
     )
     transaction_type = Column(
         Enum(
-            "BOOKING", "TOP-UP", name="status",
+            "BOOKING", "TOP-UP", "REFUND", "OPENING", name="status",
             collation=_COLLATION
         ),
         nullable=False,
@@ -553,7 +650,48 @@ class TransactionsRecord(Base):
     batch_ref = Column(
         String(50, collation=_COLLATION),
         nullable=False,
-        unique=True
+    )
+    created = Column(
+        DateTime(), default=func.now(), nullable=False
+    )
+    __table_args__ = (
+        Index("ix_transaction_account_id", "account_id", "id"),
+        Index("ix_transaction_batch_ref", "batch_ref"),
+    )
+
+
+class BalanceSnapshotsRecord(Base):
+    """Account balance as of a ledger entry, statements start from one"""
+    __tablename__ = "balance_snapshot"
+    id = Column(
+        INTEGER(unsigned=True),
+        primary_key=True,
+        autoincrement=True,
+        nullable=False,
+        unique=True,
+    )
+    account_id = Column(
+        INTEGER(unsigned=True),
+        ForeignKey("account.id"),
+        nullable=False,
+    )
+    transaction_id = Column(
+        INTEGER(unsigned=True),
+        ForeignKey("transaction.id"),
+        nullable=False,
+    )
+    balance = Column(
+        BIGINT,
+        nullable=False,
+    )
+    created = Column(
+        DateTime(), default=func.now(), nullable=False
+    )
+    __table_args__ = (
+        UniqueConstraint(
+            "account_id", "transaction_id",
+            name="_account_transaction"
+        ),
     )
 
 
@@ -588,3 +726,23 @@ class SeatLocksRecord(Base):
         INTEGER(unsigned=True), ForeignKey("user.user_id"),
         nullable=False,
     )
+    __table_args__ = (
+        Index(
+            "ix_seat_lock_schedule_seat_created",
+            "schedule_id", "seat", "created_at"
+        ),
+    )
+
+
+class SerialSequencesRecord(Base):
+    """Monotonic counters that application side serials are drawn from"""
+    __tablename__ = "serial_sequence"
+    name = Column(
+        String(50, collation=_COLLATION),
+        primary_key=True,
+        nullable=False,
+    )
+    next_value = Column(
+        BIGINT(unsigned=True),
+        nullable=False, default=0
+    )
@@ -1,53 +1,53 @@
 from collections import defaultdict
 
-from sqlalchemy import select, and_, ScalarResult, asc, delete
+from sqlalchemy import select, and_, ScalarResult, asc, delete, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.crud.engine import async_session
+from src.crud.session import read_scope, session_scope, pin_primary
 from src.crud.models import AccountsRecord, CardsRecord, UsersRecord, ClubsRecord
+from src.crud.queries.ledger import record_transaction
 from src.crud.queries.utils import scalar_selection, execute_safely, scalars_selection
 
 
-async def select_account(query):
-    async with async_session() as session:
-        async with session.begin():
-            result = await session.execute(query)
-            return result.scalar()
-
-            # if len(rows) == 0:
-            #     return None
-            #
-            # account = rows[0][0]
-            #
-            # if rows[0][1]:
-            #     cards = {x[1].card_id: x[1] for x in rows}
-            # else:
-            #     cards = {}
-            #
-            # return {
-            #     "account": account,
-            #     "cards": cards
-            # }
-
-
-async def select_accounts(query):
+async def select_account(query, session: AsyncSession | None = None):
+    async with read_scope(session) as session:
+        result = await session.execute(query)
+        return result.scalar()
+
+        # if len(rows) == 0:
+        #     return None
+        #
+        # account = rows[0][0]
+        #
+        # if rows[0][1]:
+        #     cards = {x[1].card_id: x[1] for x in rows}
+        # else:
+        #     cards = {}
+        #
+        # return {
+        #     "account": account,
+        #     "cards": cards
+        # }
+
+
+async def select_accounts(query, session: AsyncSession | None = None):
     accounts = {
 
     }
     cards = defaultdict(list)
-    async with async_session() as session:
-        async with session.begin():
-            result = await session.execute(query)
-            rows = result.all()
+    async with read_scope(session) as session:
+        result = await session.execute(query)
+        rows = result.all()
 
-            if len(rows) == 0:
-                return None
+        if len(rows) == 0:
+            return None
 
-            for row in rows:
-                account = row[0]
-                card = row[1]
+        for row in rows:
+            account = row[0]
+            card = row[1]
 
-                accounts[account.id] = {"account": account, "cards": []}
-                cards[card.entity_id].append(card)
+            accounts[account.id] = {"account": account, "cards": []}
+            cards[card.entity_id].append(card)
 
     for entity_id, cards in cards.items():
         accounts[entity_id]["cards"] = cards
@@ -55,21 +55,22 @@ async def select_accounts(query):
     return accounts
 
 
-async def select_card(card: int):
+async def select_card(card: int, session: AsyncSession | None = None):
     query = select(
         CardsRecord
     ).where(
         CardsRecord.card_id == card
     )
-    async with async_session() as session:
-        async with session.begin():
-            result = await session.execute(query)
-            rows = result.scalar()
+    async with read_scope(session) as session:
+        result = await session.execute(query)
+        rows = result.scalar()
 
-            return rows
+        return rows
 
 
-async def check_user_card(user_id, card_id):
+async def check_user_card(
+        user_id, card_id, session: AsyncSession | None = None
+):
     check_query = select(
         UsersRecord
     ).join(
@@ -83,13 +84,14 @@ async def check_user_card(user_id, card_id):
     ).where(
         UsersRecord.user_id == user_id
     )
-    async with async_session() as session:
-        async with session.begin():
-            result = await session.execute(check_query)
-            return result.scalar()
+    async with read_scope(session) as session:
+        result = await session.execute(check_query)
+        return result.scalar()
 
 
-async def check_club_card(user_id, card_id):
+async def check_club_card(
+        user_id, card_id, session: AsyncSession | None = None
+):
 
     check_query = select(
         ClubsRecord
@@ -107,39 +109,41 @@ async def check_club_card(user_id, card_id):
         UsersRecord.user_id == user_id
     )
 
-    async with async_session() as session:
-        async with session.begin():
-            result = await session.execute(check_query)
-            return result.scalar()
+    async with read_scope(session) as session:
+        result = await session.execute(check_query)
+        return result.scalar()
 
 
-async def select_half_account(account_id):
+async def select_half_account(account_id, session: AsyncSession | None = None):
     query = select(
         AccountsRecord
     ).where(
         AccountsRecord.id == account_id
     )
 
-    async with async_session() as session:
-        async with session.begin():
-            result = await session.execute(query)
-            return result.scalar()
+    async with read_scope(session) as session:
+        result = await session.execute(query)
+        return result.scalar()
 
 
-async def select_half_accounts(start, limit):
+async def select_half_accounts(
+        start, limit, session: AsyncSession | None = None
+):
     query = select(
         AccountsRecord
     ).where(
         AccountsRecord.id >= start
     ).limit(limit).order_by(asc(AccountsRecord.id))
 
-    async with async_session() as session:
-        async with session.begin():
-            result = await session.execute(query)
-            return result.scalars().all()
+    async with read_scope(session) as session:
+        result = await session.execute(query)
+        return result.scalars().all()
 
 
-async def select_last_entered_account(account_name: str, entity_id: int, entity_type: str):
+async def select_last_entered_account(
+        account_name: str, entity_id: int, entity_type: str,
+        session: AsyncSession | None = None
+):
     query = select(
         AccountsRecord
     ).where(
@@ -150,30 +154,29 @@ async def select_last_entered_account(account_name: str, entity_id: int, entity_
         )
     )
 
-    async with async_session() as session:
-        async with session.begin():
-            result = await session.execute(query)
-            return result.scalar()
+    async with read_scope(session) as session:
+        result = await session.execute(query)
+        return result.scalar()
 
 
-async def select_full_account(query):
+async def select_full_account(query, session: AsyncSession | None = None):
     _data = {}
-    async with async_session() as session:
-        async with session.begin():
-            result = await session.execute(query)
+    async with read_scope(session) as session:
+        result = await session.execute(query)
 
-            rows = result.all()
+        rows = result.all()
 
-            _data["account"] = rows[0][0]
-            _data["cards"] = [
-                row[1] for row in rows if row[1]
-            ]
+        _data["account"] = rows[0][0]
+        _data["cards"] = [
+            row[1] for row in rows if row[1]
+        ]
 
     return _data
 
 
 async def select_club_accounts(
-        club_id: int, start: int, limit: int
+        club_id: int, start: int, limit: int,
+        session: AsyncSession | None = None
 ) -> ScalarResult[AccountsRecord]:
 
     query = select(
@@ -186,13 +189,14 @@ async def select_club_accounts(
         )
     ).limit(limit).order_by(asc(AccountsRecord.id))
 
-    async with async_session() as session:
-        async with session.begin():
-            result = await session.execute(query)
-            return result.scalars()
+    async with read_scope(session) as session:
+        result = await session.execute(query)
+        return result.scalars()
 
 
-async def select_account_from_card_id(card_id: int) -> AccountsRecord:
+async def select_account_from_card_id(
+        card_id: int, session: AsyncSession | None = None
+) -> AccountsRecord:
     query = select(
         AccountsRecord
     ).join(
@@ -200,19 +204,89 @@ async def select_account_from_card_id(card_id: int) -> AccountsRecord:
     ).where(
         CardsRecord.card_id == card_id
     )
-    return await scalar_selection(query)
+    return await scalar_selection(query, session=session)
 
 
-async def delete_card_query(card_id: int) -> None:
+async def delete_card_query(
+        card_id: int, session: AsyncSession | None = None
+) -> None:
     query = delete(
         CardsRecord
     ).where(
         CardsRecord.card_id == card_id
     )
-    await execute_safely(query)
+    await execute_safely(query, session=session)
+
+
+async def debit_account(
+        account_id: int, amount: int, batch_ref: str,
+        session: AsyncSession | None = None
+) -> bool:
+    """
+    Take money from an account in one conditional statement, concurrent
+    debits can not overdraw it since the balance check happens in the row
+    update itself. The debit is written to the ledger as a BOOKING.
+    :param account_id: account to debit
+    :param amount: amount in minor units
+    :param batch_ref: booking batch paid for
+    :param session: session of the surrounding unit of work, if any
+    :return: False if the account is missing or the balance is too low
+    """
+    query = update(
+        AccountsRecord
+    ).values(
+        balance=AccountsRecord.balance - amount
+    ).where(
+        and_(
+            AccountsRecord.id == account_id,
+            AccountsRecord.balance >= amount
+        )
+    )
+
+    pin_primary()
+    async with session_scope(session) as session:
+        result = await session.execute(query)
+        if result.rowcount != 1:
+            return False
+
+        await record_transaction(
+            account_id, -amount, "BOOKING", batch_ref, session=session
+        )
+    return True
+
+
+async def credit_account(
+        account_id: int, amount: int, transaction_type: str, batch_ref: str,
+        session: AsyncSession | None = None
+) -> bool:
+    """
+    Add money to an account and record it in the ledger
+    :param amount: amount in minor units
+    :param transaction_type: TOP-UP or REFUND
+    :param batch_ref: top-up reference or refunded booking batch
+    :return: False if the account does not exist
+    """
+    query = update(
+        AccountsRecord
+    ).values(
+        balance=AccountsRecord.balance + amount
+    ).where(
+        AccountsRecord.id == account_id
+    )
+
+    pin_primary()
+    async with session_scope(session) as session:
+        result = await session.execute(query)
+        if result.rowcount != 1:
+            return False
+
+        await record_transaction(
+            account_id, amount, transaction_type, batch_ref, session=session
+        )
+    return True
 
 
-async def select_club_cards(club_id):
+async def select_club_cards(club_id, session: AsyncSession | None = None):
     query = select(
         CardsRecord
     ).join(
@@ -224,10 +298,10 @@ async def select_club_cards(club_id):
             AccountsRecord.entity_type == "CLUB"
         )
     )
-    return await scalars_selection(query)
+    return await scalars_selection(query, session=session)
 
 
-async def select_user_cards(user_id):
+async def select_user_cards(user_id, session: AsyncSession | None = None):
     query = select(
         CardsRecord
     ).join(
@@ -239,4 +313,4 @@ async def select_user_cards(user_id):
             AccountsRecord.entity_type == "USER"
         )
     )
-    return await scalars_selection(query)
+    return await scalars_selection(query, session=session)
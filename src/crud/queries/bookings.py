@@ -1,266 +1,423 @@
 from collections import defaultdict
-from typing import Dict
-from sqlalchemy import select, and_, text, asc
-from src.crud.engine import async_session
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+from sqlalchemy import (
+    select, and_, text, asc, bindparam, func, delete, insert
+)
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.crud.session import read_scope
 from src.crud.models import (
     PersonTypesRecord, BookingsRecord, SchedulesRecord, HallsRecord, FilmsRecord,
-    AccountsRecord, UsersRecord
+    AccountsRecord, UsersRecord, BookingBatchesRecord, SeatLocksRecord
 )
 from src.crud.queries.raw_sql import (
-    select_batch_data, club_pre_booking_details, user_pre_booking_details
+    club_pre_booking_details, user_pre_booking_details
 )
-from src.crud.queries.utils import all_selection
-from src.schema.bookings import BatchData
+from src.crud.queries.sales import add_sales
+from src.crud.queries.utils import add_objects
+from src.crud.session import session_scope
+from src.schema.bookings import BatchData, Reporting
+from src.utils.money import to_major
+
+# a seat lock holds its seat this long unless released earlier
+SEAT_LOCK_DURATION = timedelta(minutes=5)
+
+
+def seat_lock_cutoff():
+    """
+    Oldest created_at of a live seat lock by the database clock. An
+    interval has to be spelled out, a bound timedelta becomes a DATETIME
+    that MySQL subtracts as a plain number.
+    """
+    seconds = int(SEAT_LOCK_DURATION.total_seconds())
+    return func.date_sub(func.now(), text(f"INTERVAL {seconds} SECOND"))
+
+# hot booking statements are built once per process with bound parameters,
+# SQLAlchemy then memoises their cache key and reuses the compiled SQL
+def _booking_details(accounts_outer: bool = False):
+    return select(
+        BookingsRecord, SchedulesRecord, FilmsRecord, HallsRecord,
+        AccountsRecord, PersonTypesRecord
+    ).join(
+        SchedulesRecord,
+        SchedulesRecord.schedule_id == BookingsRecord.schedule_id
+    ).join(
+        FilmsRecord, SchedulesRecord.film_id == FilmsRecord.film_id
+    ).join(
+        HallsRecord, HallsRecord.hall_id == SchedulesRecord.hall_id
+    ).join(
+        AccountsRecord, AccountsRecord.id == BookingsRecord.account_id,
+        isouter=accounts_outer
+    ).join(
+        PersonTypesRecord,
+        PersonTypesRecord.person_type_id == BookingsRecord.person_type_id
+    )
 
 
-async def select_person_type(person_type: str):
+def _entity_bookings(entity_type: str):
+    return _booking_details().where(
+        and_(
+            BookingsRecord.id >= bindparam("start"),
+            AccountsRecord.entity_id == bindparam("entity_id"),
+            AccountsRecord.entity_type == entity_type
+        )
+    ).limit(bindparam("limit")).order_by(asc(BookingsRecord.id))
+
+
+_SELECT_BOOKING = _booking_details().where(
+    BookingsRecord.id == bindparam("booking_id")
+)
+_SELECT_CLUB_BOOKINGS = _entity_bookings("CLUB")
+_SELECT_USER_BOOKINGS = _entity_bookings("USER")
+_SELECT_BATCH = _booking_details(accounts_outer=True).where(
+    BookingsRecord.batch_ref == bindparam("batch_ref")
+)
+_SELECT_ASSIGNED_BOOKINGS = _booking_details().where(
+    BookingsRecord.assigned_user == bindparam("user_id")
+).order_by(asc(BookingsRecord.id))
+
+
+async def select_person_type(
+        person_type: str, session: AsyncSession | None = None
+):
     query = select(
         PersonTypesRecord
     ).where(
         PersonTypesRecord.person_type == person_type
     )
 
-    async with async_session() as session:
-        async with session.begin():
-            result = await session.execute(query)
-            return result.scalar()
+    async with read_scope(session) as session:
+        result = await session.execute(query)
+        return result.scalar()
 
 
-async def select_person_types(start, limit):
+async def select_person_types(
+        start, limit, session: AsyncSession | None = None
+):
     query = select(
         PersonTypesRecord
     ).where(
         PersonTypesRecord.person_type_id >= start
     ).limit(limit).order_by(asc(PersonTypesRecord.person_type_id))
 
-    async with async_session() as session:
-        async with session.begin():
-            result = await session.execute(query)
-            return result.scalars().all()
+    async with read_scope(session) as session:
+        result = await session.execute(query)
+        return result.scalars().all()
 
 
-async def select_booking(booking_id: int):
-    query = select(
-        BookingsRecord, SchedulesRecord, FilmsRecord, HallsRecord,
-        AccountsRecord, PersonTypesRecord
-    ).join(
-        SchedulesRecord, SchedulesRecord.schedule_id == BookingsRecord.schedule_id
-    ).join(
-        FilmsRecord, SchedulesRecord.film_id == FilmsRecord.film_id
-    ).join(
-        HallsRecord, HallsRecord.hall_id == SchedulesRecord.hall_id
-    ).join(
-        AccountsRecord, AccountsRecord.id == BookingsRecord.account_id
-    ).join(
-        PersonTypesRecord,
-        PersonTypesRecord.person_type_id == BookingsRecord.person_type_id
-    ).where(
-        BookingsRecord.id == booking_id
-    )
+async def select_booking(booking_id: int, session: AsyncSession | None = None):
+    async with read_scope(session) as session:
+        result = await session.execute(
+            _SELECT_BOOKING, {"booking_id": booking_id}
+        )
+        row = result.fetchone()
+        return row
+
+
+async def select_club_bookings(
+        start: int, limit: int, club_id: int,
+        session: AsyncSession | None = None
+):
+    params = {"start": start, "limit": limit, "entity_id": club_id}
+
+    async with read_scope(session) as session:
+        result = await session.execute(_SELECT_CLUB_BOOKINGS, params)
+        return result.fetchall()
 
-    async with async_session() as session:
-        async with session.begin():
-            result = await session.execute(query)
-            row = result.fetchone()
-            return row
 
+async def select_user_bookings(
+        start: int, limit: int, user_id: int,
+        session: AsyncSession | None = None
+):
+    params = {"start": start, "limit": limit, "entity_id": user_id}
 
-async def select_club_bookings(start: int, limit: int, club_id: int):
+    async with read_scope(session) as session:
+        result = await session.execute(_SELECT_USER_BOOKINGS, params)
+        return result.fetchall()
+
+
+async def select_batches(
+        start: int, limit: int, session: AsyncSession | None = None
+) -> Dict[str, BatchData]:
     query = select(
-        BookingsRecord, SchedulesRecord, FilmsRecord, HallsRecord,
-        AccountsRecord, PersonTypesRecord
-    ).join(
-        SchedulesRecord,
-        SchedulesRecord.schedule_id == BookingsRecord.schedule_id
-    ).join(
-        FilmsRecord, SchedulesRecord.film_id == FilmsRecord.film_id
-    ).join(
-        HallsRecord, HallsRecord.hall_id == SchedulesRecord.hall_id
-    ).join(
-        AccountsRecord, AccountsRecord.id == BookingsRecord.account_id
-    ).join(
-        PersonTypesRecord,
-        PersonTypesRecord.person_type_id == BookingsRecord.person_type_id
+        BookingBatchesRecord
     ).where(
-        and_(
-            BookingsRecord.id >= start,
-            AccountsRecord.entity_id == club_id,
-            AccountsRecord.entity_type == "CLUB"
-        )
-    ).limit(limit).order_by(asc(BookingsRecord.id))
+        BookingBatchesRecord.id >= start
+    ).limit(limit).order_by(asc(BookingBatchesRecord.id))
 
-    async with async_session() as session:
-        async with session.begin():
-            result = await session.execute(query)
-            return result.fetchall()
+    async with read_scope(session) as session:
+        result = await session.execute(query)
+        records = result.scalars().all()
 
+    return {
+        record.batch_ref: BatchData(
+            batch_ref=record.batch_ref,
+            count=record.occurrences,
+            created=record.created,
+            total=to_major(record.total_amount)
+        ) for record in records
+    }
 
-async def select_user_bookings(start: int, limit: int, user_id: int):
-    query = select(
-        BookingsRecord, SchedulesRecord, FilmsRecord, HallsRecord,
-        AccountsRecord, PersonTypesRecord
-    ).join(
-        SchedulesRecord,
-        SchedulesRecord.schedule_id == BookingsRecord.schedule_id
-    ).join(
-        FilmsRecord, SchedulesRecord.film_id == FilmsRecord.film_id
-    ).join(
-        HallsRecord, HallsRecord.hall_id == SchedulesRecord.hall_id
-    ).join(
-        AccountsRecord, AccountsRecord.id == BookingsRecord.account_id
-    ).join(
-        PersonTypesRecord,
-        PersonTypesRecord.person_type_id == BookingsRecord.person_type_id
+
+async def _add_to_batch(
+        batch_ref: str, count: int, total: int, session: AsyncSession
+) -> None:
+    query = mysql_insert(
+        BookingBatchesRecord
+    ).values(
+        batch_ref=batch_ref,
+        created=func.now(),
+        occurrences=count,
+        total_amount=total
+    )
+    query = query.on_duplicate_key_update(
+        occurrences=BookingBatchesRecord.occurrences
+        + query.inserted.occurrences,
+        total_amount=BookingBatchesRecord.total_amount
+        + query.inserted.total_amount,
+    )
+    await session.execute(query)
+
+
+async def save_bookings(
+        records: List[BookingsRecord], session: AsyncSession | None = None
+) -> None:
+    """
+    Insert bookings and fold them into their batch summaries and the sales
+    rollup in the same transaction
+    :param records: new bookings, usually sharing one batch_ref
+    :param session: session of the surrounding unit of work, if any
+    """
+    batches = defaultdict(lambda: [0, 0])
+    sales = defaultdict(lambda: [0, 0])
+    for record in records:
+        batch = batches[record.batch_ref]
+        batch[0] += 1
+        batch[1] += record.amount
+
+        sale = sales[(record.schedule_id, record.person_type_id)]
+        sale[0] += 1
+        sale[1] += record.amount
+
+    # summary rows are locked in key order, so concurrent bookings
+    # touching the same rows queue up instead of deadlocking
+    async with session_scope(session) as session:
+        await add_objects(records, session=session)
+        for batch_ref, (count, total) in sorted(batches.items()):
+            await _add_to_batch(batch_ref, count, total, session)
+        for (schedule_id, person_type_id), (count, total) in sorted(
+                sales.items()
+        ):
+            await add_sales(
+                schedule_id, person_type_id, count, total, session
+            )
+
+
+async def rebuild_booking_batches(session: AsyncSession | None = None) -> int:
+    """
+    Recompute every batch summary from the booking table
+    :return: amount of batches written
+    """
+    summary = select(
+        BookingsRecord.batch_ref,
+        func.min(BookingsRecord.created),
+        func.count(),
+        func.sum(BookingsRecord.amount)
     ).where(
-        and_(
-            BookingsRecord.id >= start,
-            AccountsRecord.entity_id == user_id,
-            AccountsRecord.entity_type == "USER"
-        )
-    ).limit(limit).order_by(asc(BookingsRecord.id))
+        BookingsRecord.status == "ACTIVE"
+    ).group_by(
+        BookingsRecord.batch_ref
+    ).order_by(func.min(BookingsRecord.created))
 
-    async with async_session() as session:
-        async with session.begin():
-            result = await session.execute(query)
-            return result.fetchall()
+    query = insert(BookingBatchesRecord).from_select(
+        ["batch_ref", "created", "occurrences", "total_amount"], summary
+    )
 
+    async with session_scope(session) as session:
+        await session.execute(delete(BookingBatchesRecord))
+        result = await session.execute(query)
+        return result.rowcount
+
+
+async def select_account_report(
+        account_id: int, since: datetime | None = None,
+        until: datetime | None = None, session: AsyncSession | None = None
+) -> Dict[str, Reporting]:
+    """
+    Bookings of an account counted and summed per month by the database,
+    served by ix_booking_account_created
+    :param since: first moment to include
+    :param until: first moment to leave out
+    :return: report per "MM-YYYY" month, oldest first
+    """
+    year = func.year(BookingsRecord.created)
+    month = func.month(BookingsRecord.created)
+
+    conditions = [BookingsRecord.account_id == account_id]
+    if since is not None:
+        conditions.append(BookingsRecord.created >= since)
+    if until is not None:
+        conditions.append(BookingsRecord.created < until)
 
-async def select_batches() -> Dict[str, BatchData]:
-    query = select_batch_data
+    query = select(
+        year, month, func.count(), func.sum(BookingsRecord.amount)
+    ).where(
+        and_(*conditions)
+    ).group_by(year, month).order_by(year, month)
 
-    async with async_session() as session:
-        async with session.begin():
-            result = await session.execute(text(query))
-            rows = result.fetchall()
+    async with read_scope(session) as session:
+        result = await session.execute(query)
+        rows = result.all()
 
     return {
-        batch_ref: BatchData(
-            batch_ref=batch_ref,
-            count=count,
-            created=created,
-            total=total
-        ) for batch_ref, created, count, total in rows
+        f"{_month:02d}-{_year}": Reporting(
+            count=count, amount=to_major(int(amount))
+        ) for _year, _month, count, amount in rows
     }
 
 
-async def get_details(entity_id: int, entity_type: str, schedule_id: int):
+async def get_details(
+        entity_id: int, entity_type: str, schedule_id: int,
+        session: AsyncSession | None = None
+):
     values = (schedule_id, entity_id,)
     if entity_type == "CLUB":
         query = club_pre_booking_details % values
     else:
         query = user_pre_booking_details % values
 
-    async with async_session() as session:
-        async with session.begin():
-            result = await session.execute(text(query))
+    async with read_scope(session) as session:
+        result = await session.execute(text(query))
 
-            details = defaultdict(dict)
-            rows = result.all()
+        details = defaultdict(dict)
+        rows = result.all()
 
-            schedule_record = SchedulesRecord(
-                schedule_id=rows[0][11],
-                hall_id=rows[0][12],
-                film_id=rows[0][13],
-                show_time=rows[0][14],
-                on_schedule=rows[0][15],
-                ticket_price=rows[0][16],
-            )
-            hall_record = HallsRecord(
-                hall_id=rows[0][17],
-                hall_name=rows[0][18],
-                seats_per_row=rows[0][19],
-                no_of_rows=rows[0][20],
-            )
+        schedule_record = SchedulesRecord(
+            schedule_id=rows[0][11],
+            hall_id=rows[0][12],
+            film_id=rows[0][13],
+            show_time=rows[0][14],
+            on_schedule=rows[0][15],
+            ticket_price=rows[0][16],
+        )
+        hall_record = HallsRecord(
+            hall_id=rows[0][17],
+            hall_name=rows[0][18],
+            seats_per_row=rows[0][19],
+            no_of_rows=rows[0][20],
+        )
 
-            for row in rows:
-                person_id = row[8]
-                if person_id:
-                    person_type = PersonTypesRecord(
-                        person_type_id=person_id,
-                        person_type=[9],
-                        discount_amount=[10][0],
-                    )
-                    details["persons"][person_id] = person_type
-
-                if entity_type == "CLUB":
-                    member_id = row[24]
-                    email = row[26]
-                    if member_id:
-                        member = UsersRecord(
-                            user_id=member_id,
-                            name=row[25],
-                            email=email,
-                            password=row[27],
-                            status=row[28],
-                        )
-                        details["club_members"][member_id] = member
-
-                account_record = AccountsRecord(
-                    id=row[0],
-                    account_uid=row[1],
-                    name=row[2],
-                    entity_type=row[3],
-                    entity_id=row[4],
-                    discount_rate=row[5],
-                    status=row[6],
-                    balance=row[7],
+        for row in rows:
+            person_id = row[8]
+            if person_id:
+                person_type = PersonTypesRecord(
+                    person_type_id=person_id,
+                    person_type=[9],
+                    discount_amount=[10][0],
                 )
-                details["accounts"][account_record.id] = account_record
+                details["persons"][person_id] = person_type
+
+            if entity_type == "CLUB":
+                member_id = row[24]
+                email = row[26]
+                if member_id:
+                    member = UsersRecord(
+                        user_id=member_id,
+                        name=row[25],
+                        email=email,
+                        password=row[27],
+                        status=row[28],
+                    )
+                    details["club_members"][member_id] = member
+
+            account_record = AccountsRecord(
+                id=row[0],
+                account_uid=row[1],
+                name=row[2],
+                entity_type=row[3],
+                entity_id=row[4],
+                discount_rate=row[5],
+                status=row[6],
+                balance=row[7],
+            )
+            details["accounts"][account_record.id] = account_record
 
     details["schedules"] = schedule_record
     details["halls"] = hall_record
-    details["batches"] = await select_batches()
     return details
 
 
-async def select_batch(batch: str):
-    query = select(
-        BookingsRecord, SchedulesRecord, FilmsRecord, HallsRecord,
-        AccountsRecord, PersonTypesRecord
-    ).join(
-        SchedulesRecord,
-        SchedulesRecord.schedule_id == BookingsRecord.schedule_id
-    ).join(
-        FilmsRecord,
-        SchedulesRecord.film_id == FilmsRecord.film_id
-    ).join(
-        HallsRecord,
-        HallsRecord.hall_id == SchedulesRecord.hall_id
-    ).outerjoin(
-        AccountsRecord, AccountsRecord.id == BookingsRecord.account_id
-    ).join(
-        PersonTypesRecord,
-        PersonTypesRecord.person_type_id == BookingsRecord.person_type_id
-    ).where(
-        BookingsRecord.batch_ref == batch
-    )
-
-    async with async_session() as session:
-        async with session.begin():
-            result = await session.execute(query)
-            rows = result.all()
-            return rows
+async def select_batch(batch: str, session: AsyncSession | None = None):
+    async with read_scope(session) as session:
+        result = await session.execute(_SELECT_BATCH, {"batch_ref": batch})
+        rows = result.all()
+        return rows
 
 
-async def select_assigned_bookings(user_id: int):
-    query = select(
-        BookingsRecord, SchedulesRecord, FilmsRecord, HallsRecord,
-        AccountsRecord, PersonTypesRecord
-    ).join(
-        SchedulesRecord,
-        SchedulesRecord.schedule_id == BookingsRecord.schedule_id
-    ).join(
-        FilmsRecord, SchedulesRecord.film_id == FilmsRecord.film_id
-    ).join(
-        HallsRecord, HallsRecord.hall_id == SchedulesRecord.hall_id
-    ).join(
-        AccountsRecord, AccountsRecord.id == BookingsRecord.account_id
+async def select_assigned_bookings(
+        user_id: int, session: AsyncSession | None = None
+):
+    async with read_scope(session) as session:
+        result = await session.execute(
+            _SELECT_ASSIGNED_BOOKINGS, {"user_id": user_id}
+        )
+        return result.all()
+
+
+async def select_seat_occupancy(
+        schedule_id: int, session: AsyncSession | None = None
+) -> Tuple[HallsRecord, List[str], List[tuple]] | None:
+    """
+    Everything a schedule's seat map is built from
+    :return: the schedule's hall, seat numbers of its active bookings and
+        (lock id, seat, seconds left) of its live seat locks, None if
+        there is no such schedule
+    """
+    hall_query = select(
+        HallsRecord
     ).join(
-        PersonTypesRecord,
-        PersonTypesRecord.person_type_id == BookingsRecord.person_type_id
+        SchedulesRecord, SchedulesRecord.hall_id == HallsRecord.hall_id
     ).where(
-        BookingsRecord.assigned_user == user_id
-    ).order_by(asc(BookingsRecord.id))
-
-    return await all_selection(query)
+        SchedulesRecord.schedule_id == schedule_id
+    )
+    booked_query = select(
+        BookingsRecord.seat_no
+    ).where(
+        and_(
+            BookingsRecord.schedule_id == schedule_id,
+            BookingsRecord.status == "ACTIVE"
+        )
+    )
+    locks_query = select(
+        SeatLocksRecord.id,
+        SeatLocksRecord.seat,
+        SeatLocksRecord.created_at,
+        func.now()
+    ).where(
+        and_(
+            SeatLocksRecord.schedule_id == schedule_id,
+            SeatLocksRecord.is_manually_closed == False,
+            SeatLocksRecord.created_at >= seat_lock_cutoff()
+        )
+    )
 
+    async with read_scope(session) as session:
+        result = await session.execute(hall_query)
+        hall = result.scalar()
+        if hall is None:
+            return
+
+        result = await session.execute(booked_query)
+        booked = result.scalars().all()
+        result = await session.execute(locks_query)
+        # seconds left by the database clock, the app clock may differ
+        locks = [
+            (
+                lock_id, seat,
+                (created_at.replace(tzinfo=None) + SEAT_LOCK_DURATION
+                 - now).total_seconds()
+            ) for lock_id, seat, created_at, now in result.all()
+        ]
+
+    return hall, booked, locks
@@ -1,45 +1,47 @@
 from sqlalchemy import select, asc, and_
 from sqlalchemy.orm import aliased
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.crud.engine import async_session
+from src.crud.session import read_scope
 from src.crud.models import (
     ClubsRecord, CitiesRecord, ClubMembersRecords, UsersRecord, AccountsRecord, CardsRecord
 )
 from src.crud.queries.utils import scalar_selection
 
 
-async def select_leader_clubs(leader: int):
+async def select_leader_clubs(
+        leader: int, session: AsyncSession | None = None
+):
     query = select(
         ClubsRecord
     ).where(ClubsRecord.leader == leader)
 
-    async with async_session() as session:
-        async with session.begin():
-            result = await session.execute(query)
-            rows = result.all()
+    async with read_scope(session) as session:
+        result = await session.execute(query)
+        rows = result.all()
 
-            return {x[0].id: x for x in rows}
+        return {x[0].id: x for x in rows}
 
 
-async def select_city(city_name: str):
+async def select_city(city_name: str, session: AsyncSession | None = None):
     query = select(
         CitiesRecord
     ).where(
         CitiesRecord.city_name == city_name
     )
-    return await scalar_selection(query)
+    return await scalar_selection(query, session=session)
 
 
-async def select_city_by_id(city_id: int):
+async def select_city_by_id(city_id: int, session: AsyncSession | None = None):
     query = select(
         CitiesRecord
     ).where(
         CitiesRecord.city_id == city_id
     )
-    return await scalar_selection(query)
+    return await scalar_selection(query, session=session)
 
 
-async def select_club_by_id(club_id: int):
+async def select_club_by_id(club_id: int, session: AsyncSession | None = None):
     MemberRecords = aliased(UsersRecord)
     query = select(
         ClubsRecord, CitiesRecord, UsersRecord, MemberRecords
@@ -55,23 +57,22 @@ async def select_club_by_id(club_id: int):
         ClubsRecord.id == club_id
     )
 
-    async with async_session() as session:
-        async with session.begin():
-            result = await session.execute(query)
-            rows = result.all()
+    async with read_scope(session) as session:
+        result = await session.execute(query)
+        rows = result.all()
 
-            if len(rows) == 0:
-                return None
+        if len(rows) == 0:
+            return None
 
-            return {
-                "club": rows[0][0],
-                "city": rows[0][1],
-                "leader": rows[0][2],
-                "members": [x[3] for x in rows if x[3]]
-            }
+        return {
+            "club": rows[0][0],
+            "city": rows[0][1],
+            "leader": rows[0][2],
+            "members": [x[3] for x in rows if x[3]]
+        }
 
 
-async def select_cities(start, limit):
+async def select_cities(start, limit, session: AsyncSession | None = None):
     query = select(
         CitiesRecord
     ).where(
@@ -80,14 +81,13 @@ async def select_cities(start, limit):
         limit
     ).order_by(asc(CitiesRecord.city_id))
 
-    async with async_session() as session:
-        async with session.begin():
-            result = await session.execute(query)
+    async with read_scope(session) as session:
+        result = await session.execute(query)
 
-            return result.scalars().all()
+        return result.scalars().all()
 
 
-async def select_club(club_name: str):
+async def select_club(club_name: str, session: AsyncSession | None = None):
     MemberRecords = aliased(UsersRecord)
     query = select(
         ClubsRecord, CitiesRecord, UsersRecord, MemberRecords
@@ -103,23 +103,22 @@ async def select_club(club_name: str):
         ClubsRecord.club_name == club_name
     )
 
-    async with async_session() as session:
-        async with session.begin():
-            result = await session.execute(query)
-            rows = result.all()
+    async with read_scope(session) as session:
+        result = await session.execute(query)
+        rows = result.all()
 
-            if len(rows) == 0:
-                return None
+        if len(rows) == 0:
+            return None
 
-            return {
-                "club": rows[0][0],
-                "city": rows[0][1],
-                "leader": rows[0][2],
-                "members": [x[3] for x in rows if x[3]]
-            }
+        return {
+            "club": rows[0][0],
+            "city": rows[0][1],
+            "leader": rows[0][2],
+            "members": [x[3] for x in rows if x[3]]
+        }
 
 
-async def select_clubs(start, limit):
+async def select_clubs(start, limit, session: AsyncSession | None = None):
     query = select(
         ClubsRecord, CitiesRecord
     ).join(
@@ -128,25 +127,27 @@ async def select_clubs(start, limit):
         ClubsRecord.id >= start
     ).limit(limit).order_by(asc(ClubsRecord.id))
 
-    async with async_session() as session:
-        async with session.begin():
-            result = await session.execute(query)
-            return result.all()
+    async with read_scope(session) as session:
+        result = await session.execute(query)
+        return result.all()
 
 
-async def select_club_members(club_id: int):
+async def select_club_members(
+        club_id: int, session: AsyncSession | None = None
+):
     members_query = select(
         ClubMembersRecords
     ).where(
         ClubMembersRecords.club == club_id
     )
-    async with async_session() as session:
-        async with session.begin():
-            result = await session.execute(members_query)
-            return result.scalars()
+    async with read_scope(session) as session:
+        result = await session.execute(members_query)
+        return result.scalars()
 
 
-async def select_club_with_accounts(account_id: int):
+async def select_club_with_accounts(
+        account_id: int, session: AsyncSession | None = None
+):
     MemberRecords = aliased(UsersRecord)
     query = select(
         AccountsRecord, ClubsRecord, CitiesRecord, UsersRecord, MemberRecords,
@@ -170,28 +171,27 @@ async def select_club_with_accounts(account_id: int):
         )
     )
 
-    async with async_session() as session:
-        async with session.begin():
-            result = await session.execute(query)
-            rows = result.all()
+    async with read_scope(session) as session:
+        result = await session.execute(query)
+        rows = result.all()
 
-            if len(rows) == 0:
-                return None
+        if len(rows) == 0:
+            return None
 
-            # AccountsRecord, ClubsRecord, CitiesRecord, UsersRecord, MemberRecords,
-            # CardsRecord
+        # AccountsRecord, ClubsRecord, CitiesRecord, UsersRecord, MemberRecords,
+        # CardsRecord
 
-            return {
-                "club": rows[0][1],
-                "city": rows[0][2],
-                "leader": rows[0][3],
-                "members": [x[4] for x in rows if x[4]],
-                "account": rows[0][0],
-                "cards": [x[5] for x in rows if x[5]],
-            }
+        return {
+            "club": rows[0][1],
+            "city": rows[0][2],
+            "leader": rows[0][3],
+            "members": [x[4] for x in rows if x[4]],
+            "account": rows[0][0],
+            "cards": [x[5] for x in rows if x[5]],
+        }
 
 
-async def is_club_rep(username: str):
+async def is_club_rep(username: str, session: AsyncSession | None = None):
     query = select(
         ClubsRecord
     ).join(
@@ -201,7 +201,7 @@ async def is_club_rep(username: str):
         UsersRecord.email == username
     )
 
-    record = await scalar_selection(query)
+    record = await scalar_selection(query, session=session)
 
     if record is None:
         return False
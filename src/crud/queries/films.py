@@ -1,40 +1,46 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 
-from sqlalchemy import select, and_, asc
+from typing import Dict, Iterable, List
 
-from src.crud.engine import async_session
+from sqlalchemy import select, and_, asc, func, insert, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.crud.session import read_scope, session_scope
 from src.crud.models import (
     HallsRecord, FilmsRecord, FilmImagesRecord, SchedulesRecord
 )
 from src.crud.queries.utils import scalars_selection
 
+# a hall is cleaned between two shows
+CLEANING_GAP = timedelta(minutes=15)
+
 
-async def select_hall(hall_name: str):
+async def select_hall(hall_name: str, session: AsyncSession | None = None):
     query = select(
         HallsRecord
     ).where(
         HallsRecord.hall_name == hall_name
     )
-    async with async_session() as session:
-        async with session.begin():
-            result = await session.execute(query)
-            return result.scalar()
+    async with read_scope(session) as session:
+        result = await session.execute(query)
+        return result.scalar()
 
 
-async def select_halls(start: int, limit: int):
+async def select_halls(
+        start: int, limit: int, session: AsyncSession | None = None
+):
     query = select(
         HallsRecord
     ).where(
         HallsRecord.hall_id >= start
     ).limit(limit).order_by(asc(HallsRecord.hall_id))
 
-    async with async_session() as session:
-        async with session.begin():
-            result = await session.execute(query)
-            return result.scalars().all()
+    async with read_scope(session) as session:
+        result = await session.execute(query)
+        return result.scalars().all()
 
 
-async def select_film(title: str):
+async def select_film(title: str, session: AsyncSession | None = None):
     query = select(
         FilmsRecord, FilmImagesRecord
     ).outerjoin(
@@ -43,24 +49,23 @@ async def select_film(title: str):
         FilmsRecord.title == title
     )
 
-    async with async_session() as session:
-        async with session.begin():
-            result = await session.execute(query)
-            rows = result.all()
+    async with read_scope(session) as session:
+        result = await session.execute(query)
+        rows = result.all()
 
-            if len(rows) == 0:
-                return
+        if len(rows) == 0:
+            return
 
-            film = rows[0][0]
-            images = [row[1] for row in rows if row[1]]
+        film = rows[0][0]
+        images = [row[1] for row in rows if row[1]]
 
-            return {
-                "film": film,
-                "images": images
-            }
+        return {
+            "film": film,
+            "images": images
+        }
 
 
-async def select_film_by_id(film_id: int):
+async def select_film_by_id(film_id: int, session: AsyncSession | None = None):
     query = select(
         FilmsRecord, FilmImagesRecord
     ).outerjoin(
@@ -69,37 +74,39 @@ async def select_film_by_id(film_id: int):
         FilmsRecord.film_id == film_id
     )
 
-    async with async_session() as session:
-        async with session.begin():
-            result = await session.execute(query)
-            rows = result.all()
+    async with read_scope(session) as session:
+        result = await session.execute(query)
+        rows = result.all()
 
-            if len(rows) == 0:
-                return
+        if len(rows) == 0:
+            return
 
-            film = rows[0][0]
-            images = [row[1] for row in rows if row[1]]
+        film = rows[0][0]
+        images = [row[1] for row in rows if row[1]]
 
-            return {
-                "film": film,
-                "images": images
-            }
+        return {
+            "film": film,
+            "images": images
+        }
 
 
-async def select_films(start: int, limit: int):
+async def select_films(
+        start: int, limit: int, session: AsyncSession | None = None
+):
     query = select(
         FilmsRecord
     ).where(
         FilmsRecord.film_id >= start
     ).limit(limit).order_by(asc(FilmsRecord.film_id))
 
-    async with async_session() as session:
-        async with session.begin():
-            result = await session.execute(query)
-            return result.scalars().all()
+    async with read_scope(session) as session:
+        result = await session.execute(query)
+        return result.scalars().all()
 
 
-async def select_last_schedule(show_time, hall_id):
+async def select_last_schedule(
+        show_time, hall_id, session: AsyncSession | None = None
+):
     query = select(
         SchedulesRecord, FilmsRecord
     ).join(
@@ -110,13 +117,14 @@ async def select_last_schedule(show_time, hall_id):
             SchedulesRecord.hall_id == hall_id
         )
     )
-    async with async_session() as session:
-        async with session.begin():
-            result = await session.execute(query)
-            return result.all()
+    async with read_scope(session) as session:
+        result = await session.execute(query)
+        return result.all()
 
 
-async def select_images(film_id: int, batch: int):
+async def select_images(
+        film_id: int, batch: int, session: AsyncSession | None = None
+):
     query = select(
         FilmImagesRecord
     ).where(
@@ -125,36 +133,37 @@ async def select_images(film_id: int, batch: int):
             FilmImagesRecord.batch == batch
         )
     ).order_by(asc(FilmImagesRecord.image_id))
-    async with async_session() as session:
-        async with session.begin():
-            result = await session.execute(query)
-            return result.scalars().all()
-
-
-async def select_film_schedules(query):
-    async with async_session() as session:
-        async with session.begin():
-            result = await session.execute(query)
-            rows = result.all()
-
-            if len(rows) == 0:
-                return None
-
-            film = rows[0][0]
-            schedules = [
-                x[1] for x in rows if x[1]
-            ]
-            halls = [
-                x[2] for x in rows if x[2]
-            ]
-            return {
-                "film": film,
-                "schedules": schedules,
-                "halls": halls
-            }
-
-
-async def select_inserted_schedules(film_id: int, hall_id: int, show_time: str):
+    async with read_scope(session) as session:
+        result = await session.execute(query)
+        return result.scalars().all()
+
+
+async def select_film_schedules(query, session: AsyncSession | None = None):
+    async with read_scope(session) as session:
+        result = await session.execute(query)
+        rows = result.all()
+
+        if len(rows) == 0:
+            return None
+
+        film = rows[0][0]
+        schedules = [
+            x[1] for x in rows if x[1]
+        ]
+        halls = [
+            x[2] for x in rows if x[2]
+        ]
+        return {
+            "film": film,
+            "schedules": schedules,
+            "halls": halls
+        }
+
+
+async def select_inserted_schedules(
+        film_id: int, hall_id: int, show_time: str,
+        session: AsyncSession | None = None
+):
     query = select(
         SchedulesRecord, FilmsRecord, HallsRecord
     ).join(
@@ -169,17 +178,18 @@ async def select_inserted_schedules(film_id: int, hall_id: int, show_time: str):
         )
     ).order_by(asc(SchedulesRecord.schedule_id))
 
-    async with async_session() as session:
-        async with session.begin():
-            result = await session.execute(query)
+    async with read_scope(session) as session:
+        result = await session.execute(query)
 
-            rows = result.fetchone()
-            if not rows:
-                return
-            return [rows[0], rows[1], rows[2]]
+        rows = result.fetchone()
+        if not rows:
+            return
+        return [rows[0], rows[1], rows[2]]
 
 
-async def select_schedule(schedule_id: int):
+async def select_schedule(
+        schedule_id: int, session: AsyncSession | None = None
+):
     query = select(
         SchedulesRecord, FilmsRecord, HallsRecord
     ).join(
@@ -189,17 +199,18 @@ async def select_schedule(schedule_id: int):
     ).where(
         SchedulesRecord.schedule_id == schedule_id
     )
-    async with async_session() as session:
-        async with session.begin():
-            result = await session.execute(query)
+    async with read_scope(session) as session:
+        result = await session.execute(query)
 
-            rows = result.fetchone()
-            if not rows:
-                return
-            return [rows[0], rows[1], rows[2]]
+        rows = result.fetchone()
+        if not rows:
+            return
+        return [rows[0], rows[1], rows[2]]
 
 
-async def select_schedules(start: int, limit: int):
+async def select_schedules(
+        start: int, limit: int, session: AsyncSession | None = None
+):
     query = select(
         SchedulesRecord, FilmsRecord, HallsRecord
     ).join(
@@ -209,14 +220,23 @@ async def select_schedules(start: int, limit: int):
     ).where(
         SchedulesRecord.schedule_id >= start
     ).limit(limit).order_by(asc(SchedulesRecord.schedule_id))
-    async with async_session() as session:
-        async with session.begin():
-            result = await session.execute(query)
+    async with read_scope(session) as session:
+        result = await session.execute(query)
+
+        return result.all()
+
+
+async def select_all_films(session: AsyncSession | None = None):
+    query = select(
+        FilmsRecord
+    ).order_by(asc(FilmsRecord.film_id))
 
-            return result.all()
+    async with read_scope(session) as session:
+        result = await session.execute(query)
+        return result.scalars().all()
 
 
-async def select_all_schedules():
+async def select_all_schedules(session: AsyncSession | None = None):
     query = select(
         SchedulesRecord, FilmsRecord, HallsRecord
     ).join(
@@ -224,11 +244,10 @@ async def select_all_schedules():
     ).join(
         HallsRecord, HallsRecord.hall_id == SchedulesRecord.hall_id
     ).order_by(asc(SchedulesRecord.schedule_id))
-    async with async_session() as session:
-        async with session.begin():
-            result = await session.execute(query)
+    async with read_scope(session) as session:
+        result = await session.execute(query)
 
-            return result.all()
+        return result.all()
 
 
 # async def select_film_by_id(film_id: int):
@@ -244,7 +263,9 @@ async def select_all_schedules():
 #             return result.scalar()
 
 
-async def select_schedules_by_hall_id(hall_id: int, limit: int):
+async def select_schedules_by_hall_id(
+        hall_id: int, limit: int, session: AsyncSession | None = None
+):
     query = select(
         SchedulesRecord, FilmsRecord
     ).join(
@@ -252,30 +273,120 @@ async def select_schedules_by_hall_id(hall_id: int, limit: int):
     ).where(
         SchedulesRecord.hall_id == hall_id
     ).limit(limit).order_by(asc(SchedulesRecord.schedule_id))
-    async with async_session() as session:
-        async with session.begin():
-            result = await session.execute(query)
+    async with read_scope(session) as session:
+        result = await session.execute(query)
+
+        return result.all()
+
+
+async def select_conflicting_schedules(
+        hall_id: int, start: datetime, end: datetime,
+        session: AsyncSession | None = None
+):
+    """
+    Schedules of a hall whose show and cleaning gap overlap [start, end].
+    A show can only overlap when it starts less than the longest film
+    before `end`, so only that range of ix_schedule_hall_show_time is read.
+    :param session: the unit of work about to write the new show, without
+        one the check may read a lagging replica
+    :return: rows of schedule record and film duration in seconds
+    """
+    longest_query = select(func.max(FilmsRecord.duration_sec))
+
+    async with read_scope(session) as session:
+        result = await session.execute(longest_query)
+        longest = timedelta(seconds=result.scalar() or 0) + CLEANING_GAP
+
+        query = select(
+            SchedulesRecord, FilmsRecord.duration_sec
+        ).join(
+            FilmsRecord, FilmsRecord.film_id == SchedulesRecord.film_id
+        ).where(
+            and_(
+                SchedulesRecord.hall_id == hall_id,
+                SchedulesRecord.show_time >= start - longest,
+                SchedulesRecord.show_time <= end
+            )
+        ).order_by(asc(SchedulesRecord.show_time))
+        result = await session.execute(query)
+        rows = result.all()
+
+    return [
+        (record, duration) for record, duration in rows
+        if record.show_time + timedelta(seconds=duration) + CLEANING_GAP
+        >= start
+    ]
+
+
+async def select_films_by_ids(
+        film_ids: Iterable[int], session: AsyncSession | None = None
+) -> Dict[int, FilmsRecord]:
+    query = select(
+        FilmsRecord
+    ).where(
+        FilmsRecord.film_id.in_(set(film_ids))
+    )
+    async with read_scope(session) as session:
+        result = await session.execute(query)
+        return {x.film_id: x for x in result.scalars().all()}
+
+
+async def select_halls_by_ids(
+        hall_ids: Iterable[int], session: AsyncSession | None = None
+) -> Dict[int, HallsRecord]:
+    query = select(
+        HallsRecord
+    ).where(
+        HallsRecord.hall_id.in_(set(hall_ids))
+    )
+    async with read_scope(session) as session:
+        result = await session.execute(query)
+        return {x.hall_id: x for x in result.scalars().all()}
+
+
+async def insert_schedules(
+        values: List[dict], session: AsyncSession | None = None
+) -> List[SchedulesRecord]:
+    """
+    Insert many schedules in one multi-row statement and read them back
+    in one query on (hall_id, show_time)
+    :param values: column values of each schedule, show_time naive
+    :return: the inserted records in show time order
+    """
+    if not values:
+        return []
+
+    keys = [(x["hall_id"], x["show_time"]) for x in values]
+    query = select(
+        SchedulesRecord
+    ).where(
+        tuple_(SchedulesRecord.hall_id, SchedulesRecord.show_time).in_(keys)
+    ).order_by(asc(SchedulesRecord.show_time))
 
-            return result.all()
+    async with session_scope(session) as session:
+        await session.execute(insert(SchedulesRecord).values(values))
+        result = await session.execute(query)
+        return result.scalars().all()
 
 
-async def select_hall_by_id(hall_id: int):
+async def select_hall_by_id(hall_id: int, session: AsyncSession | None = None):
     query = select(
         HallsRecord
     ).where(
         HallsRecord.hall_id == hall_id
     )
-    async with async_session() as session:
-        async with session.begin():
-            result = await session.execute(query)
-            return result.scalar()
+    async with read_scope(session) as session:
+        result = await session.execute(query)
+        return result.scalar()
 
 
-async def select_poster_images(film_id: int):
+async def select_poster_images(
+        film_id: int, session: AsyncSession | None = None
+):
     query = select(
         FilmImagesRecord
     ).where(
         FilmImagesRecord.film_id == film_id
     )
 
-    return await scalars_selection(query)
+    return await scalars_selection(query, session=session)
@@ -0,0 +1,203 @@
+from typing import List, Tuple
+
+from sqlalchemy import (
+    select, and_, func, insert, asc, desc, literal
+)
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.crud.models import (
+    TransactionsRecord, BalanceSnapshotsRecord, AccountsRecord
+)
+from src.crud.queries.utils import add_object
+from src.crud.session import read_scope, session_scope, pin_primary
+
+
+async def record_transaction(
+        account_id: int, amount: int, transaction_type: str, batch_ref: str,
+        session: AsyncSession | None = None
+) -> TransactionsRecord:
+    """
+    Append a ledger entry. Write it after the balance update it belongs
+    to, the account row lock then keeps an account's entries committing
+    in id order, which the snapshots rely on.
+    :param account_id: account whose balance moved
+    :param amount: minor units, negative for debits
+    :param transaction_type: BOOKING, TOP-UP, REFUND or OPENING
+    :param batch_ref: booking batch or top-up reference
+    :param session: session of the surrounding unit of work, if any
+    """
+    record = TransactionsRecord(
+        account_id=account_id,
+        amount=amount,
+        transaction_type=transaction_type,
+        batch_ref=batch_ref,
+    )
+    await add_object(record, session=session)
+    return record
+
+
+async def open_account_ledgers(session: AsyncSession | None = None) -> int:
+    """
+    Give every account whose ledger does not add up to its balance an
+    OPENING entry for the difference, so statements of accounts older
+    than the ledger reconcile with account.balance. Running it again only
+    writes entries for accounts that drifted.
+    INSERT ... SELECT share locks the account rows it reads, a debit or
+    credit in flight commits its balance and ledger entry first.
+    :return: amount of entries written
+    """
+    totals = select(
+        TransactionsRecord.account_id,
+        func.sum(TransactionsRecord.amount).label("total")
+    ).where(
+        TransactionsRecord.account_id.is_not(None)
+    ).group_by(
+        TransactionsRecord.account_id
+    ).subquery()
+
+    difference = AccountsRecord.balance - func.coalesce(totals.c.total, 0)
+    source = select(
+        AccountsRecord.id,
+        difference,
+        literal("OPENING"),
+        literal("OPENING"),
+        func.now()
+    ).outerjoin(
+        totals, totals.c.account_id == AccountsRecord.id
+    ).where(
+        difference != 0
+    )
+
+    query = insert(TransactionsRecord).from_select(
+        ["account_id", "amount", "transaction_type", "batch_ref", "created"],
+        source
+    )
+
+    pin_primary()
+    async with session_scope(session) as session:
+        result = await session.execute(query)
+        return result.rowcount
+
+
+async def take_balance_snapshots(session: AsyncSession | None = None) -> int:
+    """
+    Snapshot every account that has ledger entries past its latest
+    snapshot, as the previous snapshot plus the sum of that tail
+    :return: amount of snapshots written
+    """
+    latest = select(
+        BalanceSnapshotsRecord.account_id,
+        func.max(BalanceSnapshotsRecord.transaction_id).label(
+            "transaction_id"
+        )
+    ).group_by(
+        BalanceSnapshotsRecord.account_id
+    ).subquery()
+
+    previous = select(
+        BalanceSnapshotsRecord.account_id,
+        BalanceSnapshotsRecord.transaction_id,
+        BalanceSnapshotsRecord.balance
+    ).join(
+        latest,
+        and_(
+            latest.c.account_id == BalanceSnapshotsRecord.account_id,
+            latest.c.transaction_id == BalanceSnapshotsRecord.transaction_id
+        )
+    ).subquery()
+
+    tail = select(
+        TransactionsRecord.account_id,
+        func.max(TransactionsRecord.id),
+        func.coalesce(func.max(previous.c.balance), 0)
+        + func.sum(TransactionsRecord.amount),
+        func.now()
+    ).outerjoin(
+        previous, previous.c.account_id == TransactionsRecord.account_id
+    ).where(
+        and_(
+            TransactionsRecord.account_id.is_not(None),
+            TransactionsRecord.id > func.coalesce(previous.c.transaction_id, 0)
+        )
+    ).group_by(
+        TransactionsRecord.account_id
+    )
+
+    # IGNORE, two workers snapshotting at once write the same rows
+    query = insert(
+        BalanceSnapshotsRecord
+    ).prefix_with("IGNORE").from_select(
+        ["account_id", "transaction_id", "balance", "created"], tail
+    )
+
+    pin_primary()
+    async with session_scope(session) as session:
+        result = await session.execute(query)
+        return result.rowcount
+
+
+async def select_balance_before(
+        account_id: int, transaction_id: int,
+        session: AsyncSession | None = None
+) -> int:
+    """
+    Balance of an account just before a ledger entry, read from the
+    closest earlier snapshot and the entries after it
+    """
+    snapshot_query = select(
+        BalanceSnapshotsRecord.transaction_id,
+        BalanceSnapshotsRecord.balance
+    ).where(
+        and_(
+            BalanceSnapshotsRecord.account_id == account_id,
+            BalanceSnapshotsRecord.transaction_id < transaction_id
+        )
+    ).order_by(
+        desc(BalanceSnapshotsRecord.transaction_id)
+    ).limit(1)
+
+    async with read_scope(session) as session:
+        result = await session.execute(snapshot_query)
+        snapshot = result.first()
+        since, balance = snapshot if snapshot else (0, 0)
+
+        tail_query = select(
+            func.coalesce(func.sum(TransactionsRecord.amount), 0)
+        ).where(
+            and_(
+                TransactionsRecord.account_id == account_id,
+                TransactionsRecord.id > since,
+                TransactionsRecord.id < transaction_id
+            )
+        )
+        result = await session.execute(tail_query)
+        return balance + int(result.scalar())
+
+
+async def select_statement(
+        account_id: int, start: int, limit: int,
+        session: AsyncSession | None = None
+) -> Tuple[int, List[TransactionsRecord]]:
+    """
+    One page of an account's ledger
+    :param start: ledger id to start from
+    :param limit: amount of entries
+    :return: balance before the page and the page's entries in order
+    """
+    query = select(
+        TransactionsRecord
+    ).where(
+        and_(
+            TransactionsRecord.account_id == account_id,
+            TransactionsRecord.id >= start
+        )
+    ).order_by(asc(TransactionsRecord.id)).limit(limit)
+
+    async with read_scope(session) as session:
+        opening = await select_balance_before(
+            account_id, start, session=session
+        )
+        result = await session.execute(query)
+        records = result.scalars().all()
+
+    return opening, records
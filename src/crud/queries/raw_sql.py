@@ -1,20 +1,8 @@
 from src.crud.models import (
-    BookingsRecord, AccountsRecord, ClubMembersRecords, ClubsRecord,
+    AccountsRecord, ClubMembersRecords, ClubsRecord,
     UsersRecord, HallsRecord, SchedulesRecord, PersonTypesRecord
 )
 
-select_batch_data: str = f"""
-SELECT 
-    `batch_ref`, 
-    MIN(`created`) AS created,
-    COUNT(*) AS occurrences,
-    SUM(`amount`) AS total_amount
-FROM 
-    {BookingsRecord.__tablename__}
-GROUP BY 
-    `batch_ref`;
-"""
-
 user_pre_booking_details: str = f"""
 SELECT *
 FROM `{AccountsRecord.__tablename__}`
@@ -1,61 +1,64 @@
 from sqlalchemy import select, update, and_, asc
-from src.crud.engine import async_session
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.crud.session import session_scope
 from src.crud.models import (
-    RolesRecord, UsersRecord
+    RolesRecord, UsersRecord, PermissionsRecord, RolePermissionsRecord
 )
 from src.crud.queries.utils import execute_safely
 from src.schema.users import Role
 
+# the role catalog is reloaded right after role writes, read the primary
+
 
 async def select_roles(
-        query
+        query,
+        session: AsyncSession | None = None
 ):
     permissions = {}
     roles = {}
     user_roles = {}
     role_permissions = {}
 
-    async with async_session() as session:
-        async with session.begin():
-            result = await session.execute(query.order_by(asc(RolesRecord.role_id)))
-
-            if not result:
-                return
-
-            rows = result.all()
-
-            # if len(rows) == 0:
-            #     return
-            # elif len(rows) == 1:
-            #     if not rows[0][1]:
-            #         record = rows[0][0]
-            #         roles.update({record.role_id: record})
-            #         return {
-            #             "roles": roles,
-            #             "permissions": permissions,
-            #             "user_roles": user_roles,
-            #             "role_permissions": role_permissions
-            #         }
-
-            for row in rows:
-                # UsersRecord, UserRolesRecord, RolesRecord, RolePermissionsRecord,
-                # PermissionsRecord
-                role_record = row[0]
-                role_permissions_record = row[1]
-                permissions_record = row[2]
-
-                if role_record:
-                    roles.update({role_record.role_id: role_record})
-
-                if permissions_record:
-                    permissions.update({
-                        permissions_record.permission_id: permissions_record
-                    })
-
-                if role_permissions_record:
-                    role_permissions.update({
-                        role_permissions_record.id: role_permissions_record
-                    })
+    async with session_scope(session) as session:
+        result = await session.execute(query.order_by(asc(RolesRecord.role_id)))
+
+        if not result:
+            return
+
+        rows = result.all()
+
+        # if len(rows) == 0:
+        #     return
+        # elif len(rows) == 1:
+        #     if not rows[0][1]:
+        #         record = rows[0][0]
+        #         roles.update({record.role_id: record})
+        #         return {
+        #             "roles": roles,
+        #             "permissions": permissions,
+        #             "user_roles": user_roles,
+        #             "role_permissions": role_permissions
+        #         }
+
+        for row in rows:
+            # UsersRecord, UserRolesRecord, RolesRecord, RolePermissionsRecord,
+            # PermissionsRecord
+            role_record = row[0]
+            role_permissions_record = row[1]
+            permissions_record = row[2]
+
+            if role_record:
+                roles.update({role_record.role_id: role_record})
+
+            if permissions_record:
+                permissions.update({
+                    permissions_record.permission_id: permissions_record
+                })
+
+            if role_permissions_record:
+                role_permissions.update({
+                    role_permissions_record.id: role_permissions_record
+                })
 
     return {
         "roles": roles,
@@ -65,7 +68,20 @@ async def select_roles(
     }
 
 
-async def update_role_query(role: Role):
+async def select_role_catalog(session: AsyncSession | None = None):
+    query = select(
+        RolesRecord, RolePermissionsRecord, PermissionsRecord
+    ).outerjoin(
+        RolePermissionsRecord,
+        RolePermissionsRecord.role_id == RolesRecord.role_id
+    ).outerjoin(
+        PermissionsRecord,
+        PermissionsRecord.permission_id == RolePermissionsRecord.permissions_id
+    )
+    return await select_roles(query, session=session)
+
+
+async def update_role_query(role: Role, session: AsyncSession | None = None):
     query = update(
         RolesRecord
     ).values(
@@ -73,10 +89,12 @@ async def update_role_query(role: Role):
     ).where(
         RolesRecord.role_id == role.id
     )
-    await execute_safely(query)
+    await execute_safely(query, session=session)
 
 
-async def get_user_role_data(username: str, role_name: str):
+async def get_user_role_data(
+        username: str, role_name: str, session: AsyncSession | None = None
+):
     query = select(
         UsersRecord, RolesRecord
     ).where(
@@ -85,7 +103,16 @@ async def get_user_role_data(username: str, role_name: str):
             RolesRecord.role_name == role_name
         )
     )
-    async with async_session() as session:
-        async with session.begin():
-            result = await session.execute(query)
-            return result.scalars().all()
+    async with session_scope(session) as session:
+        result = await session.execute(query)
+        return result.scalars().all()
+
+
+async def select_permission_names(session: AsyncSession | None = None):
+    query = select(
+        PermissionsRecord.permission
+    ).order_by(asc(PermissionsRecord.permission_id))
+
+    async with session_scope(session) as session:
+        result = await session.execute(query)
+        return result.scalars().all()
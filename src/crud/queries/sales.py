@@ -0,0 +1,137 @@
+from datetime import date
+from typing import List
+
+from sqlalchemy import (
+    select, and_, func, insert, delete, literal, asc, desc
+)
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.crud.models import (
+    SalesRollupsRecord, SchedulesRecord, BookingsRecord, FilmsRecord
+)
+from src.crud.session import read_scope, session_scope
+
+_KEY = ["day", "film_id", "hall_id", "person_type_id"]
+
+
+async def add_sales(
+        schedule_id: int, person_type_id: int, tickets: int, revenue: int,
+        session: AsyncSession
+) -> None:
+    """
+    Fold tickets sold today into the rollup row of their schedule's film
+    and hall
+    :param revenue: minor units
+    """
+    source = select(
+        func.curdate(),
+        SchedulesRecord.film_id,
+        SchedulesRecord.hall_id,
+        literal(person_type_id),
+        literal(tickets),
+        literal(revenue)
+    ).where(
+        SchedulesRecord.schedule_id == schedule_id
+    )
+
+    query = mysql_insert(
+        SalesRollupsRecord
+    ).from_select(_KEY + ["tickets", "revenue"], source)
+    query = query.on_duplicate_key_update(
+        tickets=SalesRollupsRecord.tickets + query.inserted.tickets,
+        revenue=SalesRollupsRecord.revenue + query.inserted.revenue,
+    )
+    await session.execute(query)
+
+
+async def rebuild_sales_rollups(session: AsyncSession | None = None) -> int:
+    """
+    Recompute every rollup row from the active bookings
+    :return: amount of rows written
+    """
+    day = func.date(BookingsRecord.created)
+    summary = select(
+        day,
+        SchedulesRecord.film_id,
+        SchedulesRecord.hall_id,
+        BookingsRecord.person_type_id,
+        func.count(),
+        func.sum(BookingsRecord.amount)
+    ).join(
+        SchedulesRecord,
+        SchedulesRecord.schedule_id == BookingsRecord.schedule_id
+    ).where(
+        BookingsRecord.status == "ACTIVE"
+    ).group_by(
+        day, SchedulesRecord.film_id, SchedulesRecord.hall_id,
+        BookingsRecord.person_type_id
+    )
+
+    query = insert(SalesRollupsRecord).from_select(
+        _KEY + ["tickets", "revenue"], summary
+    )
+
+    async with session_scope(session) as session:
+        await session.execute(delete(SalesRollupsRecord))
+        result = await session.execute(query)
+        return result.rowcount
+
+
+def _date_range(since: date | None, until: date | None) -> list:
+    conditions = []
+    if since is not None:
+        conditions.append(SalesRollupsRecord.day >= since)
+    if until is not None:
+        conditions.append(SalesRollupsRecord.day <= until)
+    return conditions
+
+
+async def select_film_sales(
+        since: date | None = None, until: date | None = None,
+        session: AsyncSession | None = None
+):
+    """
+    Tickets and revenue per film over a range of sale days
+    :return: rows of film_id, title, tickets, revenue, best selling first
+    """
+    tickets = func.sum(SalesRollupsRecord.tickets)
+    query = select(
+        FilmsRecord.film_id,
+        FilmsRecord.title,
+        tickets,
+        func.sum(SalesRollupsRecord.revenue)
+    ).join(
+        FilmsRecord, FilmsRecord.film_id == SalesRollupsRecord.film_id
+    ).where(
+        and_(*_date_range(since, until))
+    ).group_by(
+        FilmsRecord.film_id, FilmsRecord.title
+    ).order_by(desc(tickets))
+
+    async with read_scope(session) as session:
+        result = await session.execute(query)
+        return result.all()
+
+
+async def select_sales_rollups(
+        start: int, limit: int, since: date | None = None,
+        until: date | None = None, film_id: int | None = None,
+        hall_id: int | None = None, session: AsyncSession | None = None
+) -> List[SalesRollupsRecord]:
+    conditions = [SalesRollupsRecord.id >= start]
+    conditions += _date_range(since, until)
+    if film_id is not None:
+        conditions.append(SalesRollupsRecord.film_id == film_id)
+    if hall_id is not None:
+        conditions.append(SalesRollupsRecord.hall_id == hall_id)
+
+    query = select(
+        SalesRollupsRecord
+    ).where(
+        and_(*conditions)
+    ).limit(limit).order_by(asc(SalesRollupsRecord.id))
+
+    async with read_scope(session) as session:
+        result = await session.execute(query)
+        return result.scalars().all()
@@ -0,0 +1,34 @@
+from sqlalchemy import insert, update, select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.crud.models import SerialSequencesRecord
+from src.crud.session import session_scope
+
+
+async def allocate_serial_block(
+        name: str, size: int, session: AsyncSession | None = None
+) -> int:
+    """
+    Reserve the next `size` values of a sequence in one atomic update,
+    LAST_INSERT_ID(expr) hands back the new end without a locking read
+    :param name: sequence to draw from, created on first use
+    :param size: amount of values to reserve
+    :return: first value of the reserved block
+    """
+    create_query = insert(
+        SerialSequencesRecord
+    ).prefix_with("IGNORE").values(name=name, next_value=0)
+
+    reserve_query = update(
+        SerialSequencesRecord
+    ).values(
+        next_value=func.last_insert_id(SerialSequencesRecord.next_value + size)
+    ).where(SerialSequencesRecord.name == name)
+
+    async with session_scope(session) as session:
+        await session.execute(create_query)
+        await session.execute(reserve_query)
+        result = await session.execute(select(func.last_insert_id()))
+        end = result.scalar()
+
+    return end - size
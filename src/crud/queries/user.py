@@ -1,13 +1,20 @@
-from sqlalchemy import select, asc
+from sqlalchemy import select, asc, update, exists
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.crud.engine import async_session
+from src.crud.session import session_scope
 from src.crud.models import (
     UsersRecord, UserRolesRecord, RolesRecord, RolePermissionsRecord,
-    PermissionsRecord
+    PermissionsRecord, ClubsRecord
 )
+from src.crud.queries.utils import execute_safely
 
+# credentials, roles and auth versions must never lag behind a write,
+# these helpers stay on the primary instead of using read_scope
 
-async def select_user_by_email(username: str) -> dict | None:
+
+async def select_user_by_email(
+        username: str, session: AsyncSession | None = None
+) -> dict | None:
     query = select(
         UsersRecord, UserRolesRecord, RolesRecord, RolePermissionsRecord,
         PermissionsRecord
@@ -28,32 +35,31 @@ async def select_user_by_email(username: str) -> dict | None:
     user_roles = {}
     role_permissions = {}
 
-    async with async_session() as session:
-        async with session.begin():
-            result = await session.execute(query)
+    async with session_scope(session) as session:
+        result = await session.execute(query)
 
-            rows = result.all()
+        rows = result.all()
 
-            if len(rows) == 0:
-                return None
+        if len(rows) == 0:
+            return None
 
-            user_record = rows[0][0]
+        user_record = rows[0][0]
 
-            for row in rows:
-                # UsersRecord, UserRolesRecord, RolesRecord, RolePermissionsRecord, PermissionsRecord
-                user_role_record = row[1]
-                role_record = row[2]
-                role_permissions_record = row[3]
-                permissions_record = row[4]
+        for row in rows:
+            # UsersRecord, UserRolesRecord, RolesRecord, RolePermissionsRecord, PermissionsRecord
+            user_role_record = row[1]
+            role_record = row[2]
+            role_permissions_record = row[3]
+            permissions_record = row[4]
 
-                if role_record:
-                    roles.update({role_record.role_id: role_record})
-                if user_role_record:
-                    user_roles.update({user_role_record.id: user_role_record})
-                if permissions_record:
-                    permissions.update({permissions_record.permission_id: permissions_record})
-                if role_permissions_record:
-                    role_permissions.update({role_permissions_record.id: role_permissions_record})
+            if role_record:
+                roles.update({role_record.role_id: role_record})
+            if user_role_record:
+                user_roles.update({user_role_record.id: user_role_record})
+            if permissions_record:
+                permissions.update({permissions_record.permission_id: permissions_record})
+            if role_permissions_record:
+                role_permissions.update({role_permissions_record.id: role_permissions_record})
 
     return {
         "user": user_record,
@@ -64,7 +70,91 @@ async def select_user_by_email(username: str) -> dict | None:
     }
 
 
-async def select_user_by_id(user_id: int) -> dict | None:
+async def select_login(
+        username: str, session: AsyncSession | None = None
+) -> dict | None:
+    """
+    Everything /token needs in one round trip, selected as plain columns
+    so no ORM records are built
+    :param username: email of the user logging in
+    :return: credentials, status, role names/ids, permission names and
+    club leader status, None if the user does not exist
+    """
+    query = select(
+        UsersRecord.user_id, UsersRecord.name, UsersRecord.password,
+        UsersRecord.status, UsersRecord.auth_version,
+        RolesRecord.role_id, RolesRecord.role_name,
+        PermissionsRecord.permission,
+        exists().where(
+            ClubsRecord.leader == UsersRecord.user_id
+        ).label("is_club_rep")
+    ).outerjoin(
+        UserRolesRecord, UserRolesRecord.user_id == UsersRecord.user_id
+    ).outerjoin(
+        RolesRecord, UserRolesRecord.role_id == RolesRecord.role_id
+    ).outerjoin(
+        RolePermissionsRecord,
+        RolePermissionsRecord.role_id == RolesRecord.role_id
+    ).outerjoin(
+        PermissionsRecord,
+        PermissionsRecord.permission_id == RolePermissionsRecord.permissions_id
+    ).where(UsersRecord.email == username)
+
+    async with session_scope(session) as session:
+        result = await session.execute(query)
+        rows = result.all()
+
+    if len(rows) == 0:
+        return None
+
+    first = rows[0]
+    roles = {}
+    permissions = set()
+    for row in rows:
+        if row.role_id is not None:
+            roles[row.role_id] = row.role_name
+        if row.permission is not None:
+            permissions.add(row.permission)
+
+    return {
+        "user_id": first.user_id,
+        "name": first.name,
+        "email": username,
+        "password": first.password,
+        "status": first.status,
+        "auth_version": first.auth_version,
+        "roles": roles,
+        "permissions": permissions,
+        "is_club_rep": bool(first.is_club_rep),
+    }
+
+
+async def select_user_role_ids(
+        username: str, session: AsyncSession | None = None
+) -> dict | None:
+    """User record and its role ids, roles themselves come from the catalog"""
+    query = select(
+        UsersRecord, UserRolesRecord.role_id
+    ).outerjoin(
+        UserRolesRecord, UserRolesRecord.user_id == UsersRecord.user_id
+    ).where(UsersRecord.email == username)
+
+    async with session_scope(session) as session:
+        result = await session.execute(query)
+        rows = result.all()
+
+    if len(rows) == 0:
+        return None
+
+    return {
+        "user": rows[0][0],
+        "role_ids": [row[1] for row in rows if row[1] is not None]
+    }
+
+
+async def select_user_by_id(
+        user_id: int, session: AsyncSession | None = None
+) -> dict | None:
     query = select(
         UsersRecord, UserRolesRecord, RolesRecord, RolePermissionsRecord,
         PermissionsRecord
@@ -85,38 +175,37 @@ async def select_user_by_id(user_id: int) -> dict | None:
     user_roles = {}
     role_permissions = {}
 
-    async with async_session() as session:
-        async with session.begin():
-            result = await session.execute(query)
-
-            if not result:
-                return
-
-            rows = result.all()
-
-            user_record = rows[0][0]
-
-            for row in rows:
-                # UsersRecord, UserRolesRecord, RolesRecord, RolePermissionsRecord, PermissionsRecord
-                user_role_record = row[1]
-                role_record = row[2]
-                role_permissions_record = row[3]
-                permissions_record = row[4]
-
-                if role_record:
-                    roles.update({role_record.role_id: role_record})
-                if user_role_record:
-                    user_roles.update({
-                        user_role_record.id: user_role_record
-                    })
-                if permissions_record:
-                    permissions.update({
-                        permissions_record.permission_id: permissions_record
-                    })
-                if role_permissions_record:
-                    role_permissions.update({
-                        role_permissions_record.id: role_permissions_record
-                    })
+    async with session_scope(session) as session:
+        result = await session.execute(query)
+
+        if not result:
+            return
+
+        rows = result.all()
+
+        user_record = rows[0][0]
+
+        for row in rows:
+            # UsersRecord, UserRolesRecord, RolesRecord, RolePermissionsRecord, PermissionsRecord
+            user_role_record = row[1]
+            role_record = row[2]
+            role_permissions_record = row[3]
+            permissions_record = row[4]
+
+            if role_record:
+                roles.update({role_record.role_id: role_record})
+            if user_role_record:
+                user_roles.update({
+                    user_role_record.id: user_role_record
+                })
+            if permissions_record:
+                permissions.update({
+                    permissions_record.permission_id: permissions_record
+                })
+            if role_permissions_record:
+                role_permissions.update({
+                    role_permissions_record.id: role_permissions_record
+                })
 
     return {
         "user": user_record,
@@ -127,15 +216,87 @@ async def select_user_by_id(user_id: int) -> dict | None:
     }
 
 
-async def select_users(start, limit):
+async def select_users(start, limit, session: AsyncSession | None = None):
     query = select(
         UsersRecord
     ).where(
         UsersRecord.user_id >= start
     ).limit(limit).order_by(asc(UsersRecord.user_id))
 
-    async with async_session() as session:
-        async with session.begin():
-            result = await session.execute(query)
+    async with session_scope(session) as session:
+        result = await session.execute(query)
+
+        return result.scalars().all()
+
+
+async def select_user_directory(session: AsyncSession | None = None):
+    """id, name, email and status of every user, no password hashes"""
+    query = select(
+        UsersRecord.user_id,
+        UsersRecord.name,
+        UsersRecord.email,
+        UsersRecord.status
+    ).order_by(asc(UsersRecord.user_id))
+
+    async with session_scope(session) as session:
+        result = await session.execute(query)
+        return result.all()
+
+
+async def select_auth_versions(
+        session: AsyncSession | None = None
+) -> dict[int, int]:
+    """Users never revoked keep version 0 and are left out"""
+    query = select(
+        UsersRecord.user_id, UsersRecord.auth_version
+    ).where(
+        UsersRecord.auth_version > 0
+    )
+
+    async with session_scope(session) as session:
+        result = await session.execute(query)
+        return {user_id: version for user_id, version in result.all()}
+
+
+async def bump_user_auth_version(
+        user_id: int, session: AsyncSession | None = None
+) -> None:
+    query = update(
+        UsersRecord
+    ).values(
+        auth_version=UsersRecord.auth_version + 1
+    ).where(
+        UsersRecord.user_id == user_id
+    )
+    await execute_safely(query, session=session)
+
 
-            return result.scalars().all()
+async def bump_role_auth_versions(
+        role_id: int, session: AsyncSession | None = None
+) -> None:
+    role_users = select(
+        UserRolesRecord.user_id
+    ).where(
+        UserRolesRecord.role_id == role_id
+    )
+    query = update(
+        UsersRecord
+    ).values(
+        auth_version=UsersRecord.auth_version + 1
+    ).where(
+        UsersRecord.user_id.in_(role_users)
+    )
+    await execute_safely(query, session=session)
+
+
+async def update_user_password(
+        user_id: int, password_hash: str, session: AsyncSession | None = None
+) -> None:
+    query = update(
+        UsersRecord
+    ).values(
+        password=password_hash
+    ).where(
+        UsersRecord.user_id == user_id
+    )
+    await execute_safely(query, session=session)
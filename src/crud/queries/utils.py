@@ -1,69 +1,66 @@
 from fastapi import HTTPException
 from sqlalchemy.exc import IntegrityError, DataError
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.crud.engine import async_session
+from src.crud.session import session_scope, read_scope, pin_primary
 
 
-async def add_object(record) -> None:
+async def add_object(record, session: AsyncSession | None = None) -> None:
+    pin_primary()
     try:
-        async with async_session() as session:
-            async with session.begin():
-                session.add(record)
-                await session.commit()
+        async with session_scope(session) as session:
+            session.add(record)
+            await session.flush()
     except (IntegrityError, DataError) as e:
         code = e.orig.args[0]
         message = e.orig.args[1]
         raise HTTPException(status_code=422, detail=message)
 
 
-async def execute_safely(query):
-    async with async_session() as session:
-        async with session.begin():
-            try:
-                await session.execute(query)
-            except (DataError, IntegrityError) as e:
-                raise HTTPException(status_code=422, detail=e.orig.args[1])
+async def execute_safely(query, session: AsyncSession | None = None):
+    pin_primary()
+    async with session_scope(session) as session:
+        try:
+            await session.execute(query)
+        except (DataError, IntegrityError) as e:
+            raise HTTPException(status_code=422, detail=e.orig.args[1])
 
-            await session.commit()
 
+async def delete_record(record, session: AsyncSession | None = None):
+    pin_primary()
+    async with session_scope(session) as session:
+        try:
+            await session.delete(record)
+            await session.flush()
+        except (DataError, IntegrityError) as e:
+            raise HTTPException(status_code=422, detail=e.orig.args[1])
 
-async def delete_record(record):
-    async with async_session() as session:
-        async with session.begin():
-            try:
-                await session.delete(record)
-            except (DataError, IntegrityError) as e:
-                raise HTTPException(status_code=422, detail=e.orig.args[1])
 
-
-async def add_objects(records) -> None:
+async def add_objects(records, session: AsyncSession | None = None) -> None:
+    pin_primary()
     try:
-        async with async_session() as session:
-            async with session.begin():
-                session.add_all(records)
-                await session.commit()
+        async with session_scope(session) as session:
+            session.add_all(records)
+            await session.flush()
     except (IntegrityError, DataError) as e:
         code = e.orig.args[0]
         message = e.orig.args[1]
         raise HTTPException(status_code=422, detail=message)
 
 
-async def scalar_selection(query):
-    async with async_session() as session:
-        async with session.begin():
-            result = await session.execute(query)
-            return result.scalar()
+async def scalar_selection(query, session: AsyncSession | None = None):
+    async with read_scope(session) as session:
+        result = await session.execute(query)
+        return result.scalar()
 
 
-async def scalars_selection(query):
-    async with async_session() as session:
-        async with session.begin():
-            result = await session.execute(query)
-            return result.scalars()
+async def scalars_selection(query, session: AsyncSession | None = None):
+    async with read_scope(session) as session:
+        result = await session.execute(query)
+        return result.scalars()
 
 
-async def all_selection(query):
-    async with async_session() as session:
-        async with session.begin():
-            result = await session.execute(query)
-            return result.all()
+async def all_selection(query, session: AsyncSession | None = None):
+    async with read_scope(session) as session:
+        result = await session.execute(query)
+        return result.all()
@@ -0,0 +1,133 @@
+import logging
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Annotated, AsyncIterator, Callable
+
+from fastapi import Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from src.crud.engine import async_session, replica_session
+
+logger = logging.getLogger("Session")
+
+class _PrimaryPin:
+    """Set once a request writes, its later reads then skip the replica"""
+    __slots__ = ("pinned",)
+
+    def __init__(self):
+        self.pinned = False
+
+
+# holds a mutable pin so tasks spawned by the request see it being set
+_primary_pin: ContextVar[_PrimaryPin | None] = ContextVar(
+    "primary_pin", default=None
+)
+
+
+class PrimaryPinMiddleware:
+    """Gives every request its own read-your-writes pin"""
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        token = _primary_pin.set(_PrimaryPin())
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _primary_pin.reset(token)
+
+
+def pin_primary() -> None:
+    """Route the rest of the current request's reads to the primary"""
+    pin = _primary_pin.get()
+    if pin is not None:
+        pin.pinned = True
+
+
+def _is_pinned() -> bool:
+    pin = _primary_pin.get()
+    return pin is not None and pin.pinned
+
+
+def after_commit(
+        session: AsyncSession | None, callback: Callable[[], None]
+) -> None:
+    """
+    Run a callback once the unit of work of a session has committed, for
+    in memory state that must not get ahead of the database. Dropped if
+    it rolls back.
+    :param session: session of the surrounding unit of work, None when the
+        work is already committed, the callback then runs right away
+    :param callback: called without arguments
+    """
+    if session is None:
+        callback()
+        return
+    session.info.setdefault("after_commit", []).append(callback)
+
+
+def _run_after_commit(session: AsyncSession) -> None:
+    for callback in session.info.pop("after_commit", []):
+        try:
+            callback()
+        except Exception as e:
+            logger.error(f"After commit callback error: {e}", exc_info=True)
+
+
+async def get_session() -> AsyncIterator[AsyncSession]:
+    """
+    Request scoped unit of work, every query of the request shares one
+    connection and transaction. Commits once the endpoint returns, rolls
+    back if it raises.
+    """
+    pin_primary()
+    async with async_session() as session:
+        async with session.begin():
+            yield session
+        _run_after_commit(session)
+
+
+@asynccontextmanager
+async def session_scope(
+        session: AsyncSession | None = None
+) -> AsyncIterator[AsyncSession]:
+    """
+    Session for a query helper, the caller's when given so the work joins
+    its transaction, otherwise a short lived one committed on exit
+    :param session: session of the surrounding unit of work, if any
+    """
+    if session is not None:
+        yield session
+        return
+
+    async with async_session() as session:
+        async with session.begin():
+            yield session
+        _run_after_commit(session)
+
+
+@asynccontextmanager
+async def read_scope(
+        session: AsyncSession | None = None
+) -> AsyncIterator[AsyncSession]:
+    """
+    Like session_scope but for read only helpers, served by the replica
+    unless the request already wrote
+    :param session: session of the surrounding unit of work, if any
+    """
+    if session is not None:
+        yield session
+        return
+
+    factory = async_session if _is_pinned() else replica_session
+    async with factory() as session:
+        async with session.begin():
+            yield session
+
+
+SessionDep = Annotated[AsyncSession, Depends(get_session)]
@@ -4,19 +4,24 @@ from typing import Annotated, List
 from fastapi import APIRouter, Security, HTTPException
 from fastapi.params import Param, Path
 from sqlalchemy import update, and_, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from src.crud.models import AccountsRecord, CardsRecord
 from src.crud.queries.accounts import (
     select_account, select_half_account, select_half_accounts,
-    select_last_entered_account, select_full_account, select_club_accounts
+    select_last_entered_account, select_full_account, select_club_accounts,
+    credit_account
 )
 from src.crud.queries.clubs import select_leader_clubs, select_club_with_accounts, select_club_by_id
+from src.crud.queries.ledger import select_statement
 from src.crud.queries.utils import add_object, execute_safely, scalar_selection
-from src.schema.accounts import Account, TopUp
+from src.schema.accounts import Account, TopUp, Statement
 from src.schema.clubs import Club
 from src.schema.factories.account_factory import AccountsFactory
 from src.schema.factories.club_factories import ClubFactory
 from src.schema.users import User
 from src.security.security import get_current_active_user
+from src.utils.money import to_minor
+from src.utils.serials import batch_references
 from src.endpoints.accounts.cards import router as cards
 
 router = APIRouter(prefix="/accounts", tags=["Accounts"])
@@ -31,7 +36,8 @@ def get_initials(name: str):
 
 
 async def update_club_account_uid(
-        name: str, entity_id: int, entity_type: str
+        name: str, entity_id: int, entity_type: str,
+        session: AsyncSession | None = None
 ) -> Account | None:
     query = select(
         AccountsRecord
@@ -42,7 +48,7 @@ async def update_club_account_uid(
         )
     )
     # name = Hello, entity_id = 28, entity_type = USER
-    new_record = await scalar_selection(query)
+    new_record = await scalar_selection(query, session=session)
 
     if new_record is None:
         return
@@ -64,7 +70,7 @@ async def update_club_account_uid(
     ).values(
         account_uid=uid
     ).where(AccountsRecord.id == _account.id)
-    await execute_safely(_query)
+    await execute_safely(_query, session=session)
 
     return _account
 
@@ -84,6 +90,25 @@ async def get_account(
     return AccountsFactory.get_half_account(record)
 
 
+@router.get("/account/statement", status_code=200)
+async def get_account_statement(
+        current_user: Annotated[
+            User, Security(get_current_active_user, scopes=["read:accounts"])
+        ],
+        account_id: int,
+        start: Annotated[int, Param(title="Ledger ID to start from", ge=1)],
+        limit: Annotated[int, Param(title="Amount of entries to fetch", ge=1)]
+) -> Statement:
+    """Ledger entries of an account with the balance after each one"""
+    record = await select_half_account(account_id)
+
+    if not record:
+        raise HTTPException(404, "Account not found")
+
+    opening, records = await select_statement(account_id, start, limit)
+    return AccountsFactory.get_statement(account_id, opening, records)
+
+
 @router.patch("/club/account", status_code=201, tags=["Unfinished"])
 async def update_account_discount(
         current_user: Annotated[
@@ -375,14 +400,11 @@ async def club_top_up(
     card = AccountsFactory.get_card(record)
     card_input = AccountsFactory.get_card_input(card, top_up.user_password)
 
-    update_query = update(
-        AccountsRecord
-    ).values(
-        balance=AccountsRecord.balance + top_up.amount
-    ).where(
-        AccountsRecord.id == top_up.account_id
-    )
-    await execute_safely(update_query)
+    if not await credit_account(
+            top_up.account_id, to_minor(top_up.amount), "TOP-UP",
+            await batch_references.next()
+    ):
+        raise HTTPException(404, "Account not found")
 
     record = await select_half_account(top_up.account_id)
     if not record:
@@ -13,13 +13,16 @@ from src.crud.queries.utils import add_object, execute_safely
 from src.schema.accounts import Card, CardInput
 from src.schema.factories.account_factory import AccountsFactory
 from src.schema.users import User
-from src.security.security import get_current_active_user, get_password_hash, verify_password
+from src.security.security import (
+    get_current_active_user, verify_password_async, get_user_password_hash
+)
 
 router = APIRouter(prefix="/cards", tags=["Cards"])
 
 
-def _check_password(entered_password: str, password_on_db: str):
-    if not verify_password(entered_password, password_on_db):
+async def _check_password(entered_password: str, user: User):
+    password_on_db = await get_user_password_hash(user)
+    if not await verify_password_async(entered_password, password_on_db):
         raise HTTPException(
             422, "Password on database doesnt match with entered password"
         )
@@ -61,7 +64,7 @@ async def create_card(
         ],
         card_input: CardInput
 ):
-    _check_password(card_input.user_password, current_user.password)
+    await _check_password(card_input.user_password, current_user)
     card = card_input.card()
 
     await validate_account(
@@ -94,7 +97,7 @@ async def update_club_card(
         ],
         card_input: CardInput
 ):
-    _check_password(card_input.user_password, current_user.password)
+    await _check_password(card_input.user_password, current_user)
 
     await validate_account(
         current_user,
@@ -147,7 +150,7 @@ async def get_card(
         ],
         card_id: int, user_password: str
 ):
-    _check_password(user_password, current_user.password)
+    await _check_password(user_password, current_user)
     card = await validate_account(
         current_user,
         card_id,
@@ -173,7 +176,7 @@ async def get_club_cards(
         ],
     user_password: str, club_id: int
 ):
-    _check_password(user_password, current_user.password)
+    await _check_password(user_password, current_user)
     clubs = await select_leader_clubs(current_user.id)
     try:
         clubs[club_id]
@@ -205,7 +208,7 @@ async def get_user_cards(
         ],
     user_password: str,
 ):
-    _check_password(user_password, current_user.password)
+    await _check_password(user_password, current_user)
     records = await select_user_cards(current_user.id)
     cards = AccountsFactory.get_cards(records)
     try:
@@ -1,28 +1,40 @@
-import asyncio
-from collections import Counter, defaultdict
-from datetime import datetime, timedelta
-from typing import Annotated, Dict, List
+from collections import Counter
+from datetime import date, datetime, timedelta
+from typing import Annotated, Dict, List, Literal
 
-from fastapi import APIRouter, Security, HTTPException, Path
-from sqlalchemy import select, update, text, and_, func, delete
+from fastapi import (
+    APIRouter, Security, HTTPException, Path, Header, Response
+)
+from fastapi.params import Param
+from sqlalchemy import select, and_, func, delete
 
 from src.crud.models import (
-    BookingsRecord, AccountsRecord, PersonTypesRecord, SchedulesRecord, HallsRecord, SeatLocksRecord, FilmsRecord
+    BookingsRecord, AccountsRecord, PersonTypesRecord, SchedulesRecord, HallsRecord, SeatLocksRecord
 )
-from src.crud.queries.accounts import select_account
+from src.crud.queries.accounts import select_account, debit_account
 from src.crud.queries.bookings import (
-    select_booking, select_batches, select_batch
+    select_booking, select_batches, select_batch, save_bookings,
+    select_account_report
 )
 from src.crud.queries.clubs import select_leader_clubs
-from src.crud.queries.utils import scalars_selection, scalar_selection, add_object, execute_safely, all_selection
+from src.crud.queries.sales import select_film_sales, select_sales_rollups
+from src.crud.queries.utils import scalars_selection, scalar_selection
+from src.crud.session import SessionDep, after_commit
 from src.endpoints.bookings._utils import validate_seat_per_hall
 from src.endpoints.bookings.clubs import router as clubs_router
 from src.endpoints.bookings.person_types import router as persons
 from src.endpoints.bookings.users import router as users_router
-from src.schema.bookings import Booking, BatchData, SingleBooking, Reporting, SeatNoStr, SeatLock, FilmSalesReport
+from src.schema.bookings import Booking, BatchData, SingleBooking, Reporting, SeatNoStr, SeatLock, FilmSalesReport, \
+    SalesRollup, SeatMap
 from src.schema.factories.bookings_factory import BookingsFactory
 from src.schema.users import User
+from src.security.permissions import permission_registry
 from src.security.security import get_current_active_user
+from src.utils.money import apply_discount
+from src.utils.seat_maps import (
+    seat_maps, etag, encode_bitset, encode_runs, decode_seats
+)
+from src.utils.serials import booking_serials, batch_references
 
 router = APIRouter(prefix="/bookings", tags=["Bookings"])
 router.include_router(persons)
@@ -44,7 +56,9 @@ async def get_booking(
 
     booking = BookingsFactory.get_booking(records)
 
-    if "read:bookings" in current_user.permissions:
+    if permission_registry.allows(
+            current_user.permission_mask, ["read:bookings"]
+    ):
         return booking
 
     if booking.account.entity_type == "CLUB":
@@ -69,9 +83,11 @@ async def get_batch_bookings(
         current_user: Annotated[
             User, Security(get_current_active_user, scopes=["read:bookings"])
         ],
+        start: Annotated[int, Param(title="Range starting ID to get", ge=1)],
+        limit: Annotated[int, Param(title="Amount of resources to fetch", ge=1)]
 ) -> Dict[str, BatchData]:
     """returns batch data"""
-    return await select_batches()
+    return await select_batches(start, limit)
 
 
 @router.get("/batch/bookings/{batch_reference}", tags=["Unfinished"])
@@ -89,23 +105,61 @@ async def get_batch_bookings(
     return BookingsFactory.get_bookings(records)
 
 
-@router.get("/bookings/booked-seats/{schedule_id}", tags=["Unfinished"])
+@router.get(
+    "/bookings/booked-seats/{schedule_id}", tags=["Unfinished"],
+    deprecated=True
+)
 async def get_batch_bookings(
         current_user: Annotated[
             User, Security(get_current_active_user, scopes=[])
         ],
         schedule_id: int
 ) -> List[str]:
-    query = select(
-        BookingsRecord
-    ).where(
-        BookingsRecord.schedule_id == schedule_id
+    """
+    Seat numbers taken by active bookings or live seat locks. Superseded
+    by /bookings/seat-map/{schedule_id}, kept for older seat pickers.
+    """
+    bitmap = await seat_maps.get(schedule_id)
+    if bitmap is None:
+        return []
+    return decode_seats(bitmap, bitmap.taken())
+
+
+@router.get("/bookings/seat-map/{schedule_id}")
+async def get_seat_map(
+        current_user: Annotated[
+            User, Security(get_current_active_user, scopes=[])
+        ],
+        schedule_id: int,
+        response: Response,
+        encoding: Literal["bitset", "runs"] = "bitset",
+        if_none_match: Annotated[str | None, Header()] = None
+) -> SeatMap:
+    """
+    Booked and locked seats of a schedule, served from memory. Send the
+    ETag back as If-None-Match to get a 304 while nothing changed.
+    """
+    bitmap = await seat_maps.get(schedule_id)
+    if bitmap is None:
+        raise HTTPException(404, "Schedule not found")
+
+    taken = bitmap.taken()
+    tag = etag(taken, encoding)
+    if if_none_match == tag:
+        return Response(status_code=304, headers={"ETag": tag})
+    response.headers["ETag"] = tag
+
+    seat_map = SeatMap(
+        schedule_id=schedule_id,
+        no_of_rows=bitmap.no_of_rows,
+        seats_per_row=bitmap.seats_per_row,
+        encoding=encoding,
     )
-    records = await scalars_selection(query)
-
-    return [
-        record.seat_no for record in records
-    ]
+    if encoding == "bitset":
+        seat_map.bitset = encode_bitset(taken)
+    else:
+        seat_map.runs = encode_runs(taken, bitmap.size)
+    return seat_map
 
 
 @router.get("/bookings/batch-ref/{batch_ref}", tags=["Unfinished"])
@@ -131,22 +185,11 @@ async def get_account_bookings(
             User, Security(get_current_active_user, scopes=["read:reports"])
         ],
         account_id: int,
-):
-    query = select(
-        BookingsRecord
-    ).where(
-        BookingsRecord.account_id == account_id
-    )
-    records: List[BookingsRecord] = await scalars_selection(query)
-    monthly_data = defaultdict(Reporting)
-
-    for record in records:
-        timeframe = record.created.strftime("%m-%Y")
-        report = monthly_data[timeframe]
-        report.amount += record.amount
-        report.count += 1
-
-    return monthly_data
+        since: datetime | None = None,
+        until: datetime | None = None,
+) -> Dict[str, Reporting]:
+    """Monthly booking count and amount of an account"""
+    return await select_account_report(account_id, since, until)
 
 
 @router.post("/admin/booking/{cash}/")
@@ -155,7 +198,8 @@ async def create_admin_side_booking(
             User, Security(get_current_active_user, scopes=["write:bookings"])
         ],
         booking_request: SingleBooking,
-        cash: Annotated[int, Path(title="Is the customer paying by cash", ge=0, le=1)]
+        cash: Annotated[int, Path(title="Is the customer paying by cash", ge=0, le=1)],
+        session: SessionDep
 ):
     accounts_query = select(
         AccountsRecord
@@ -173,10 +217,11 @@ async def create_admin_side_booking(
         SchedulesRecord.schedule_id == booking_request.schedule_id
     )
 
-    account_record, person_type_record, schedule_record = await asyncio.gather(
-        select_account(accounts_query), scalar_selection(person_type_query),
-        scalar_selection(schedule_query)
+    account_record = await select_account(accounts_query, session=session)
+    person_type_record = await scalar_selection(
+        person_type_query, session=session
     )
+    schedule_record = await scalar_selection(schedule_query, session=session)
 
     if account_record is None:
         raise HTTPException(404, "Account not found")
@@ -198,7 +243,7 @@ async def create_admin_side_booking(
         HallsRecord.hall_id == schedule_record.hall_id
     )
 
-    hall_record = await scalar_selection(hall_query)
+    hall_record = await scalar_selection(hall_query, session=session)
 
     validate_seat_per_hall(booking_request.person.seat_no, hall_record)
 
@@ -207,34 +252,32 @@ async def create_admin_side_booking(
             422, "Cannot book for a past schedule"
         )
 
-    amount = schedule_record.ticket_price * (
-            (100 - person_type_record.discount_amount) / 100
+    amount = apply_discount(
+        schedule_record.ticket_price, person_type_record.discount_amount
     )
-    if not cash and account_record.balance - amount < 0:
+    batch_reference = await batch_references.next()
+    if not cash and not await debit_account(
+            account_record.id, amount, batch_reference, session=session
+    ):
         raise HTTPException(404, "Money not found")
 
     record = BookingsRecord(
         seat_no=booking_request.person.seat_no,
         schedule_id=booking_request.schedule_id,
         person_type_id=booking_request.person.person_type_id,
-        batch_ref=text("generate_unique_string()"),
+        serial_no=await booking_serials.next(),
+        batch_ref=batch_reference,
         amount=amount,
         assigned_user=booking_request.person.user_id,
         account_id=account_record.id,
     )
-    await add_object(record)
+    await save_bookings([record], session=session)
+    schedule_id, seats = record.schedule_id, [record.seat_no]
+    after_commit(session, lambda: seat_maps.book(schedule_id, seats))
     query = select(BookingsRecord).where(BookingsRecord.id == record.id)
-    booking = await scalar_selection(query)
-
-    records = await select_batch(booking.batch_ref)
+    booking = await scalar_selection(query, session=session)
 
-    if not cash:
-        query = update(
-            AccountsRecord
-        ).values(
-            balance=AccountsRecord.balance - amount
-        ).where(AccountsRecord.id == account_record.id)
-        asyncio.create_task(execute_safely(query))
+    records = await select_batch(booking.batch_ref, session=session)
 
     return BookingsFactory.get_bookings(records)[0]
 
@@ -244,23 +287,28 @@ async def get_sales_count(
         current_user: Annotated[
             User, Security(get_current_active_user, scopes=["read:reports"])
         ],
-        # count: int
+        since: date | None = None,
+        until: date | None = None,
 ) -> List[FilmSalesReport]:
-    query = select(
-        BookingsRecord, FilmsRecord
-    ).join(
-        SchedulesRecord, BookingsRecord.schedule_id == SchedulesRecord.schedule_id
-    ).join(
-        FilmsRecord, FilmsRecord.film_id == SchedulesRecord.film_id
-    )
-
-    records = await all_selection(query)
-    data = defaultdict(FilmSalesReport)
+    """Tickets sold and revenue per film between two sale days"""
+    rows = await select_film_sales(since, until)
+    return BookingsFactory.get_film_sales(rows)
 
-    for record in records:
-        report = data[record[1].film_id]
-        report.film_id = record[1].film_id
-        report.film_title = record[1].title
-        report.bookings += 1
 
-    return [v for k, v in data.items()]
+@router.get("/film/sales/")
+async def get_sales_rollups(
+        current_user: Annotated[
+            User, Security(get_current_active_user, scopes=["read:reports"])
+        ],
+        start: Annotated[int, Param(title="Range starting ID to get", ge=1)],
+        limit: Annotated[int, Param(title="Amount of resources to fetch", ge=1)],
+        since: date | None = None,
+        until: date | None = None,
+        film_id: int | None = None,
+        hall_id: int | None = None,
+) -> List[SalesRollup]:
+    """Daily tickets and revenue per film, hall and person type"""
+    records = await select_sales_rollups(
+        start, limit, since, until, film_id, hall_id
+    )
+    return BookingsFactory.get_sales_rollups(records)
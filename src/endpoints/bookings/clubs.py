@@ -5,19 +5,24 @@ from fastapi import APIRouter, Security, HTTPException
 from fastapi.params import Param
 from pydantic import EmailStr
 from src.crud.models import (
-    SchedulesRecord, PersonTypesRecord, BookingsRecord, AccountsRecord
+    SchedulesRecord, PersonTypesRecord, BookingsRecord
 )
+from src.crud.queries.accounts import debit_account
 from src.crud.queries.bookings import (
-    select_club_bookings, get_details, select_batch, select_booking
+    select_club_bookings, get_details, select_batch, select_booking,
+    save_bookings
 )
 from src.crud.queries.clubs import select_leader_clubs
-from src.crud.queries.utils import add_objects, execute_safely
+from src.crud.queries.utils import execute_safely
+from src.crud.session import SessionDep, after_commit
 from src.endpoints.bookings._utils import validate_seat_per_hall
 from src.schema.bookings import Booking, MultipleBookings
 from src.schema.factories.bookings_factory import BookingsFactory
 from src.schema.users import User
 from src.security.security import get_current_active_user
-from src.utils.utils import generate_random_string
+from src.utils.money import apply_discount
+from src.utils.seat_maps import seat_maps
+from src.utils.serials import booking_serials, batch_references
 
 router = APIRouter(prefix="/club", tags=["Clubs"])
 
@@ -49,9 +54,10 @@ async def create_club_bookings(
         current_user: Annotated[
             User, Security(get_current_active_user, scopes=[])
         ],
-        requests: MultipleBookings
+        requests: MultipleBookings,
+        session: SessionDep
 ) -> List[Booking]:
-    clubs = await select_leader_clubs(current_user.id)
+    clubs = await select_leader_clubs(current_user.id, session=session)
     try:
         clubs[requests.club_id]
     except KeyError:
@@ -61,12 +67,11 @@ async def create_club_bookings(
         )
 
     details = await get_details(
-        requests.club_id, "CLUB", requests.schedule_id
+        requests.club_id, "CLUB", requests.schedule_id, session=session
     )
 
     _persons = details["persons"]
     accounts = details["accounts"]
-    batches = details["batches"]
     members = details["club_members"]
     hall = details["halls"]
 
@@ -95,10 +100,7 @@ async def create_club_bookings(
     if account.status != "ENABLED":
         raise HTTPException(403, "Account is not enabled")
 
-    while True:
-        batch_reference = generate_random_string()
-        if batch_reference not in batches:
-            break
+    batch_reference = await batch_references.next()
 
     final_booking_records = []
     total = 0
@@ -127,15 +129,14 @@ async def create_club_bookings(
         if discount > 100:
             discount = 100
 
-        amount = schedule_record.ticket_price * (
-                (100 - discount) / 100
-        )
+        amount = apply_discount(schedule_record.ticket_price, discount)
         total += amount
 
         record = BookingsRecord(
             seat_no=request.seat_no,
             schedule_id=requests.schedule_id,
             person_type_id=request.person_type_id,
+            serial_no=await booking_serials.next(),
             batch_ref=batch_reference,
             amount=amount,
             account_id=account.id,
@@ -143,19 +144,18 @@ async def create_club_bookings(
         )
         final_booking_records.append(record)
 
-    if account.balance - total < 0:
+    if not await debit_account(
+            account.id, total, batch_reference, session=session
+    ):
         raise HTTPException(404, "Money not found")
 
-    await add_objects(final_booking_records)
-
-    query = update(
-        AccountsRecord
-    ).values(
-        balance=AccountsRecord.balance - total
-    ).where(AccountsRecord.id == account.id)
-    await execute_safely(query)
+    await save_bookings(final_booking_records, session=session)
+    seats = [x.seat_no for x in final_booking_records]
+    after_commit(
+        session, lambda: seat_maps.book(requests.schedule_id, seats)
+    )
 
-    records = await select_batch(batch_reference)
+    records = await select_batch(batch_reference, session=session)
     return BookingsFactory.get_bookings(records)
 
 
@@ -8,19 +8,23 @@ from sqlalchemy import update, select
 from src.crud.models import (
     PersonTypesRecord, SchedulesRecord, BookingsRecord, AccountsRecord
 )
+from src.crud.queries.accounts import debit_account
 from src.crud.queries.bookings import (
     select_user_bookings, get_details, select_batch, select_booking,
-    select_assigned_bookings
+    select_assigned_bookings, save_bookings
 )
 from src.crud.queries.utils import (
-    add_object, execute_safely, add_objects, scalar_selection, scalars_selection
+    execute_safely, scalar_selection, scalars_selection
 )
+from src.crud.session import SessionDep, after_commit
 from src.endpoints.bookings._utils import validate_seat_per_hall
 from src.schema.bookings import Booking, SingleBooking, MultipleBookings
 from src.schema.factories.bookings_factory import BookingsFactory
 from src.schema.users import User
 from src.security.security import get_current_active_user, EMAILS
-from src.utils.utils import generate_random_string
+from src.utils.money import apply_discount
+from src.utils.seat_maps import seat_maps
+from src.utils.serials import booking_serials, batch_references
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
@@ -43,17 +47,17 @@ async def create_user_bookings(
         current_user: Annotated[
             User, Security(get_current_active_user, scopes=[])
         ],
-        booking_request: SingleBooking
+        booking_request: SingleBooking,
+        session: SessionDep
 ) -> Booking:
     details = await get_details(
-        current_user.id, "USER", booking_request.schedule_id
+        current_user.id, "USER", booking_request.schedule_id, session=session
     )
 
     if details["schedules"] is None:
         raise HTTPException(404, "No schedule found")
 
     _persons = details["persons"]
-    batches = details["batches"]
     accounts: dict = details["accounts"]
     hall = details["halls"]
 
@@ -99,37 +103,32 @@ async def create_user_bookings(
             422, "Cannot book for a past schedule"
         )
 
-    while True:
-        batch_reference = generate_random_string()
-        if batch_reference not in batches:
-            break
+    batch_reference = await batch_references.next()
 
-    amount = schedule_record.ticket_price * (
-            (100 - person_record.discount_amount) / 100
+    amount = apply_discount(
+        schedule_record.ticket_price, person_record.discount_amount
     )
 
-    if account.balance - amount < 0:
+    if not await debit_account(
+            account.id, amount, batch_reference, session=session
+    ):
         raise HTTPException(404, "Money not found")
 
     record = BookingsRecord(
         seat_no=booking_request.person.seat_no,
         schedule_id=booking_request.schedule_id,
         person_type_id=booking_request.person.person_type_id,
+        serial_no=await booking_serials.next(),
         batch_ref=batch_reference,
         amount=amount,
         assigned_user=booking_request.person.user_id,
         account_id=account.id,
     )
-    await add_object(record)
+    await save_bookings([record], session=session)
+    schedule_id, seats = record.schedule_id, [record.seat_no]
+    after_commit(session, lambda: seat_maps.book(schedule_id, seats))
 
-    query = update(
-        AccountsRecord
-    ).values(
-        balance=AccountsRecord.balance - amount
-    ).where(AccountsRecord.id == account.id)
-    asyncio.create_task(execute_safely(query))
-
-    records = await select_batch(batch_reference)
+    records = await select_batch(batch_reference, session=session)
 
     return BookingsFactory.get_bookings(records)[0]
 
@@ -185,6 +184,7 @@ async def create_club_bookings(
             User, Security(get_current_active_user, scopes=[])
         ],
         requests: MultipleBookings,
+        session: SessionDep
 ) -> List[Booking]:
     cash = requests.cash
     schedule_record = select(
@@ -200,12 +200,13 @@ async def create_club_bookings(
     person_types_query = select(
         PersonTypesRecord
     )
-    schedule_record, account_record, person_types_records \
-        = await asyncio.gather(
-            scalar_selection(schedule_record),
-            scalar_selection(account_query),
-            scalars_selection(person_types_query)
-        )
+    schedule_record = await scalar_selection(
+        schedule_record, session=session
+    )
+    account_record = await scalar_selection(account_query, session=session)
+    person_types_records = await scalars_selection(
+        person_types_query, session=session
+    )
 
     person_types = {
         record.person_type_id: BookingsFactory.get_person_type(record)
@@ -220,11 +221,8 @@ async def create_club_bookings(
     price = schedule_record.ticket_price
     total = 0
 
-    if not cash and account_record.balance - total < 0:
-        raise HTTPException(422, "Money not found")
-
     booking_records = []
-    batch_reference = generate_random_string()
+    batch_reference = await batch_references.next()
     for booking in requests.bookings:
         try:
             person_type = person_types[booking.person_type_id]
@@ -234,11 +232,9 @@ async def create_club_bookings(
                 "Person type not found"
                 )
 
-        person_type_dc = price * (
-                1 - (person_type.discount_amount / 100)
-        )
-        after_account_dc = person_type_dc * (
-                1 - (account_record.discount_rate / 100)
+        person_type_dc = apply_discount(price, person_type.discount_amount)
+        after_account_dc = apply_discount(
+            person_type_dc, account_record.discount_rate
         )
         total += after_account_dc
 
@@ -248,22 +244,24 @@ async def create_club_bookings(
             account_id=requests.account_id,
             amount=after_account_dc,
             person_type_id=booking.person_type_id,
+            serial_no=await booking_serials.next(),
             batch_ref=batch_reference,
             assigned_user=booking.user_id
         )
         booking_records.append(record)
 
-    await add_objects(booking_records)
+    if not cash and not await debit_account(
+            account_record.id, total, batch_reference, session=session
+    ):
+        raise HTTPException(422, "Money not found")
 
-    if not cash:
-        query = update(
-            AccountsRecord
-        ).values(
-            balance=AccountsRecord.balance - total
-        ).where(AccountsRecord.id == account_record.id)
-        asyncio.create_task(execute_safely(query))
+    await save_bookings(booking_records, session=session)
+    seats = [x.seat_no for x in booking_records]
+    after_commit(
+        session, lambda: seat_maps.book(requests.schedule_id, seats)
+    )
 
-    records = await select_batch(batch_reference)
+    records = await select_batch(batch_reference, session=session)
     bookings = BookingsFactory.get_bookings(records)
     coro = EMAILS.send_booking_email(
         bookings,
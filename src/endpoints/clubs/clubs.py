@@ -3,6 +3,7 @@ from random import randint
 from typing import Annotated, List
 from fastapi.params import Param
 from sqlalchemy import update, delete, and_, select, or_
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import aliased
 
 from src.crud.models import ClubsRecord, AccountsRecord, ClubMembersRecords, CitiesRecord, UsersRecord
@@ -10,6 +11,7 @@ from src.crud.queries.accounts import select_club_accounts
 from src.crud.queries.clubs import select_club, select_leader_clubs, select_clubs, select_club_members, \
     select_club_by_id
 from src.crud.queries.utils import add_object, execute_safely, add_objects, scalar_selection, all_selection
+from src.crud.session import SessionDep
 from src.endpoints.accounts.accounts import get_initials, update_club_account_uid
 from src.endpoints.clubs.club_members import router as club_members
 from fastapi import APIRouter, Security, HTTPException
@@ -51,12 +53,15 @@ async def update_account_uids(club_id: int, new_name: str):
 
 
 async def _add_members(
-        members: List[User] | None, club_id: int, leader_id: int
+        members: List[User] | None, club_id: int, leader_id: int,
+        session: AsyncSession | None = None
 ) -> None:
     if not members:
         return
 
-    records: List[ClubMembersRecords] = await select_club_members(club_id)
+    records: List[ClubMembersRecords] = await select_club_members(
+        club_id, session=session
+    )
 
     members_in_record = set(record.member for record in records)
     members_in_request = set(member.id for member in members)
@@ -70,29 +75,16 @@ async def _add_members(
             "Wrong endpoint to delete leader"
         )
 
-    tasks = [
-        execute_safely(
-            delete(
-                ClubMembersRecords
-            ).where(
-                and_(
-                    ClubMembersRecords.club == club_id,
-                    ClubMembersRecords.member == member_id
-                )
+    if members_to_delete:
+        delete_query = delete(
+            ClubMembersRecords
+        ).where(
+            and_(
+                ClubMembersRecords.club == club_id,
+                ClubMembersRecords.member.in_(members_to_delete)
             )
-        ) for member_id in members_to_delete
-    ]
-    # delete_query = delete(
-    #     ClubMembersRecords
-    # ).where(
-    #     [
-    #         and_(
-    #             ClubMembersRecords.club == club_id,
-    #             ClubMembersRecords.member == member_id
-    #         )
-    #     ] for member_id in members_to_delete
-    # )
-
+        )
+        await execute_safely(delete_query, session=session)
     add_query = [
         ClubMembersRecords(
             member=member,
@@ -101,9 +93,7 @@ async def _add_members(
     ]
 
     if len(members_to_add):
-        tasks.append(add_objects(add_query))
-
-    await asyncio.gather(*tasks)
+        await add_objects(add_query, session=session)
 
 
 @router.post("/club", status_code=201, tags=["Unfinished"])
@@ -111,7 +101,8 @@ async def add_club(
         current_user: Annotated[
             User, Security(get_current_active_user, scopes=["write:clubs"])
         ],
-        club: Club
+        club: Club,
+        session: SessionDep
 ) -> Club:
     record = ClubsRecord(
         leader=club.leader.id,
@@ -125,9 +116,9 @@ async def add_club(
         email=club.email
     )
 
-    await add_object(record)
+    await add_object(record, session=session)
 
-    record = await select_club(club.club_name)
+    record = await select_club(club.club_name, session=session)
     club = ClubFactory.get_full_club(record)
 
     accounts_record = AccountsRecord(
@@ -149,7 +140,7 @@ async def add_club(
             club=club.id
         ) for member in club.members
     ])
-    await add_objects(records)
+    await add_objects(records, session=session)
 
     return club
 
@@ -159,7 +150,8 @@ async def admin_update_club(
         current_user: Annotated[
             User, Security(get_current_active_user, scopes=["write:clubs"])
         ],
-        club: Club
+        club: Club,
+        session: SessionDep
 ) -> Club:
     query = update(
         ClubsRecord
@@ -187,15 +179,13 @@ async def admin_update_club(
         )
     )
 
-    tasks = [
-        _add_members(club.members, club.id, club.leader.id),
-        execute_safely(query),
-        execute_safely(uid_update)
-    ]
-
-    await asyncio.gather(*tasks)
+    await _add_members(
+        club.members, club.id, club.leader.id, session=session
+    )
+    await execute_safely(query, session=session)
+    await execute_safely(uid_update, session=session)
 
-    record = await select_club(club.club_name)
+    record = await select_club(club.club_name, session=session)
     return ClubFactory.get_full_club(record)
 
 
@@ -204,10 +194,11 @@ async def update_club(
         current_user: Annotated[
             User, Security(get_current_active_user, scopes=[])
         ],
-        club: Club
+        club: Club,
+        session: SessionDep
 ) -> Club:
 
-    clubs = await select_leader_clubs(current_user.id)
+    clubs = await select_leader_clubs(current_user.id, session=session)
     try:
         old_club = clubs[club.id][0]
     except KeyError:
@@ -229,13 +220,12 @@ async def update_club(
         ClubsRecord.id == club.id
     )
 
-    tasks = [
-        _add_members(club.members, club.id, club.leader.id),
-        execute_safely(query)
-    ]
-    await asyncio.gather(*tasks)
+    await _add_members(
+        club.members, club.id, club.leader.id, session=session
+    )
+    await execute_safely(query, session=session)
 
-    record = await select_club(club.club_name)
+    record = await select_club(club.club_name, session=session)
 
     if old_club.club_name != club.club_name:
         uid_update = update(
@@ -248,7 +238,7 @@ async def update_club(
                 AccountsRecord.entity_type == "CLUB"
             )
         )
-        asyncio.create_task(execute_safely(uid_update))
+        await execute_safely(uid_update, session=session)
 
     return ClubFactory.get_full_club(record)
 
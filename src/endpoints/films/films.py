@@ -11,7 +11,7 @@ from src.crud.models import FilmsRecord, SchedulesRecord, HallsRecord
 from src.crud.queries.films import (
     select_film, select_films, select_film_schedules, select_film_by_id
 )
-from src.crud.queries.utils import add_object, execute_safely, all_selection, scalars_selection
+from src.crud.queries.utils import add_object, execute_safely, all_selection
 from src.endpoints.films.halls import router as halls
 from src.schema.factories.film_factories import FilmFactory
 from src.schema.films import Film, ScheduleDetailed
@@ -19,6 +19,7 @@ from src.schema.users import User
 from src.security.security import get_current_active_user
 from src.endpoints.films.film_images import router as images
 from src.endpoints.films.schedules import router as schedules
+from src.utils.search import film_search
 from src.utils.utils import str_to_iso_format
 
 router = APIRouter(prefix="/films", tags=["Films"])
@@ -65,6 +66,7 @@ async def create_film(
 
     await add_object(record)
     records = await select_film(film.title)
+    film_search.add(FilmFactory.get_half_film(records["film"]))
 
     return FilmFactory.get_full_film(records)
 
@@ -98,6 +100,7 @@ async def update_film(
             404, "Film not found"
         )
 
+    film_search.add(FilmFactory.get_half_film(records["film"]))
     return FilmFactory.get_full_film(records)
 
 
@@ -206,13 +209,14 @@ async def get_schedules_by_film_id(
 
 
 @router.get("/search/{string}/")
-async def search_films(string: str):
-    query = select(FilmsRecord)
-    records = await scalars_selection(query)
-
-    films = FilmFactory.get_half_films(records)
-
-    string = string.lower()
-    return [
-        x for x in films if string in x.title or string in x.trailer_desc
-    ]
+async def search_films(
+        string: str,
+        limit: Annotated[
+            int, Param(title="Amount of results to fetch", ge=1, le=100)
+        ] = 20,
+        offset: Annotated[
+            int, Param(title="Amount of best results to skip", ge=0)
+        ] = 0,
+) -> List[Film]:
+    """Films ranked by how well their title and trailer match"""
+    return film_search.search(string, limit, offset)
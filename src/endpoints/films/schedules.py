@@ -1,72 +1,71 @@
 import asyncio
-import datetime
+import bisect
 from collections import defaultdict
 from datetime import timedelta, timezone
 from typing import Annotated
 from fastapi import APIRouter, Security, HTTPException
 from fastapi.params import Param
 from icecream import ic
-from sqlalchemy import delete, update, select, func, and_
+from sqlalchemy import delete, update, select, and_
+from sqlalchemy.ext.asyncio import AsyncSession
 from src.crud.models import SchedulesRecord, HallsRecord, FilmsRecord, SeatLocksRecord, BookingsRecord, AccountsRecord, \
     PersonTypesRecord
 from src.crud.queries.films import (
     select_inserted_schedules, select_schedule, select_schedules,
-    select_all_schedules, select_film_by_id
+    select_film_by_id, select_conflicting_schedules, CLEANING_GAP,
+    select_films_by_ids, select_halls_by_ids, insert_schedules
 )
+from src.crud.queries.bookings import SEAT_LOCK_DURATION, seat_lock_cutoff
 from src.crud.queries.utils import add_object, execute_safely, scalar_selection, all_selection
 from src.schema.bookings import SeatNoStr, SeatLock, BatchBookings
 from src.schema.factories.bookings_factory import BookingsFactory
 from src.schema.factories.film_factories import FilmFactory
-from src.schema.films import Schedule, Film
+from src.crud.session import SessionDep
+from src.schema.films import (
+    Schedule, Film, BulkSchedules, BulkScheduleError, BulkScheduleResult
+)
 from src.schema.users import User
 from src.security.security import get_current_active_user
+from src.utils.money import to_minor
+from src.utils.seat_maps import seat_maps
 
 router = APIRouter(prefix="/schedules", tags=["Schedules"])
 
-_tzinfo = timezone(timedelta(hours=5, minutes=30))
+# most shows one bulk request may ask for
+BULK_SCHEDULES_LIMIT = 2000
 
 
 def _get_timings(schedule: Schedule, duration: int):
-    start = datetime.datetime(
-        tzinfo=_tzinfo,
-        year=schedule.show_time.year,
-        month=schedule.show_time.month,
-        day=schedule.show_time.day,
-        minute=schedule.show_time.minute,
-        second=schedule.show_time.second,
-        hour=schedule.show_time.hour
-    )
-    end = start + timedelta(seconds=duration, minutes=15)
+    """Wall clock start and end of a show, cleaning gap included"""
+    start = schedule.show_time.replace(tzinfo=None)
+    end = start + timedelta(seconds=duration) + CLEANING_GAP
 
     return start, end
 
 
-async def _check_time_conflicts(new_schedule: Schedule):
+async def _check_time_conflicts(
+        new_schedule: Schedule, duration: int,
+        session: AsyncSession | None = None
+):
     """
-    Check for time conflicts in schedules
+    Check for time conflicts with the other shows of the same hall
     Args:
         new_schedule: the new schedule
+        duration: running time of its film in seconds
+        session: the writing unit of work, so the check reads the primary
 
     Returns: true none, raises 422 if conflict
     """
-    records = await select_all_schedules()
-    schedules = FilmFactory.get_detailed_schedules(records)
-
-    _film_record = await select_film_by_id(new_schedule.film_id)
-    _film = FilmFactory.get_half_film(_film_record["film"])
-    this_start, this_end = _get_timings(new_schedule, _film.duration_sec)
-
-    for schedule in schedules:
-        that_start, that_end = _get_timings(schedule, schedule.film.duration_sec)
-        if (
-                that_start <= this_start <= that_end
-        ) or (
-                that_start <= this_end <= that_end
-        ):
-            raise HTTPException(
-                422,
-                f"Time Conflict with schedule ID {schedule.id}"
-            )
+    this_start, this_end = _get_timings(new_schedule, duration)
+    conflicts = await select_conflicting_schedules(
+        new_schedule.hall_id, this_start, this_end, session=session
+    )
+
+    if conflicts:
+        raise HTTPException(
+            422,
+            f"Time Conflict with schedule ID {conflicts[0][0].schedule_id}"
+        )
 
 
 @router.post("/schedule", status_code=201, tags=["Unfinished"])
@@ -74,9 +73,12 @@ async def create_schedule(
         current_user: Annotated[
             User, Security(get_current_active_user, scopes=["write:schedules"])
         ],
-        schedule: Schedule
+        schedule: Schedule,
+        session: SessionDep
 ):
-    film_record: FilmsRecord = await select_film_by_id(schedule.film_id)
+    film_record: FilmsRecord = await select_film_by_id(
+        schedule.film_id, session=session
+    )
 
     if not film_record:
         raise HTTPException(
@@ -101,21 +103,152 @@ async def create_schedule(
         film_id=schedule.film_id,
         show_time=schedule.show_time,
         on_schedule=schedule.on_schedule,
-        ticket_price=schedule.ticket_price,
+        ticket_price=to_minor(schedule.ticket_price),
     )
 
-    _check = await _check_time_conflicts(schedule)
+    _check = await _check_time_conflicts(
+        schedule, _film.duration_sec, session=session
+    )
 
-    await add_object(record)
+    await add_object(record, session=session)
 
     showtime = schedule.show_time.strftime("%Y-%m-%d %H:%M:%S")
 
     records = await select_inserted_schedules(
-        record.film_id, record.hall_id, showtime
+        record.film_id, record.hall_id, showtime, session=session
     )
     return FilmFactory.get_detailed_schedule(records)
 
 
+def _sweep_hall(candidates: list, existing: list) -> dict:
+    """
+    Conflicts of new shows in one hall, with its existing shows and with
+    each other, in one pass over the shows sorted by start. Shows are
+    accepted first come first served by start time, a rejected show does
+    not block later ones.
+    Args:
+        candidates: (start, end, index) of each new show
+        existing: (start, end, schedule_id) of the hall's shows in range
+
+    Returns: index -> error detail of every rejected show
+    """
+    existing = sorted(existing)
+    starts = [x[0] for x in existing]
+    # latest end among existing[:i + 1] and the schedule owning it
+    reach = []
+    for start, end, schedule_id in existing:
+        if not reach or end > reach[-1][0]:
+            reach.append((end, schedule_id))
+        else:
+            reach.append(reach[-1])
+
+    rejected = {}
+    accepted_end, accepted_index = None, None
+    for start, end, index in sorted(candidates):
+        # existing shows starting before this one ends, any reaching past
+        # its start overlaps
+        before = bisect.bisect_right(starts, end)
+        if before and reach[before - 1][0] >= start:
+            rejected[index] = \
+                f"Time Conflict with schedule ID {reach[before - 1][1]}"
+        elif accepted_end is not None and accepted_end >= start:
+            rejected[index] = f"Time Conflict with item {accepted_index}"
+        elif accepted_end is None or end > accepted_end:
+            accepted_end, accepted_index = end, index
+
+    return rejected
+
+
+@router.post("/bulk", status_code=201, tags=["Unfinished"])
+async def create_schedules(
+        current_user: Annotated[
+            User, Security(get_current_active_user, scopes=["write:schedules"])
+        ],
+        request: BulkSchedules,
+        session: SessionDep
+) -> BulkScheduleResult:
+    """
+    Create many schedules at once, listed one by one or as recurrences.
+    Shows failing a check are left out and reported by their index in
+    the expanded list, the others are inserted in one statement.
+    """
+    items = request.expand()
+    if not items:
+        raise HTTPException(422, "No schedules given")
+    if len(items) > BULK_SCHEDULES_LIMIT:
+        raise HTTPException(
+            422, f"At most {BULK_SCHEDULES_LIMIT} schedules per request"
+        )
+
+    films = await select_films_by_ids(
+        [x.film_id for x in items], session=session
+    )
+    halls = await select_halls_by_ids(
+        [x.hall_id for x in items], session=session
+    )
+
+    errors = {}
+    by_hall = defaultdict(list)
+    for index, item in enumerate(items):
+        film_record = films.get(item.film_id)
+        if film_record is None:
+            errors[index] = "Film not found"
+            continue
+        if item.hall_id not in halls:
+            errors[index] = "Hall not found"
+            continue
+
+        _film: Film = FilmFactory.get_half_film(film_record)
+        on_air_from = _film.on_air_from.astimezone(tz=timezone.utc)
+        on_air_to = _film.on_air_to.astimezone(tz=timezone.utc)
+        show_time = item.show_time.astimezone(tz=timezone.utc)
+        if not on_air_from <= show_time <= on_air_to:
+            errors[index] = \
+                "Film is not active or not on air during this period"
+            continue
+
+        start, end = _get_timings(item, _film.duration_sec)
+        by_hall[item.hall_id].append((start, end, index))
+
+    for hall_id, candidates in by_hall.items():
+        conflicts = await select_conflicting_schedules(
+            hall_id,
+            min(x[0] for x in candidates),
+            max(x[1] for x in candidates),
+            session=session
+        )
+        existing = []
+        for record, duration in conflicts:
+            this_start = record.show_time
+            this_end = this_start + timedelta(seconds=duration) + CLEANING_GAP
+            existing.append((this_start, this_end, record.schedule_id))
+        errors.update(_sweep_hall(candidates, existing))
+
+    values = [
+        dict(
+            hall_id=item.hall_id,
+            film_id=item.film_id,
+            show_time=item.show_time.replace(tzinfo=None),
+            on_schedule=item.on_schedule,
+            ticket_price=to_minor(item.ticket_price),
+        ) for index, item in enumerate(items) if index not in errors
+    ]
+    records = await insert_schedules(values, session=session)
+
+    return BulkScheduleResult(
+        created=FilmFactory.get_schedules(records),
+        errors=[
+            BulkScheduleError(
+                index=index,
+                film_id=items[index].film_id,
+                hall_id=items[index].hall_id,
+                show_time=items[index].show_time,
+                detail=detail,
+            ) for index, detail in sorted(errors.items())
+        ]
+    )
+
+
 @router.patch("/schedule", status_code=201, tags=["Unfinished"])
 async def update_schedule(
         current_user: Annotated[
@@ -136,7 +269,7 @@ async def update_schedule(
         SchedulesRecord
     ).values(
         on_schedule=updated.on_schedule,
-        ticket_price=updated.ticket_price,
+        ticket_price=to_minor(updated.ticket_price),
     ).where(
         SchedulesRecord.schedule_id == schedule.id
     )
@@ -185,8 +318,7 @@ async def seat_lock(
             SeatLocksRecord.seat == seat,
             SeatLocksRecord.schedule_id == schedule_id,
             SeatLocksRecord.is_manually_closed == False,
-            SeatLocksRecord.created_at >= func.now() -
-            timedelta(minutes=5)
+            SeatLocksRecord.created_at >= seat_lock_cutoff()
         )
     )
 
@@ -205,6 +337,9 @@ async def seat_lock(
         user_id=user_id
     )
     await add_object(new_record)
+    seat_maps.lock(
+        schedule_id, new_record.id, seat, SEAT_LOCK_DURATION.total_seconds()
+    )
     return SeatLock(
         id=new_record.id,
         seat=new_record.seat,
@@ -233,6 +368,7 @@ async def seat_lock_release(
         SeatLocksRecord.id == seat_lock_id
     )
     asyncio.create_task(execute_safely(query))
+    seat_maps.release(seat_lock_id)
 
 
 @router.get("/booking/{schedule_id}/", tags=["Schedules", "Bookings"])
@@ -0,0 +1,56 @@
+from typing import Annotated
+from fastapi import APIRouter, Security
+from src.crud.engine import engine
+from src.schema.metrics import CacheStats, HashingStats, PoolStats
+from src.schema.users import User
+from src.security.security import (
+    get_current_active_user, principal_cache, hashing_pool, token_cache
+)
+from src.utils.seat_maps import seat_maps
+
+router = APIRouter(prefix="/metrics", tags=["Metrics"])
+
+
+@router.get("/principal-cache", status_code=200)
+async def get_principal_cache_stats(
+        current_user: Annotated[
+            User, Security(get_current_active_user, scopes=["read:metrics"])
+        ],
+) -> CacheStats:
+    return CacheStats(**principal_cache.stats())
+
+
+@router.get("/token-cache", status_code=200)
+async def get_token_cache_stats(
+        current_user: Annotated[
+            User, Security(get_current_active_user, scopes=["read:metrics"])
+        ],
+) -> CacheStats:
+    return CacheStats(**token_cache.stats())
+
+
+@router.get("/seat-map-cache", status_code=200)
+async def get_seat_map_cache_stats(
+        current_user: Annotated[
+            User, Security(get_current_active_user, scopes=["read:metrics"])
+        ],
+) -> CacheStats:
+    return CacheStats(**seat_maps.stats())
+
+
+@router.get("/hashing", status_code=200)
+async def get_hashing_stats(
+        current_user: Annotated[
+            User, Security(get_current_active_user, scopes=["read:metrics"])
+        ],
+) -> HashingStats:
+    return HashingStats(**hashing_pool.stats())
+
+
+@router.get("/pool", status_code=200)
+async def get_pool_stats(
+        current_user: Annotated[
+            User, Security(get_current_active_user, scopes=["read:metrics"])
+        ],
+) -> PoolStats:
+    return PoolStats(**engine.pool.stats())
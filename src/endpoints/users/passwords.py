@@ -11,7 +11,9 @@ from src.schema.users import (
     User, PasswordChange, ResetRequest, PasswordResetConfirmation
 )
 from src.security.security import (
-    get_current_active_user, verify_password, get_password_hash, EMAILS, otp
+    get_current_active_user, verify_password_async, get_password_hash_async,
+    EMAILS, otp,
+    invalidate_user_principal, get_user_password_hash
 )
 
 router = APIRouter(prefix="/passwords", tags=["Passwords"])
@@ -103,12 +105,13 @@ async def change_password(
         ],
         form: PasswordChange
 ):
-    if not verify_password(form.old_password, current_user.password):
+    password_hash = await get_user_password_hash(current_user)
+    if not await verify_password_async(form.old_password, password_hash):
         raise HTTPException(
             422, "Old password doesnt match with current password"
         )
 
-    new_password = get_password_hash(form.new_password)
+    new_password = await get_password_hash_async(form.new_password)
 
     query = update(
         UsersRecord
@@ -123,6 +126,7 @@ async def change_password(
     )
 
     await execute_safely(query)
+    await invalidate_user_principal(current_user.id)
 
 
 @router.post("/reset/request", status_code=204, tags=['Unfinished'])
@@ -160,7 +164,7 @@ async def password_reset_confirmation(form: PasswordResetConfirmation):
     ):
         raise HTTPException(422, "Invalid otp")
 
-    new_password = get_password_hash(form.new_password)
+    new_password = await get_password_hash_async(form.new_password)
 
     query = update(
         UsersRecord
@@ -210,3 +214,4 @@ async def password_reset_confirmation(form: PasswordResetConfirmation):
         execute_safely(query),
         execute_safely(card_delete_query)
     )
+    await invalidate_user_principal(users_record.user_id)
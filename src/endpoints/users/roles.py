@@ -2,63 +2,42 @@ import asyncio
 from typing import Annotated, List
 from fastapi import APIRouter, Security, HTTPException
 from fastapi.params import Param, Path
-from sqlalchemy import select, delete, and_
+from sqlalchemy import delete, and_
 from src.crud.models import (
-    RolesRecord, PermissionsRecord, RolePermissionsRecord, UserRolesRecord
-)
-from src.crud.queries.roles import (
-    select_roles, update_role_query
+    RolesRecord, RolePermissionsRecord, UserRolesRecord
 )
+from src.crud.queries.roles import update_role_query
 from src.crud.queries.user import select_user_by_id
 from src.crud.queries.utils import (
     add_object, execute_safely, add_objects
 )
-from src.schema.factories.role_factory import RoleFactory
 from src.schema.factories.user_factory import UserFactory
 from src.schema.users import User, Role, Permission
-from src.security.security import get_current_active_user
+from src.security.security import (
+    get_current_active_user, invalidate_user_principal,
+    invalidate_role_principals
+)
+from src.security.role_catalog import role_catalog
 
 router = APIRouter(prefix="/roles", tags=["Roles"])
 
 
-async def _get_role_by_name(role_name: str) -> Role:
-    query = select(
-        RolesRecord, RolePermissionsRecord, PermissionsRecord
-    ).outerjoin(
-        RolePermissionsRecord,
-        RolePermissionsRecord.role_id == RolesRecord.role_id
-    ).outerjoin(
-        PermissionsRecord,
-        PermissionsRecord.permission_id == RolePermissionsRecord.permissions_id
-    ).where(RolesRecord.role_name == role_name)
-
-    _map = await select_roles(query)
+def _get_role_by_name(role_name: str) -> Role:
+    role = role_catalog.role_by_name(role_name)
 
-    if not _map:
+    if role is None:
         raise HTTPException(status_code=404, detail="Role not found")
 
-    roles = RoleFactory.get_roles(_map)
-    return roles[0]
+    return role
 
 
-async def _get_role_by_id(role_id: int) -> Role:
-    query = select(
-        RolesRecord, RolePermissionsRecord, PermissionsRecord
-    ).outerjoin(
-        RolePermissionsRecord,
-        RolePermissionsRecord.role_id == RolesRecord.role_id
-    ).outerjoin(
-        PermissionsRecord,
-        PermissionsRecord.permission_id == RolePermissionsRecord.permissions_id
-    ).where(RolesRecord.role_id == role_id)
+def _get_role_by_id(role_id: int) -> Role:
+    role = role_catalog.role(role_id)
 
-    _map = await select_roles(query)
-
-    if not _map:
+    if role is None:
         raise HTTPException(status_code=404, detail="Role not found")
 
-    roles = RoleFactory.get_roles(_map)
-    return roles[0]
+    return role
 
 
 async def _update_role(role: Role):
@@ -84,19 +63,7 @@ async def get_roles(
         start: Annotated[int, Param(title="Range starting ID to get", ge=1)],
         limit: Annotated[int, Param(title="Amount of resources to fetch", ge=1)]
 ):
-    query = select(
-        RolesRecord, RolePermissionsRecord, PermissionsRecord
-    ).outerjoin(
-        RolePermissionsRecord,
-        RolePermissionsRecord.role_id == RolesRecord.role_id
-    ).outerjoin(
-        PermissionsRecord,
-        PermissionsRecord.permission_id == PermissionsRecord.permission_id
-    ).where(
-        RolesRecord.role_id >= start,
-    )
-    _map = await select_roles(query)
-    return RoleFactory.get_roles(_map)[:limit]
+    return role_catalog.roles_from(start, limit)
 
 
 @router.get("/role", status_code=200, tags=["Unfinished"])
@@ -106,7 +73,7 @@ async def get_role(
         ],
         role_name: str
 ) -> Role:
-    return await _get_role_by_name(role_name)
+    return _get_role_by_name(role_name)
 
 
 @router.get("/role/id/{role_id}", status_code=200, tags=["Unfinished"])
@@ -116,7 +83,7 @@ async def get_role_by_id(
         ],
         role_id: int
 ) -> Role:
-    return await _get_role_by_id(role_id)
+    return _get_role_by_id(role_id)
 
 
 @router.post("/role", status_code=201, tags=["Unfinished"])
@@ -130,12 +97,12 @@ async def create_role(
         role_name=role.name
     )
     await add_object(role_record)
-    _role = await _get_role_by_name(role.name)
 
-    role.id = _role.id
+    role.id = role_record.role_id
     await _update_role(role)
+    await role_catalog.reload()
 
-    return await _get_role_by_name(role.name)
+    return _get_role_by_name(role.name)
 
 
 @router.patch("/role", status_code=201, tags=["Unfinished"])
@@ -147,8 +114,10 @@ async def update_role(
 ):
     tasks = [update_role_query(role), _update_role(role)]
     await asyncio.gather(*tasks)
+    await role_catalog.reload()
+    await invalidate_role_principals(role.id)
 
-    return await _get_role_by_name(role.name)
+    return _get_role_by_name(role.name)
 
 
 # @router.delete("/role", status_code=204, tags=["Unfinished"])
@@ -180,6 +149,7 @@ async def append_user_role(
     )
 
     await add_object(role_record)
+    await invalidate_user_principal(user_id)
 
     data = await select_user_by_id(user_id)
     user = UserFactory.create_full_user(data)
@@ -205,6 +175,7 @@ async def append_user_role(
     )
 
     await execute_safely(query)
+    await invalidate_user_principal(user_id)
 
     data = await select_user_by_id(user_id)
     user = UserFactory.create_full_user(data)
@@ -228,8 +199,10 @@ async def append_user_role(
     ]
 
     await add_objects(records)
+    await role_catalog.reload()
+    await invalidate_role_principals(role_id)
 
-    return await _get_role_by_id(role_id)
+    return _get_role_by_id(role_id)
 
 
 @router.delete("/role-permission", status_code=200, tags=["Unfinished"])
@@ -250,5 +223,7 @@ async def append_user_role(
     )
 
     await execute_safely(query)
+    await role_catalog.reload()
+    await invalidate_role_principals(role_id)
 
-    return await _get_role_by_id(role_id)
+    return _get_role_by_id(role_id)
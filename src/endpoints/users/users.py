@@ -1,24 +1,29 @@
-import asyncio
-from typing import Annotated, List
+from typing import Annotated
 
 from fastapi import APIRouter, Security, HTTPException
 from fastapi.params import Param
 from pydantic import EmailStr
-from sqlalchemy import delete, and_, update, select
+from sqlalchemy import delete, and_, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.crud.models import (
     UsersRecord, AccountsRecord, UserRolesRecord
 )
 from src.crud.queries.user import select_user_by_email, select_users, select_user_by_id
 from src.crud.queries.utils import (
-    add_object, execute_safely, add_objects, scalars_selection
+    add_object, execute_safely, add_objects
 )
+from src.crud.session import SessionDep, after_commit
 from src.endpoints.accounts.accounts import get_initials, update_club_account_uid
 from src.endpoints.users.passwords import router as passwords
 from src.endpoints.users.roles import router as roles
 from src.schema.factories.user_factory import UserFactory
-from src.schema.users import User
-from src.security.security import get_current_active_user, get_password_hash, EMAILS
+from src.schema.users import User, UserSearchPage
+from src.security.security import (
+    get_current_active_user, get_password_hash_async, EMAILS,
+    invalidate_user_principal
+)
+from src.utils.search import user_directory
 from src.utils.utils import generate_random_string
 
 router = APIRouter(prefix="/users", tags=["Users"])
@@ -26,12 +31,12 @@ router.include_router(passwords)
 router.include_router(roles)
 
 
-async def _update_roles(user: User):
+async def _update_roles(user: User, session: AsyncSession | None = None):
     if user.roles is None:
         return
 
     delete_query = delete(UserRolesRecord).where(UserRolesRecord.user_id == user.id)
-    await execute_safely(delete_query)
+    await execute_safely(delete_query, session=session)
 
     insert_queries = [
         UserRolesRecord(
@@ -39,7 +44,7 @@ async def _update_roles(user: User):
             user_id=user.id
         ) for x in user.roles
     ]
-    await add_objects(insert_queries)
+    await add_objects(insert_queries, session=session)
 
 
 @router.get("/user", status_code=200, tags=["Unfinished"])
@@ -88,10 +93,11 @@ async def create_user(
         current_user: Annotated[
             User, Security(get_current_active_user, scopes=["write:users"])
         ],
-        user: User
+        user: User,
+        session: SessionDep
 ) -> User:
     password = generate_random_string() + generate_random_string()
-    hashed_password = get_password_hash(password)
+    hashed_password = await get_password_hash_async(password)
 
     record = UsersRecord(
         name=user.name,
@@ -99,16 +105,11 @@ async def create_user(
         status="ENABLED",
         password=hashed_password,
     )
-    await add_object(record)
-
-    EMAILS.send_user_created_email(user.email, password)
+    await add_object(record, session=session)
 
-    user_record = await select_user_by_email(user.email)
-    _user = UserFactory.create_full_user(user_record)
-
-    user.id = _user.id
-    await _update_roles(user)
-    user_record = await select_user_by_email(user.email)
+    user.id = record.user_id
+    await _update_roles(user, session=session)
+    user_record = await select_user_by_email(user.email, session=session)
     user = UserFactory.create_full_user(user_record)
 
     accounts_record = AccountsRecord(
@@ -119,10 +120,17 @@ async def create_user(
         discount_rate=0,
         status="ENABLED"
     )
-    await add_object(accounts_record)
+    await add_object(accounts_record, session=session)
+    await update_club_account_uid(
+        user.name, user.id, "USER", session=session
+    )
 
-    coro = update_club_account_uid(user.name, user.id, "USER")
-    asyncio.create_task(coro)
+    # the password must only go out for a user that was saved
+    email = user.email
+    after_commit(
+        session, lambda: EMAILS.send_user_created_email(email, password)
+    )
+    after_commit(session, lambda: user_directory.add(user))
 
     return user
 
@@ -132,7 +140,8 @@ async def update_user(
         current_user: Annotated[
             User, Security(get_current_active_user, scopes=[])
         ],
-        user: User
+        user: User,
+        session: SessionDep
 ) -> User:
     query = update(
         UsersRecord
@@ -153,16 +162,17 @@ async def update_user(
             AccountsRecord.entity_type == "USER"
         )
     )
-    tasks = [
-        execute_safely(query),
-        update_club_account_uid(user.name, user.id, "USER"),
-        _update_roles(user)
-    ]
-
-    await asyncio.gather(*tasks)
+    await execute_safely(query, session=session)
+    await update_club_account_uid(
+        user.name, user.id, "USER", session=session
+    )
+    await _update_roles(user, session=session)
+    await invalidate_user_principal(user.id, session=session)
 
-    user_record = await select_user_by_email(user.email)
-    return UserFactory.create_full_user(user_record)
+    user_record = await select_user_by_email(user.email, session=session)
+    user = UserFactory.create_full_user(user_record)
+    after_commit(session, lambda: user_directory.add(user))
+    return user
 
 
 @router.get("/users/{string}/", status_code=201)
@@ -170,20 +180,14 @@ async def get_users(
         current_user: Annotated[
             User, Security(get_current_active_user, scopes=[])
         ],
-        string: str
-):
-    query = select(
-        UsersRecord
-    )
-    records: List[UsersRecord] = await scalars_selection(query)
-
-    users = []
-    string = string.lower()
-    for record in records:
-        if string in record.name.lower() or \
-                string in record.email.lower():
-            users.append(
-                UserFactory.create_half_user(record)
-            )
-
-    return users
+        string: str,
+        limit: Annotated[
+            int, Param(title="Amount of users to fetch", ge=1, le=50)
+        ] = 20,
+        cursor: Annotated[
+            int, Param(title="next_cursor of the previous page", ge=0)
+        ] = 0,
+) -> UserSearchPage:
+    """Users whose name words or email start with the given prefixes"""
+    users, next_cursor = user_directory.search(string, limit, cursor)
+    return UserSearchPage(users=users, next_cursor=next_cursor)
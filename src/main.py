@@ -1,16 +1,16 @@
 from datetime import timedelta
 from typing import Annotated
-from src.crud.queries.clubs import is_club_rep
 from fastapi import FastAPI, Depends, Security, HTTPException
 from fastapi.security import OAuth2PasswordRequestForm
 from starlette import status
 from starlette.middleware.cors import CORSMiddleware
 
-from src.schema.factories.user_factory import UserFactory
+from src.crud.session import PrimaryPinMiddleware
+
 from src.schema.security import Token
 from src.schema.users import User
 from src.security.security import (
-    get_current_active_user, authenticate_user, fernet,
+    get_current_active_user, authenticate_login, fernet,
     ACCESS_TOKEN_EXPIRE_MINUTES, create_access_token
 )
 from src.utils.utils import lifespan
@@ -20,6 +20,7 @@ from src.endpoints.clubs.clubs import router as clubs
 from src.endpoints.users.users import router as users
 from src.endpoints.bookings.bookings import router as bookings
 from src.endpoints.films.films import router as films
+from src.endpoints.metrics.metrics import router as metrics
 
 app = FastAPI(lifespan=lifespan)
 
@@ -30,12 +31,14 @@ app.add_middleware(
     allow_methods=["*"],  # You can restrict the HTTP methods if needed
     allow_headers=["*"],  # You can restrict the headers if needed
 )
+app.add_middleware(PrimaryPinMiddleware)
 
 app.include_router(clubs)
 app.include_router(users)
 app.include_router(bookings)
 app.include_router(accounts)
 app.include_router(films)
+app.include_router(metrics)
 
 
 @app.post(
@@ -51,40 +54,31 @@ async def login_for_access_token(
     Create a token up to specification of Oauth2 Scope Authentication
     db tables are checked to see if the user should have those modules
     """
-    user_data = await authenticate_user(
+    login = await authenticate_login(
         form_data.username, form_data.password
     )
 
-    if not user_data:
+    if not login or login["status"] != "ENABLED":
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    user = UserFactory.create_full_user(user_data)
-    if user.status != "ENABLED":
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Incorrect username or password",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-
-    _is_club_rep = await is_club_rep(form_data.username)
-
-    scopes = user.permissions
-
     access_token_expires = timedelta(
         minutes=ACCESS_TOKEN_EXPIRE_MINUTES,
         days=150
     )
     access_token = create_access_token(
         data={
-            "sub": user.email,
-            "scopes": list(scopes),
-            "full_name": user.name,
-            "is_club_rep": _is_club_rep,
-            "roles": [x.name for x in user.roles]
+            "sub": login["email"],
+            "scopes": list(login["permissions"]),
+            "full_name": login["name"],
+            "is_club_rep": login["is_club_rep"],
+            "roles": list(login["roles"].values()),
+            "role_ids": list(login["roles"].keys()),
+            "uid": login["user_id"],
+            "ver": login["auth_version"],
         },
         expires_delta=access_token_expires
     )
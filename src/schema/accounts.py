@@ -110,3 +110,21 @@ class TopUp(BaseModel):
     account_id: int
     amount: float
     user_password: str
+
+
+class StatementEntry(BaseModel):
+    id: int
+    created: datetime
+    transaction_type: str
+    amount: float
+    batch_ref: str
+    balance: float
+    class_name: str = "STATEMENT_ENTRY"
+
+
+class Statement(BaseModel):
+    account_id: int
+    opening_balance: float
+    closing_balance: float
+    entries: List[StatementEntry]
+    class_name: str = "STATEMENT"
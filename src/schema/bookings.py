@@ -1,8 +1,8 @@
 from src.schema.accounts import Account
 from src.schema.films import ScheduleDetailed
 
-from typing import List, Annotated
-from datetime import datetime
+from typing import List, Annotated, Literal
+from datetime import datetime, date
 from pydantic import (
     BaseModel, Field, EmailStr, field_validator, PlainSerializer, WrapValidator,
     WithJsonSchema
@@ -145,10 +145,37 @@ class SeatLock(BaseModel):
     user_id: int
 
 
+class SeatMap(BaseModel):
+    """
+    Taken seats of a schedule, booked or locked, one per bit in row major
+    order with seat A1 first. bitset is that bitmap base64 encoded with
+    A1 as the highest bit of the first byte, runs its alternating free and
+    taken run lengths starting with free.
+    """
+    schedule_id: int
+    no_of_rows: int
+    seats_per_row: int
+    encoding: Literal["bitset", "runs"]
+    bitset: str | None = None
+    runs: List[int] | None = None
+    class_name: str = "SEAT_MAP"
+
+
 class FilmSalesReport(BaseModel):
     film_id: int = 0
     film_title: str = ""
     bookings: int = 0
+    revenue: float = 0
+
+
+class SalesRollup(BaseModel):
+    day: date
+    film_id: int
+    hall_id: int
+    person_type_id: int
+    tickets: int
+    revenue: float
+    class_name: str = "SALES_ROLLUP"
 
 
 class BatchBookings(BaseModel):
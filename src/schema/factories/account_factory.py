@@ -4,7 +4,10 @@ from typing import List
 
 from cryptography.fernet import Fernet
 
-from src.schema.accounts import Account, Card, CardInput
+from src.schema.accounts import (
+    Account, Card, CardInput, Statement, StatementEntry
+)
+from src.utils.money import to_major
 
 
 class AccountsFactory:
@@ -50,7 +53,7 @@ class AccountsFactory:
             discount_rate=record.discount_rate,
             entity_id=record.entity_id,
             status=record.status,
-            balance=record.balance
+            balance=to_major(record.balance)
         )
 
     @staticmethod
@@ -59,6 +62,28 @@ class AccountsFactory:
             AccountsFactory.get_half_account(x) for x in records
         ]
 
+    @staticmethod
+    def get_statement(account_id: int, opening: int, records) -> Statement:
+        balance = opening
+        entries = []
+        for record in records:
+            balance += record.amount
+            entries.append(StatementEntry(
+                id=record.id,
+                created=record.created,
+                transaction_type=record.transaction_type,
+                amount=to_major(record.amount),
+                batch_ref=record.batch_ref,
+                balance=to_major(balance),
+            ))
+
+        return Statement(
+            account_id=account_id,
+            opening_balance=to_major(opening),
+            closing_balance=to_major(balance),
+            entries=entries,
+        )
+
     @staticmethod
     def get_card_input(card: Card, password: str) -> CardInput:
         hash_object = hashlib.sha256(password.encode())
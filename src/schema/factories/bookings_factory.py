@@ -1,6 +1,11 @@
-from src.schema.bookings import PersonType, Booking
+from typing import List
+
+from src.schema.bookings import (
+    PersonType, Booking, FilmSalesReport, SalesRollup
+)
 from src.schema.factories.account_factory import AccountsFactory
 from src.schema.factories.film_factories import FilmFactory
+from src.utils.money import to_major
 
 
 class BookingsFactory:
@@ -38,7 +43,7 @@ class BookingsFactory:
             status=booking_record.status,
             account=account,
             person_type=BookingsFactory.get_person_type(records[5]),
-            amount=booking_record.amount,
+            amount=to_major(booking_record.amount),
             serial_no=booking_record.serial_no,
             batch_ref=booking_record.batch_ref,
         )
@@ -59,10 +64,34 @@ class BookingsFactory:
                 "status": record.status,
                 "account": record.account_id,
                 "person_type": record.person_type_id,
-                "amount": record.amount,
+                "amount": to_major(record.amount),
                 "serial_no": record.serial_no,
                 "batch_ref": record.batch_ref,
                 "created": record.created,
                 "assigned_user": record.assigned_user
             } for record in records
         ]
+
+    @staticmethod
+    def get_film_sales(rows) -> List[FilmSalesReport]:
+        return [
+            FilmSalesReport(
+                film_id=film_id,
+                film_title=title,
+                bookings=int(tickets),
+                revenue=to_major(int(revenue)),
+            ) for film_id, title, tickets, revenue in rows
+        ]
+
+    @staticmethod
+    def get_sales_rollups(records) -> List[SalesRollup]:
+        return [
+            SalesRollup(
+                day=record.day,
+                film_id=record.film_id,
+                hall_id=record.hall_id,
+                person_type_id=record.person_type_id,
+                tickets=record.tickets,
+                revenue=to_major(record.revenue),
+            ) for record in records
+        ]
@@ -1,6 +1,7 @@
 from typing import List
 
 from src.schema.films import Hall, Film, FilmImage, Schedule, ScheduleDetailed
+from src.utils.money import to_major
 
 
 class FilmFactory:
@@ -65,7 +66,7 @@ class FilmFactory:
             film_id=record.film_id,
             show_time=record.show_time,
             on_schedule=record.on_schedule,
-            ticket_price=record.ticket_price,
+            ticket_price=to_major(record.ticket_price),
         )
 
     @staticmethod
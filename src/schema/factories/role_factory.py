@@ -1,6 +1,7 @@
 from collections import defaultdict
 
 from src.schema.users import Role, Permission
+from src.security.permissions import permission_registry
 
 
 class RoleFactory:
@@ -36,7 +37,10 @@ class RoleFactory:
                 Role(
                     id=role_id,
                     name=role_record.role_name,
-                    permissions=permissions
+                    permissions=permissions,
+                    permission_mask=permission_registry.mask(
+                        x.name for x in permissions
+                    )
                 )
             )
 
@@ -2,7 +2,9 @@ from collections import defaultdict
 from typing import List
 
 from src.crud.models import UsersRecord
+from src.schema.security import TokenData
 from src.schema.users import User, Role, Permission
+from src.security.permissions import permission_registry
 
 
 class UserFactory:
@@ -40,13 +42,17 @@ class UserFactory:
                 Role(
                     id=role_id,
                     name=role_record.role_name,
-                    permissions=permissions
+                    permissions=permissions,
+                    permission_mask=permission_registry.mask(
+                        x.name for x in permissions
+                    )
                 )
             )
 
         user = UserFactory.create_half_user(user_record)
 
         user.permissions = set(_permissions)
+        user.permission_mask = permission_registry.mask(user.permissions)
         user.roles = roles
 
         return user
@@ -61,6 +67,46 @@ class UserFactory:
             status=user_record.status,
         )
 
+    @staticmethod
+    def create_catalog_user(
+            user_record: UsersRecord, roles: List[Role]
+    ) -> User:
+        """Principal built from a user record and catalog roles"""
+        user = UserFactory.create_half_user(user_record)
+
+        user.roles = roles
+        user.permissions = {
+            permission.name for role in roles
+            for permission in role.permissions
+        }
+        user.permission_mask = 0
+        for role in roles:
+            user.permission_mask |= role.permission_mask
+
+        return user
+
+    @staticmethod
+    def create_token_user(token_data: TokenData) -> User:
+        """Principal built from verified token claims alone"""
+        roles = [
+            Role(
+                id=role_id,
+                name=role_name,
+                permissions=[]
+            ) for role_id, role_name in zip(
+                token_data.role_ids, token_data.roles
+            )
+        ]
+        return User(
+            id=token_data.user_id,
+            name=token_data.name,
+            email=token_data.username,
+            roles=roles,
+            permissions=set(token_data.scopes),
+            permission_mask=permission_registry.mask(token_data.scopes),
+            status="ENABLED",
+        )
+
     @staticmethod
     def create_half_users(user_records) -> List[User]:
         return [
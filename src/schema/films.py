@@ -1,4 +1,4 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 from typing import List
 
 from fastapi import UploadFile
@@ -83,3 +83,59 @@ class Film(BaseModel):
 class ScheduleDetailed(Schedule):
     hall: Hall | None = None
     film: Film | None = None
+
+
+class ScheduleRecurrence(BaseModel):
+    film_id: int
+    hall_id: int
+    first_show: datetime
+    every_days: int = Field(1, ge=1)
+    occurrences: int = Field(1, ge=1, le=366)
+    on_schedule: bool
+    ticket_price: float = Field(..., ge=1)
+    class_name: str = "SCHEDULE_RECURRENCE"
+
+    def expand(self) -> List[Schedule]:
+        step = timedelta(days=self.every_days)
+        return [
+            Schedule(
+                id=0,
+                hall_id=self.hall_id,
+                film_id=self.film_id,
+                show_time=self.first_show + step * i,
+                on_schedule=self.on_schedule,
+                ticket_price=self.ticket_price,
+            ) for i in range(self.occurrences)
+        ]
+
+
+class BulkSchedules(BaseModel):
+    schedules: List[Schedule] = []
+    recurrences: List[ScheduleRecurrence] = []
+    class_name: str = "BULK_SCHEDULES"
+
+    def expand(self) -> List[Schedule]:
+        """Every show asked for, listed schedules first, ids ignored"""
+        items = list(self.schedules)
+        for recurrence in self.recurrences:
+            items += recurrence.expand()
+        return items
+
+
+class BulkScheduleError(BaseModel):
+    index: int
+    film_id: int
+    hall_id: int
+    show_time: datetime
+    detail: str
+    class_name: str = "BULK_SCHEDULE_ERROR"
+
+    @field_serializer('show_time')
+    def serialize_dt(self, show_time: datetime, _info):
+        return show_time.isoformat()
+
+
+class BulkScheduleResult(BaseModel):
+    created: List[Schedule]
+    errors: List[BulkScheduleError]
+    class_name: str = "BULK_SCHEDULE_RESULT"
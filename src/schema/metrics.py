@@ -0,0 +1,34 @@
+from pydantic import BaseModel
+
+
+class CacheStats(BaseModel):
+    size: int
+    max_size: int
+    hits: int
+    misses: int
+    evictions: int
+    class_name: str = "CACHE_STATS"
+
+
+class HashingStats(BaseModel):
+    workers: int
+    queue_limit: int
+    in_flight: int
+    completed: int
+    rejected: int
+    average_ms: float
+    average_hashing_ms: float
+    max_ms: float
+    class_name: str = "HASHING_STATS"
+
+
+class PoolStats(BaseModel):
+    size: int
+    checked_in: int
+    checked_out: int
+    overflow: int
+    checkouts: int
+    timeouts: int
+    average_wait_ms: float
+    max_wait_ms: float
+    class_name: str = "POOL_STATS"
@@ -10,6 +10,10 @@ class TokenData(BaseModel):
     password: str | None = None
     is_club_rep: bool | None = None
     scopes: List[str] = []
+    user_id: int | None = None
+    roles: List[str] = []
+    role_ids: List[int] = []
+    version: int | None = None
 
 
 class Token(BaseModel):
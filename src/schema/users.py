@@ -21,6 +21,7 @@ class Role(BaseModel):
     id: int
     name: str
     permissions: List[Permission]
+    permission_mask: int = Field(default=0, exclude=True)
     class_name: str = "ROLE"
 
     def __repr__(self):
@@ -42,6 +43,7 @@ class User(BaseModel):
     password: str | None = Field(exclude=True, default=None)
     roles: List[Role] | None = Field(default=None)
     permissions: Set[str] | None = Field(default=None, exclude=True)
+    permission_mask: int = Field(default=0, exclude=True)
     status: str
     class_name: str = "USER"
 
@@ -62,6 +64,12 @@ class User(BaseModel):
         return basic_string_validation(value, "status")
 
 
+class UserSearchPage(BaseModel):
+    users: List[User]
+    next_cursor: int | None = None
+    class_name: str = "USER_SEARCH_PAGE"
+
+
 class PasswordChange(BaseModel):
     old_password: str
     new_password: str
@@ -0,0 +1,33 @@
+import asyncio
+import logging
+
+from src.crud.queries.user import select_auth_versions
+
+logger = logging.getLogger("AuthVersions")
+
+
+class AuthVersions:
+    """
+    In memory copy of every user's auth version, refreshed in bulk so
+    stateless tokens can be checked for revocation without a query
+    """
+    def __init__(self):
+        self._versions: dict[int, int] = {}
+
+    def current(self, user_id: int) -> int:
+        return self._versions.get(user_id, 0)
+
+    def bump(self, user_id: int) -> None:
+        """Mirror a bump that was just written to the database"""
+        self._versions[user_id] = self.current(user_id) + 1
+
+    async def refresh(self) -> None:
+        self._versions = await select_auth_versions()
+
+    async def keep_refreshing(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Auth version refresh error: {e}", exc_info=True)
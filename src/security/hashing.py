@@ -0,0 +1,122 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+from fastapi import HTTPException
+from passlib.context import CryptContext
+from passlib.registry import get_crypt_handler
+
+
+def build_crypt_context(schemes: list[str], rounds: int | None) -> CryptContext:
+    """
+    Hashing policy, the first scheme hashes new passwords and the others
+    are only verified and flagged for a rehash
+    :param schemes: passlib scheme names, the preferred one first
+    :param rounds: cost of the preferred scheme, None for passlib's default
+    """
+    settings = {}
+    if rounds is not None:
+        settings[f"{schemes[0]}__rounds"] = rounds
+
+    return CryptContext(schemes=schemes, deprecated="auto", **settings)
+
+
+def calibrate_rounds(scheme: str, target_ms: float, samples: int = 3) -> int:
+    """
+    Find the highest cost of a scheme that hashes within a time budget
+    :param scheme: passlib scheme name
+    :param target_ms: milliseconds one hash may take on this machine
+    :param samples: hashes timed per candidate cost
+    :return: the chosen rounds
+    """
+    handler = get_crypt_handler(scheme)
+    rounds = handler.min_rounds
+    best = rounds
+
+    while rounds <= handler.max_rounds:
+        hasher = handler.using(rounds=rounds)
+        start = time.perf_counter()
+        for _ in range(samples):
+            hasher.hash("calibration password")
+        elapsed_ms = (time.perf_counter() - start) / samples * 1000
+
+        if elapsed_ms > target_ms:
+            break
+
+        best = rounds
+        if handler.rounds_cost == "log2":
+            rounds += 1
+        else:
+            rounds *= 2
+
+    return best
+
+
+class HashingPool:
+    """
+    Dedicated thread pool for password hashing so bcrypt never runs on
+    the event loop
+    :param workers: amount of hashes computed concurrently
+    :param max_queue: calls allowed to wait for a worker, more are rejected
+    """
+    def __init__(self, workers: int, max_queue: int):
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="hashing"
+        )
+        self._workers = workers
+        self._limit = workers + max_queue
+        self._in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self._total_seconds = 0.0
+        self._max_seconds = 0.0
+        self._hashing_seconds = 0.0
+
+    def _timed(self, function: Callable, *args) -> Any:
+        start = time.perf_counter()
+        try:
+            return function(*args)
+        finally:
+            self._hashing_seconds += time.perf_counter() - start
+
+    async def run(self, function: Callable, *args) -> Any:
+        """
+        Run a hashing function on the pool
+        :raises HTTPException: 503 when the queue is full
+        """
+        if self._in_flight >= self._limit:
+            self.rejected += 1
+            raise HTTPException(
+                503, "Server is busy, try again later"
+            )
+
+        self._in_flight += 1
+        start = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._executor, self._timed, function, *args
+            )
+        finally:
+            self._in_flight -= 1
+            elapsed = time.perf_counter() - start
+            self.completed += 1
+            self._total_seconds += elapsed
+            self._max_seconds = max(self._max_seconds, elapsed)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        completed = self.completed or 1
+        return {
+            "workers": self._workers,
+            "queue_limit": self._limit - self._workers,
+            "in_flight": self._in_flight,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "average_ms": self._total_seconds / completed * 1000,
+            "average_hashing_ms": self._hashing_seconds / completed * 1000,
+            "max_ms": self._max_seconds * 1000,
+        }
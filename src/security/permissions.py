@@ -0,0 +1,52 @@
+from typing import Iterable
+
+
+class PermissionRegistry:
+    """
+    Assigns every permission name a bit so a set of permissions becomes
+    an integer mask and a scope check a single AND. Bits only live in
+    this process, tokens and the database keep using names.
+    """
+    def __init__(self):
+        self._bits: dict[str, int] = {}
+        self._requirements: dict[tuple[str, ...], int] = {}
+
+    def load(self, names: Iterable[str]) -> None:
+        """Compile the permission catalog, normally once at startup"""
+        for name in names:
+            self.bit(name)
+
+    def bit(self, name: str) -> int:
+        """
+        Bit of a permission, names unknown so far get the next free bit
+        so a requirement on them fails until a role grants them
+        """
+        try:
+            return self._bits[name]
+        except KeyError:
+            bit = 1 << len(self._bits)
+            self._bits[name] = bit
+            return bit
+
+    def mask(self, names: Iterable[str]) -> int:
+        mask = 0
+        for name in names:
+            mask |= self.bit(name)
+        return mask
+
+    def requirement(self, scopes: Iterable[str]) -> int:
+        """Mask of an endpoint's scopes, compiled once per scope list"""
+        key = tuple(scopes)
+        try:
+            return self._requirements[key]
+        except KeyError:
+            mask = self.mask(key)
+            self._requirements[key] = mask
+            return mask
+
+    def allows(self, mask: int, scopes: Iterable[str]) -> bool:
+        required = self.requirement(scopes)
+        return mask & required == required
+
+
+permission_registry = PermissionRegistry()
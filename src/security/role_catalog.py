@@ -0,0 +1,72 @@
+import asyncio
+import logging
+from types import MappingProxyType
+from typing import Iterable, List, Mapping
+
+from src.crud.queries.roles import select_role_catalog
+from src.schema.factories.role_factory import RoleFactory
+from src.schema.users import Role
+
+logger = logging.getLogger("RoleCatalog")
+
+
+class RoleCatalogSnapshot:
+    """Immutable view of every role with its permissions"""
+    def __init__(self, roles: List[Role]):
+        self.roles: Mapping[int, Role] = MappingProxyType(
+            {role.id: role for role in sorted(roles, key=lambda x: x.id)}
+        )
+        self.role_ids: Mapping[str, int] = MappingProxyType(
+            {role.name: role.id for role in roles}
+        )
+
+
+class RoleCatalog:
+    """
+    Process wide role -> permissions graph, reloaded in one query and
+    swapped atomically so readers never see a half built snapshot
+    """
+    def __init__(self):
+        self._snapshot = RoleCatalogSnapshot([])
+
+    @property
+    def snapshot(self) -> RoleCatalogSnapshot:
+        return self._snapshot
+
+    async def reload(self) -> None:
+        _map = await select_role_catalog()
+        self._snapshot = RoleCatalogSnapshot(RoleFactory.get_roles(_map))
+
+    async def keep_reloading(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.reload()
+            except Exception as e:
+                logger.error(f"Role catalog reload error: {e}", exc_info=True)
+
+    def role(self, role_id: int) -> Role | None:
+        return self._snapshot.roles.get(role_id)
+
+    def role_by_name(self, role_name: str) -> Role | None:
+        snapshot = self._snapshot
+        role_id = snapshot.role_ids.get(role_name)
+        if role_id is None:
+            return None
+        return snapshot.roles[role_id]
+
+    def roles_from(self, start: int, limit: int) -> List[Role]:
+        roles = []
+        for role_id, role in self._snapshot.roles.items():
+            if len(roles) == limit:
+                break
+            if role_id >= start:
+                roles.append(role)
+        return roles
+
+    def user_roles(self, role_ids: Iterable[int]) -> List[Role]:
+        roles = self._snapshot.roles
+        return [roles[x] for x in role_ids if x in roles]
+
+
+role_catalog = RoleCatalog()
@@ -3,17 +3,27 @@ from typing import Annotated
 from fastapi import Depends, HTTPException, Security
 from fastapi.security import OAuth2PasswordBearer, SecurityScopes
 from jose import jwt, JWTError  # from package python-jose
-from passlib.context import CryptContext
+from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
-from src.crud.queries.user import select_user_by_email
+from src.crud.session import after_commit
+from src.crud.queries.user import (
+    select_user_by_email, bump_user_auth_version, bump_role_auth_versions,
+    update_user_password, select_user_role_ids, select_login
+)
 from src.schema.users import User
 from src.schema.security import TokenData
 from src.schema.factories.user_factory import UserFactory
+from src.security.auth_versions import AuthVersions
+from src.security.hashing import HashingPool, build_crypt_context
 from src.security.one_time_passwords import OTP
+from src.security.role_catalog import role_catalog
 from src.security.utils import check_scope
 from cryptography.fernet import Fernet
+import hashlib
 import os
+import time
 
+from src.utils.cache import LRUCache
 from src.utils.mailing import EmailClient
 
 # change with: ```openssl rand -hex 32```
@@ -22,7 +32,12 @@ ENCRYPTION_KEY = os.getenv("ENCRYPTION_SECRET")  # Fernet.generate_key()
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES"))
 PASSWORD_RESET_TOKEN_EXPIRE_MINUTES = int(os.getenv("PASSWORD_RESET_TOKEN_EXPIRE_MINUTES"))
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+PASSWORD_SCHEMES = os.getenv("PASSWORD_SCHEMES", "bcrypt").split(",")
+PASSWORD_HASH_ROUNDS = os.getenv("PASSWORD_HASH_ROUNDS") or None
+pwd_context = build_crypt_context(
+    PASSWORD_SCHEMES,
+    int(PASSWORD_HASH_ROUNDS) if PASSWORD_HASH_ROUNDS else None
+)
 EMAILS = EmailClient(
     server=os.getenv("MAILING_SERVER"),
     port=os.getenv("SMTP_PORT"),
@@ -34,6 +49,26 @@ oauth2_scheme = OAuth2PasswordBearer(
     tokenUrl="token",
 )
 otp = OTP(os.environ.get("OTP_SECRET"))
+principal_cache = LRUCache(
+    max_size=int(os.getenv("PRINCIPAL_CACHE_SIZE", 1024)),
+    ttl=float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", 60)),
+)
+STATELESS_AUTH = bool(int(os.getenv("STATELESS_AUTH", 0)))
+AUTH_VERSION_REFRESH_SECONDS = float(
+    os.getenv("AUTH_VERSION_REFRESH_SECONDS", 30)
+)
+ROLE_CATALOG_REFRESH_SECONDS = float(
+    os.getenv("ROLE_CATALOG_REFRESH_SECONDS", 60)
+)
+auth_versions = AuthVersions()
+token_cache = LRUCache(
+    max_size=int(os.getenv("TOKEN_CACHE_SIZE", 4096)),
+    ttl=float(os.getenv("TOKEN_CACHE_TTL_SECONDS", 3600)),
+)
+hashing_pool = HashingPool(
+    workers=int(os.getenv("HASHING_WORKERS", os.cpu_count() or 1)),
+    max_queue=int(os.getenv("HASHING_MAX_QUEUE", 64)),
+)
 
 
 def verify_password(plain_password: str, hashed_password: str):
@@ -50,10 +85,47 @@ def get_password_hash(password):
     return pwd_context.hash(password)
 
 
+async def verify_password_async(
+        plain_password: str, hashed_password: str
+) -> bool:
+    """Runs verify_password on the hashing pool"""
+    return await hashing_pool.run(
+        verify_password, plain_password, hashed_password
+    )
+
+
+async def get_password_hash_async(password: str) -> str:
+    """Runs get_password_hash on the hashing pool"""
+    return await hashing_pool.run(get_password_hash, password)
+
+
+async def verify_and_update_password_async(
+        plain_password: str, hashed_password: str
+) -> tuple[bool, str | None]:
+    """
+    Verify a password on the hashing pool
+    :return: whether it matched, and a new hash when the stored one was
+    made with outdated parameters
+    """
+    return await hashing_pool.run(
+        pwd_context.verify_and_update, plain_password, hashed_password
+    )
+
+
 def validate_token(
         token: str,
         exception: HTTPException,
 ) -> TokenData:
+    """
+    Verify a token and parse its claims, already verified tokens are served
+    from the token cache until they expire
+    """
+    cache_key = hashlib.sha256(token.encode()).digest()
+    if token_cache.enabled:
+        token_data = token_cache.get(cache_key)
+        if token_data is not None:
+            return token_data
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
@@ -64,22 +136,53 @@ def validate_token(
         token_data = TokenData(
             username=username,
             password=password,
+            name=payload.get("full_name"),
+            is_club_rep=payload.get("is_club_rep"),
+            scopes=payload.get("scopes", []),
+            user_id=payload.get("uid"),
+            roles=payload.get("roles", []),
+            role_ids=payload.get("role_ids", []),
+            version=payload.get("ver"),
         )
     except JWTError:
         raise exception
 
+    expires_in = payload.get("exp", 0) - time.time()
+    token_cache.set(
+        cache_key, token_data, expires_at=time.monotonic() + expires_in
+    )
+
     return token_data
 
 
-async def authenticate_user(
+async def authenticate_login(
         username: str, password: str
-) -> dict | bool:
-    user = await select_user_by_email(username)
-    if not user:
-        return False
-    if not verify_password(password, user["user"].password):
-        return False
-    return user
+) -> dict | None:
+    """
+    Lean /token path, verifies credentials against the single login query
+    without building a full principal
+    :param username: email of the user logging in
+    :param password: plain text password
+    :return: the login data from select_login, None on bad credentials
+    """
+    login = await select_login(username)
+    if login is None:
+        return None
+
+    valid, new_hash = await verify_and_update_password_async(
+        password, login["password"]
+    )
+    if not valid:
+        return None
+
+    if new_hash:
+        await update_user_password(login["user_id"], new_hash)
+        login["password"] = new_hash
+        principal_cache.discard_where(
+            lambda principal: principal.id == login["user_id"]
+        )
+
+    return login
 
 
 def create_access_token(
@@ -115,12 +218,23 @@ async def get_current_user(
         token, credentials_exception
     )
 
-    data = await select_user_by_email(username=token_data.username)
+    if STATELESS_AUTH and token_data.version is not None:
+        if token_data.version != auth_versions.current(token_data.user_id):
+            raise credentials_exception
 
-    if not data:
-        raise credentials_exception
+        return UserFactory.create_token_user(token_data)
+
+    user = principal_cache.get(token_data.username)
+    if user is None:
+        data = await select_user_role_ids(username=token_data.username)
 
-    user = UserFactory.create_full_user(data)
+        if not data:
+            raise credentials_exception
+
+        user = UserFactory.create_catalog_user(
+            data["user"], role_catalog.user_roles(data["role_ids"])
+        )
+        principal_cache.set(token_data.username, user)
 
     # check_scope(
     #     user.permissions,
@@ -141,6 +255,60 @@ async def get_current_active_user(
     return current_user
 
 
+async def invalidate_user_principal(
+        user_id: int, session: AsyncSession | None = None
+) -> None:
+    """
+    Revoke the cached principal and issued tokens of a user after its
+    roles, status or password changed
+    :param user_id: id of the changed user
+    :param session: session of the surrounding unit of work, if any. The
+        caches are cleared once it commits, clearing them earlier would
+        let a concurrent request cache the old principal again.
+    """
+    await bump_user_auth_version(user_id, session=session)
+
+    def clear():
+        principal_cache.discard_where(lambda user: user.id == user_id)
+        token_cache.discard_where(
+            lambda token_data: token_data.user_id == user_id
+        )
+        auth_versions.bump(user_id)
+
+    after_commit(session, clear)
+
+
+async def invalidate_role_principals(role_id: int) -> None:
+    """
+    Revoke the cached principals and issued tokens of every user holding
+    a changed role
+    :param role_id: id of the changed role
+    """
+    principal_cache.discard_where(
+        lambda user: any(role.id == role_id for role in user.roles or [])
+    )
+    token_cache.discard_where(
+        lambda token_data: role_id in token_data.role_ids
+    )
+    await bump_role_auth_versions(role_id)
+    await auth_versions.refresh()
+
+
+async def get_user_password_hash(user: User) -> str:
+    """
+    Password hash of a principal, stateless principals are built without
+    one so it is loaded on demand
+    """
+    if user.password is not None:
+        return user.password
+
+    data = await select_user_by_email(user.email)
+    if not data:
+        raise HTTPException(404, "User not found")
+
+    return data["user"].password
+
+
 def validate_token_password(
         token_data: TokenData, db_password: str, exception
 ) -> None:
@@ -0,0 +1,41 @@
+import argparse
+import asyncio
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from src.crud.engine import engine
+from src.crud.queries.bookings import rebuild_booking_batches
+from src.crud.queries.ledger import (
+    open_account_ledgers, take_balance_snapshots
+)
+from src.crud.queries.sales import rebuild_sales_rollups
+
+BACKFILLS = {
+    "booking-batches": rebuild_booking_batches,
+    "opening-balances": open_account_ledgers,
+    "balance-snapshots": take_balance_snapshots,
+    "sales-rollups": rebuild_sales_rollups,
+}
+
+
+async def run(name: str) -> int:
+    try:
+        return await BACKFILLS[name]()
+    finally:
+        await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Rebuild derived tables from their source rows"
+    )
+    parser.add_argument("name", choices=sorted(BACKFILLS))
+    args = parser.parse_args()
+
+    rows = asyncio.run(run(args.name))
+    print(f"{args.name}: {rows} rows written")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+
+class LRUCache:
+    """
+    Size bounded least recently used cache with expiring entries
+    :param max_size: maximum amount of entries kept, 0 disables the cache
+    :param ttl: seconds an entry stays valid after being stored
+    """
+    def __init__(self, max_size: int, ttl: float):
+        self._max_size = max_size
+        self._ttl = ttl
+        self._entries: OrderedDict[Hashable, tuple[Any, float]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self._max_size > 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Any | None:
+        """
+        Get a stored value, refreshing its recency
+        :param key: key the value was stored with
+        :return: the value, None if missing or expired
+        """
+        try:
+            value, expires_at = self._entries[key]
+        except KeyError:
+            self.misses += 1
+            return None
+
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def peek(self, key: Hashable) -> Any | None:
+        """Get a live value without refreshing it or counting a hit"""
+        entry = self._entries.get(key)
+        if entry is None or entry[1] <= time.monotonic():
+            return None
+        return entry[0]
+
+    def values(self) -> list:
+        return [value for value, _ in self._entries.values()]
+
+    def set(
+            self, key: Hashable, value: Any, expires_at: float | None = None
+    ) -> None:
+        """
+        Store a value, evicting the least recently used entries when full
+        :param key: key to store the value with
+        :param value: value to store
+        :param expires_at: optional monotonic deadline earlier than the ttl
+        """
+        if not self.enabled:
+            return
+
+        deadline = time.monotonic() + self._ttl
+        if expires_at is not None and expires_at < deadline:
+            deadline = expires_at
+
+        self._entries[key] = (value, deadline)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key: Hashable) -> Any | None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return None
+        return entry[0]
+
+    def discard_where(self, predicate: Callable[[Any], bool]) -> int:
+        """
+        Drop every entry whose value matches the predicate
+        :param predicate: called with each stored value
+        :return: amount of entries dropped
+        """
+        keys = [
+            key for key, (value, _) in self._entries.items()
+            if predicate(value)
+        ]
+        for key in keys:
+            del self._entries[key]
+
+        return len(keys)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "max_size": self._max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
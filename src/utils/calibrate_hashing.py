@@ -0,0 +1,20 @@
+import argparse
+
+from src.security.hashing import calibrate_rounds
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Pick PASSWORD_HASH_ROUNDS for a target time per hash"
+    )
+    parser.add_argument("--scheme", default="bcrypt")
+    parser.add_argument("--target-ms", type=float, default=250)
+    args = parser.parse_args()
+
+    rounds = calibrate_rounds(args.scheme, args.target_ms)
+    print(f'PASSWORD_SCHEMES="{args.scheme}"')
+    print(f'PASSWORD_HASH_ROUNDS="{rounds}"')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,30 @@
+from decimal import Decimal, ROUND_HALF_UP
+
+# money is stored as integer minor units (pence), the API speaks pounds
+MINOR_UNITS = 100
+
+
+def to_minor(value: float | int | str) -> int:
+    """
+    Convert an amount in major units to minor units, rounding half up
+    :param value: amount as given by a client, e.g. 7.5
+    :return: amount in minor units, e.g. 750
+    """
+    minor = Decimal(str(value)) * MINOR_UNITS
+    return int(minor.quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def to_major(value: int | None) -> float | None:
+    if value is None:
+        return None
+    return value / MINOR_UNITS
+
+
+def apply_discount(amount: int, percent: int) -> int:
+    """
+    Take a whole percentage off an amount in minor units, rounding half up
+    :param amount: price in minor units
+    :param percent: discount between 0 and 100
+    """
+    percent = min(max(percent, 0), 100)
+    return (amount * (100 - percent) + 50) // 100
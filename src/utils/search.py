@@ -0,0 +1,313 @@
+import asyncio
+import bisect
+import heapq
+import logging
+import os
+import re
+from collections import defaultdict
+from typing import Any, Dict, Hashable, Iterable, List, Mapping
+
+from src.crud.queries.films import select_all_films
+from src.crud.queries.user import select_user_directory
+from src.schema.factories.film_factories import FilmFactory
+from src.schema.films import Film
+from src.schema.users import User
+
+logger = logging.getLogger("Search")
+
+FILM_SEARCH_REFRESH_SECONDS = float(
+    os.getenv("FILM_SEARCH_REFRESH_SECONDS", 300)
+)
+USER_DIRECTORY_REFRESH_SECONDS = float(
+    os.getenv("USER_DIRECTORY_REFRESH_SECONDS", 300)
+)
+# share of the query trigrams a field has to contain to count as a match
+MIN_SIMILARITY = 0.6
+
+_WORD = re.compile(r"\w+")
+
+
+def _words(text: str) -> List[str]:
+    return _WORD.findall(text.lower())
+
+
+def document_trigrams(text: str) -> set[str]:
+    """
+    Trigrams of every word padded like "  word ", so word starts and ends
+    have trigrams of their own
+    """
+    trigrams = set()
+    for word in _words(text):
+        padded = f"  {word} "
+        trigrams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return trigrams
+
+
+def query_trigrams(text: str) -> set[str]:
+    """
+    Trigrams a query has to share with a document. Words of three or more
+    letters match anywhere inside a word, shorter ones only at its start.
+    """
+    trigrams = set()
+    for word in _words(text):
+        if len(word) >= 3:
+            trigrams.update(word[i:i + 3] for i in range(len(word) - 2))
+        else:
+            trigrams.add(f"  {word}"[-3:])
+    return trigrams
+
+
+class TrigramIndex:
+    """
+    In memory inverted index from trigrams to documents, a search only
+    touches the postings of its own trigrams
+    :param weights: field name -> weight in the ranking
+    """
+    def __init__(self, weights: Mapping[str, float]):
+        self._fields = list(weights)
+        self._weights = [weights[x] for x in self._fields]
+        # trigram -> document id -> bitmask of the fields containing it
+        self._postings: Dict[str, Dict[Hashable, int]] = defaultdict(dict)
+        self._documents: Dict[Hashable, tuple[Any, list[str], list]] = {}
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def add(self, doc_id: Hashable, fields: Mapping[str, str], value: Any):
+        """
+        Index a document, replacing an earlier version with the same id
+        :param doc_id: key of the document
+        :param fields: text of each weighted field
+        :param value: returned by search when the document matches
+        """
+        self.remove(doc_id)
+
+        texts = [(fields.get(x) or "").lower() for x in self._fields]
+        masks = defaultdict(int)
+        for bit, text in enumerate(texts):
+            for trigram in document_trigrams(text):
+                masks[trigram] |= 1 << bit
+
+        for trigram, mask in masks.items():
+            self._postings[trigram][doc_id] = mask
+        self._documents[doc_id] = (value, texts, list(masks))
+
+    def remove(self, doc_id: Hashable) -> None:
+        document = self._documents.pop(doc_id, None)
+        if document is None:
+            return
+
+        for trigram in document[2]:
+            postings = self._postings[trigram]
+            postings.pop(doc_id, None)
+            if not postings:
+                del self._postings[trigram]
+
+    def search(self, query: str, limit: int, offset: int = 0) -> List[Any]:
+        """
+        Documents ranked by the weighted share of query trigrams each field
+        contains, an exact substring of a field counts double and the
+        whole field triple
+        :param query: free text
+        :param limit: amount of results
+        :param offset: amount of best results to skip
+        """
+        trigrams = query_trigrams(query)
+        if not trigrams or limit <= 0:
+            return []
+
+        counts: Dict[Hashable, list[int]] = {}
+        for trigram in trigrams:
+            for doc_id, mask in self._postings.get(trigram, {}).items():
+                doc_counts = counts.get(doc_id)
+                if doc_counts is None:
+                    doc_counts = counts[doc_id] = [0] * len(self._fields)
+                for bit in range(len(self._fields)):
+                    if mask >> bit & 1:
+                        doc_counts[bit] += 1
+
+        needle = " ".join(_words(query))
+        scored = []
+        for doc_id, doc_counts in counts.items():
+            similarities = [x / len(trigrams) for x in doc_counts]
+            if max(similarities) < MIN_SIMILARITY:
+                continue
+
+            value, texts, _ = self._documents[doc_id]
+            score = 0
+            for weight, similarity, text in zip(
+                    self._weights, similarities, texts
+            ):
+                if needle == text:
+                    similarity *= 3
+                elif needle in text:
+                    similarity *= 2
+                score += weight * similarity
+            scored.append((score, texts[0], doc_id))
+
+        best = heapq.nsmallest(
+            offset + limit, scored, key=lambda x: (-x[0], x[1])
+        )
+        return [self._documents[x[2]][0] for x in best[offset:]]
+
+
+class FilmSearch:
+    """Film catalog search over title and trailer description"""
+    def __init__(self):
+        self._index = TrigramIndex({"title": 2.0, "trailer_desc": 1.0})
+
+    def add(self, film: Film) -> None:
+        self._index.add(
+            film.id,
+            {"title": film.title, "trailer_desc": film.trailer_desc},
+            film
+        )
+
+    def add_all(self, films: Iterable[Film]) -> None:
+        for film in films:
+            self.add(film)
+
+    def remove(self, film_id: int) -> None:
+        self._index.remove(film_id)
+
+    def search(self, query: str, limit: int, offset: int = 0) -> List[Film]:
+        return self._index.search(query, limit, offset)
+
+    async def reload(self) -> None:
+        index = FilmSearch()
+        index.add_all(FilmFactory.get_half_films(await select_all_films()))
+        # swap in one step, searches never see a half built index
+        self._index = index._index
+
+    async def keep_reloading(self, interval: float) -> None:
+        """Pick up films written by other workers"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.reload()
+            except Exception as e:
+                logger.error(f"Film search reload error: {e}", exc_info=True)
+
+
+class PrefixIndex:
+    """
+    Sorted (token, id) pairs, every token starting with a prefix sits in
+    one contiguous run found with a bisect
+    """
+    def __init__(self):
+        self._keys: List[tuple[str, int]] = []
+        self._tokens: Dict[int, set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._tokens)
+
+    def add(self, doc_id: int, tokens: Iterable[str]) -> None:
+        self.remove(doc_id)
+        tokens = set(tokens)
+        for token in tokens:
+            bisect.insort(self._keys, (token, doc_id))
+        self._tokens[doc_id] = tokens
+
+    def add_all(self, documents: Iterable[tuple[int, Iterable[str]]]):
+        """Bulk load, one sort instead of an insort per token"""
+        for doc_id, tokens in documents:
+            self._tokens[doc_id] = set(tokens)
+        self._keys = sorted(
+            (token, doc_id)
+            for doc_id, tokens in self._tokens.items() for token in tokens
+        )
+
+    def remove(self, doc_id: int) -> None:
+        for token in self._tokens.pop(doc_id, ()):
+            index = bisect.bisect_left(self._keys, (token, doc_id))
+            del self._keys[index]
+
+    def match(self, prefix: str) -> set[int]:
+        """Ids with a token starting with the prefix"""
+        matches = set()
+        index = bisect.bisect_left(self._keys, (prefix,))
+        while index < len(self._keys):
+            token, doc_id = self._keys[index]
+            if not token.startswith(prefix):
+                break
+            matches.add(doc_id)
+            index += 1
+        return matches
+
+
+class UserDirectory:
+    """
+    Admin user search, every query word has to prefix one of a user's
+    name words or their email. Only id, name, email and status are kept.
+    """
+    def __init__(self):
+        self._index = PrefixIndex()
+        self._users: Dict[int, User] = {}
+
+    @staticmethod
+    def _tokens(user: User) -> List[str]:
+        return _words(user.name) + [user.email.lower()]
+
+    def add(self, user: User) -> None:
+        user = User(
+            id=user.id, name=user.name, email=user.email, status=user.status
+        )
+        self._index.add(user.id, self._tokens(user))
+        self._users[user.id] = user
+
+    def remove(self, user_id: int) -> None:
+        self._index.remove(user_id)
+        self._users.pop(user_id, None)
+
+    def search(
+            self, query: str, limit: int, cursor: int = 0
+    ) -> tuple[List[User], int | None]:
+        """
+        One page of matches in id order
+        :param query: space separated prefixes
+        :param limit: amount of users
+        :param cursor: id the previous page ended at, 0 for the first page
+        :return: the users and the cursor of the next page, None at the end
+        """
+        words = query.lower().split()
+        if not words:
+            return [], None
+
+        matches = None
+        for word in sorted(words, key=len, reverse=True):
+            found = self._index.match(word)
+            matches = found if matches is None else matches & found
+            if not matches:
+                return [], None
+
+        ids = heapq.nsmallest(limit + 1, (x for x in matches if x > cursor))
+        next_cursor = ids[limit - 1] if len(ids) > limit else None
+        return [self._users[x] for x in ids[:limit]], next_cursor
+
+    async def reload(self) -> None:
+        rows = await select_user_directory()
+        directory = UserDirectory()
+        for user_id, name, email, status in rows:
+            directory._users[user_id] = User(
+                id=user_id, name=name, email=email, status=status
+            )
+        directory._index.add_all(
+            (x.id, self._tokens(x)) for x in directory._users.values()
+        )
+        # swap in one step, searches never see a half built index
+        self._index, self._users = directory._index, directory._users
+
+    async def keep_reloading(self, interval: float) -> None:
+        """Pick up users written by other workers"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.reload()
+            except Exception as e:
+                logger.error(
+                    f"User directory reload error: {e}", exc_info=True
+                )
+
+
+film_search = FilmSearch()
+user_directory = UserDirectory()
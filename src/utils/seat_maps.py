@@ -0,0 +1,211 @@
+import asyncio
+import base64
+import hashlib
+import os
+import time
+from typing import Callable, Dict, Iterable, List
+
+from src.crud.queries.bookings import select_seat_occupancy
+from src.utils.cache import LRUCache
+
+SEAT_MAP_CACHE_SIZE = int(os.getenv("SEAT_MAP_CACHE_SIZE", 1024))
+# other workers' bookings and locks show up after at most this long
+SEAT_MAP_TTL_SECONDS = float(os.getenv("SEAT_MAP_TTL_SECONDS", 30))
+
+
+def _row_number(letters: str) -> int:
+    """Spreadsheet style row letters to a 1 based number, A=1 ... AA=27"""
+    number = 0
+    for letter in letters:
+        number = number * 26 + ord(letter) - ord("A") + 1
+    return number
+
+
+def _row_letters(number: int) -> str:
+    """Inverse of _row_number"""
+    letters = ""
+    while number:
+        number, remainder = divmod(number - 1, 26)
+        letters = chr(ord("A") + remainder) + letters
+    return letters
+
+
+class SeatBitmap:
+    """
+    Taken seats of one schedule, one bit per seat in row major order,
+    seat A1 is the highest bit of the first byte. Bookings are kept as
+    bits, locks with their deadline since they lapse on their own.
+    """
+    def __init__(self, no_of_rows: int, seats_per_row: int):
+        self.no_of_rows = no_of_rows
+        self.seats_per_row = seats_per_row
+        self.size = no_of_rows * seats_per_row
+        self._booked = bytearray((self.size + 7) // 8)
+        # lock id -> (seat bit, monotonic deadline)
+        self._locks: Dict[int, tuple[int, float]] = {}
+
+    def bit(self, seat: str) -> int | None:
+        """Bit of a seat number like "C12", None when not in the hall"""
+        seat = seat.upper()
+        letters = seat.rstrip("0123456789")
+        digits = seat[len(letters):]
+        if not letters.isalpha() or not digits:
+            return None
+
+        row, column = _row_number(letters), int(digits)
+        if not (1 <= row <= self.no_of_rows
+                and 1 <= column <= self.seats_per_row):
+            return None
+        return (row - 1) * self.seats_per_row + column - 1
+
+    def seat(self, bit: int) -> str:
+        row, column = divmod(bit, self.seats_per_row)
+        return f"{_row_letters(row + 1)}{column + 1}"
+
+    def book(self, seat: str) -> None:
+        bit = self.bit(seat)
+        if bit is not None:
+            self._booked[bit // 8] |= 0x80 >> bit % 8
+
+    def lock(self, lock_id: int, seat: str, seconds: float) -> None:
+        bit = self.bit(seat)
+        if bit is not None and seconds > 0:
+            self._locks[lock_id] = (bit, time.monotonic() + seconds)
+
+    def release(self, lock_id: int) -> bool:
+        return self._locks.pop(lock_id, None) is not None
+
+    def taken(self) -> bytes:
+        """Booked seats and the seats of live locks, lapsed locks dropped"""
+        now = time.monotonic()
+        taken = bytearray(self._booked)
+        for lock_id, (bit, deadline) in list(self._locks.items()):
+            if deadline <= now:
+                del self._locks[lock_id]
+                continue
+            taken[bit // 8] |= 0x80 >> bit % 8
+        return bytes(taken)
+
+
+def decode_seats(bitmap: SeatBitmap, taken: bytes) -> List[str]:
+    """Seat numbers of the taken seats, in row major order"""
+    return [
+        bitmap.seat(bit) for bit in range(bitmap.size)
+        if taken[bit // 8] >> (7 - bit % 8) & 1
+    ]
+
+
+def encode_bitset(taken: bytes) -> str:
+    return base64.b64encode(taken).decode()
+
+
+def encode_runs(taken: bytes, size: int) -> List[int]:
+    """
+    Run lengths of alternating free and taken seats, starting with free,
+    so a map starting with a taken seat opens with a 0
+    """
+    runs = []
+    current, length = 0, 0
+    for bit in range(size):
+        value = taken[bit // 8] >> (7 - bit % 8) & 1
+        if value != current:
+            runs.append(length)
+            current, length = value, 0
+        length += 1
+    runs.append(length)
+    return runs
+
+
+def etag(taken: bytes, encoding: str) -> str:
+    digest = hashlib.blake2b(
+        taken + encoding.encode(), digest_size=8
+    ).hexdigest()
+    return f'"{digest}"'
+
+
+class SeatMaps:
+    """
+    Seat maps of recently viewed schedules, loaded from the database on a
+    miss and kept current by this worker's booking and lock writes
+    :param max_size: amount of schedules kept
+    :param ttl: seconds before a map is reloaded for other workers' writes
+    """
+    def __init__(self, max_size: int, ttl: float):
+        self._cache = LRUCache(max_size=max_size, ttl=ttl)
+        self._loads: Dict[int, asyncio.Task] = {}
+        # writes made while a schedule's map is loading, replayed on it
+        self._pending: Dict[int, List[Callable[[SeatBitmap], None]]] = {}
+
+    def stats(self) -> dict:
+        return self._cache.stats()
+
+    async def get(self, schedule_id: int) -> SeatBitmap | None:
+        """The schedule's seat map, None when there is no such schedule"""
+        bitmap = self._cache.get(schedule_id)
+        if bitmap is not None:
+            return bitmap
+
+        # concurrent misses share one load
+        load = self._loads.get(schedule_id)
+        if load is None:
+            load = asyncio.create_task(self._load(schedule_id))
+            self._loads[schedule_id] = load
+            load.add_done_callback(
+                lambda _: self._loads.pop(schedule_id, None)
+            )
+        return await asyncio.shield(load)
+
+    async def _load(self, schedule_id: int) -> SeatBitmap | None:
+        self._pending[schedule_id] = []
+        try:
+            occupancy = await select_seat_occupancy(schedule_id)
+            if occupancy is None:
+                return
+
+            hall, booked, locks = occupancy
+            bitmap = SeatBitmap(hall.no_of_rows, hall.seats_per_row)
+            for seat in booked:
+                bitmap.book(seat)
+            for lock_id, seat, seconds in locks:
+                bitmap.lock(lock_id, seat, seconds)
+            for change in self._pending[schedule_id]:
+                change(bitmap)
+
+            self._cache.set(schedule_id, bitmap)
+            return bitmap
+        finally:
+            del self._pending[schedule_id]
+
+    def _apply(
+            self, schedule_id: int, change: Callable[[SeatBitmap], None]
+    ) -> None:
+        bitmap = self._cache.peek(schedule_id)
+        if bitmap is not None:
+            change(bitmap)
+        if schedule_id in self._pending:
+            self._pending[schedule_id].append(change)
+
+    def book(self, schedule_id: int, seats: Iterable[str]) -> None:
+        seats = list(seats)
+
+        def change(bitmap: SeatBitmap):
+            for seat in seats:
+                bitmap.book(seat)
+
+        self._apply(schedule_id, change)
+
+    def lock(
+            self, schedule_id: int, lock_id: int, seat: str, seconds: float
+    ) -> None:
+        self._apply(schedule_id, lambda x: x.lock(lock_id, seat, seconds))
+
+    def release(self, lock_id: int) -> None:
+        """Drop a lock from whichever cached map holds it"""
+        for bitmap in self._cache.values():
+            if bitmap.release(lock_id):
+                return
+        for changes in self._pending.values():
+            changes.append(lambda x: x.release(lock_id))
+
+
+seat_maps = SeatMaps(SEAT_MAP_CACHE_SIZE, SEAT_MAP_TTL_SECONDS)
@@ -0,0 +1,103 @@
+import asyncio
+import hashlib
+import os
+import string
+
+from src.crud.queries.serials import allocate_serial_block
+
+_ALPHABET = string.ascii_uppercase
+_LENGTH = 6
+# 26^6 is 17576^2, a balanced Feistel network over two base 17576 halves
+# is a permutation of exactly the 6 letter code space, no cycle walking
+_HALF = len(_ALPHABET) ** (_LENGTH // 2)
+SPACE = _HALF * _HALF
+_ROUNDS = 4
+
+SERIAL_KEY = os.getenv("SERIAL_KEY", "").encode()
+if not SERIAL_KEY:
+    # the permutation is public, without a secret key serials and batch
+    # references follow from their sequence numbers
+    raise RuntimeError("SERIAL_KEY must be set to a secret value")
+SERIAL_BLOCK_SIZE = int(os.getenv("SERIAL_BLOCK_SIZE", 256))
+
+
+class FeistelCode:
+    """
+    Keyed permutation of [0, 26^6) rendered as 6 letters. Distinct inputs
+    always give distinct codes, consecutive inputs give unrelated looking
+    ones.
+    :param key: secret the round function is keyed with
+    """
+    def __init__(self, key: bytes):
+        self._key = hashlib.blake2b(key, digest_size=32).digest()
+
+    def _round(self, value: int, index: int) -> int:
+        digest = hashlib.blake2b(
+            value.to_bytes(2, "big") + bytes((index,)),
+            key=self._key, digest_size=4
+        ).digest()
+        return int.from_bytes(digest, "big") % _HALF
+
+    def permute(self, value: int) -> int:
+        if not 0 <= value < SPACE:
+            raise ValueError(f"{value} is outside the code space")
+
+        left, right = divmod(value, _HALF)
+        for index in range(_ROUNDS):
+            left, right = right, (left + self._round(right, index)) % _HALF
+        return left * _HALF + right
+
+    def encode(self, value: int) -> str:
+        value = self.permute(value)
+        letters = []
+        for _ in range(_LENGTH):
+            value, digit = divmod(value, len(_ALPHABET))
+            letters.append(_ALPHABET[digit])
+        return "".join(reversed(letters))
+
+
+class SerialGenerator:
+    """
+    Collision free 6 letter codes, a database sequence is drawn from in
+    blocks and every value is passed through the keyed permutation, so
+    issuing a code needs no lookup and only one query per block
+    :param name: sequence backing this generator
+    :param key: secret for the permutation, each generator has its own
+    :param block_size: values reserved per round trip
+    """
+    def __init__(self, name: str, key: bytes, block_size: int):
+        self._name = name
+        self._code = FeistelCode(key + name.encode())
+        self._block_size = block_size
+        self._next = 0
+        self._end = 0
+        self._lock = asyncio.Lock()
+
+    async def _value(self) -> int:
+        async with self._lock:
+            if self._next >= self._end:
+                self._next = await allocate_serial_block(
+                    self._name, self._block_size
+                )
+                self._end = self._next + self._block_size
+
+            value = self._next
+            self._next += 1
+
+        if value >= SPACE:
+            raise RuntimeError(f"Sequence {self._name} is exhausted")
+        return value
+
+    async def next(self) -> str:
+        return self._code.encode(await self._value())
+
+    async def take(self, amount: int) -> list[str]:
+        return [await self.next() for _ in range(amount)]
+
+
+booking_serials = SerialGenerator(
+    "booking_serial", SERIAL_KEY, SERIAL_BLOCK_SIZE
+)
+batch_references = SerialGenerator(
+    "batch_ref", SERIAL_KEY, SERIAL_BLOCK_SIZE
+)
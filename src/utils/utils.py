@@ -1,5 +1,6 @@
 import asyncio
 import json
+import logging
 import os
 import string
 from concurrent.futures import ThreadPoolExecutor
@@ -8,12 +9,28 @@ from random import choice
 from fastapi import FastAPI
 from contextlib import asynccontextmanager
 from src.crud.db_management import close_db
+from src.crud.engine import engine, POOL_WARM_UP
 from src.crud.drop import create_new_db
 from aiofiles.os import makedirs, path
 
-from src.crud.queries.user import select_user_by_id
+from src.crud.queries.ledger import take_balance_snapshots
+from src.crud.queries.roles import select_permission_names
+from src.crud.pool import warm_up_pool
+from src.security.permissions import permission_registry
+from src.security.security import (
+    STATELESS_AUTH, AUTH_VERSION_REFRESH_SECONDS, auth_versions,
+    hashing_pool, ROLE_CATALOG_REFRESH_SECONDS
+)
+from src.security.role_catalog import role_catalog
+from src.utils.search import (
+    film_search, FILM_SEARCH_REFRESH_SECONDS, user_directory,
+    USER_DIRECTORY_REFRESH_SECONDS
+)
 
 ALPHABETS = list(string.ascii_uppercase)
+BALANCE_SNAPSHOT_SECONDS = float(os.getenv("BALANCE_SNAPSHOT_SECONDS", 86400))
+
+logger = logging.getLogger("Utils")
 
 
 async def save_openai():
@@ -62,21 +79,47 @@ def str_to_iso_format(_string: str):
     )
 
 
-async def keep_resetting_db_conns():
+async def keep_taking_balance_snapshots(interval: float):
     while True:
-        await asyncio.sleep(3600)
-        await select_user_by_id(1)
+        await asyncio.sleep(interval)
+        try:
+            await take_balance_snapshots()
+        except Exception as e:
+            logger.error(f"Balance snapshot error: {e}", exc_info=True)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await create_assets_dir()
+    await warm_up_pool(engine, POOL_WARM_UP)
+    permission_registry.load(await select_permission_names())
+    await role_catalog.reload()
+    asyncio.create_task(
+        role_catalog.keep_reloading(ROLE_CATALOG_REFRESH_SECONDS)
+    )
+    await film_search.reload()
+    asyncio.create_task(
+        film_search.keep_reloading(FILM_SEARCH_REFRESH_SECONDS)
+    )
+    await user_directory.reload()
+    asyncio.create_task(
+        user_directory.keep_reloading(USER_DIRECTORY_REFRESH_SECONDS)
+    )
+    if BALANCE_SNAPSHOT_SECONDS > 0:
+        asyncio.create_task(
+            keep_taking_balance_snapshots(BALANCE_SNAPSHOT_SECONDS)
+        )
 
     is_dev = int(os.getenv('DEV'))
     if is_dev:
         asyncio.create_task(save_openai())
 
-    asyncio.create_task(keep_resetting_db_conns())
+    if STATELESS_AUTH:
+        await auth_versions.refresh()
+        asyncio.create_task(
+            auth_versions.keep_refreshing(AUTH_VERSION_REFRESH_SECONDS)
+        )
 
     yield
+    hashing_pool.shutdown()
     await close_db()
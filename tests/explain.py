@@ -0,0 +1,340 @@
+"""
+EXPLAIN regression check for the hot queries, run against a seeded local
+database (tests/main.py seeds one through the API):
+
+    python -m tests.explain
+
+Every query helper in src/crud/queries runs once with sample values taken
+from the database while its SQL is captured, the inline endpoint queries
+run the same way. Each captured statement is EXPLAINed and the run fails
+when a plan scans a whole table without any usable index. Scans the
+optimizer picks over an existing index, normal on a small seed, are only
+reported.
+"""
+import asyncio
+import sys
+from datetime import timedelta
+
+from dotenv import load_dotenv
+load_dotenv()
+
+import pymysql
+from pymysql.cursors import DictCursor
+from sqlalchemy import event, select, and_, func
+
+from src.crud.engine import (
+    engine, replica_engine, host, port, user, password, db
+)
+from src.crud.models import (
+    BookingsRecord, SeatLocksRecord, CardsRecord, AccountsRecord
+)
+from src.crud.queries import (
+    accounts, bookings, clubs, films, ledger, roles, sales
+)
+from src.crud.queries import user as users
+from src.crud.queries.utils import all_selection
+from tests._logger import get_logger
+
+logger = get_logger("Explain")
+
+# lookup tables that stay tiny, a scan of them is fine
+SMALL_TABLES = {
+    "city", "permission", "role", "role_permission", "person_type", "hall"
+}
+# helpers that are meant to read a whole table
+FULL_READS = {
+    "select_all_films", "select_all_schedules", "select_role_catalog",
+    "select_permission_names", "select_auth_versions", "select_film_sales",
+    "select_user_directory",
+}
+
+
+def _connect():
+    return pymysql.connect(
+        host=host, port=port, user=user, password=password, database=db,
+        cursorclass=DictCursor
+    )
+
+
+def _fetch_samples(connection) -> dict:
+    queries = {
+        "booking": "SELECT * FROM booking LIMIT 1",
+        "user_account": "SELECT * FROM account "
+                        "WHERE entity_type = 'USER' LIMIT 1",
+        "club_account": "SELECT * FROM account "
+                        "WHERE entity_type = 'CLUB' LIMIT 1",
+        "card": "SELECT * FROM card LIMIT 1",
+        "user": "SELECT * FROM user LIMIT 1",
+        "club": "SELECT * FROM club LIMIT 1",
+        "city": "SELECT * FROM city LIMIT 1",
+        "film": "SELECT * FROM film LIMIT 1",
+        "film_image": "SELECT * FROM film_image LIMIT 1",
+        "schedule": "SELECT * FROM schedule LIMIT 1",
+        "hall": "SELECT * FROM hall LIMIT 1",
+        "person_type": "SELECT * FROM person_type LIMIT 1",
+        "role": "SELECT * FROM role LIMIT 1",
+    }
+    samples = {}
+    with connection.cursor() as cursor:
+        for name, query in queries.items():
+            cursor.execute(query)
+            row = cursor.fetchone()
+            if row is None:
+                raise SystemExit(f"Seed the database first, no {name} rows")
+            samples[name] = row
+    return samples
+
+
+def _helper_calls(s: dict) -> dict:
+    booking, card, club = s["booking"], s["card"], s["club"]
+    schedule, film = s["schedule"], s["film"]
+    user_account, club_account = s["user_account"], s["club_account"]
+    email = s["user"]["email"]
+
+    return {
+        # accounts
+        "select_card": lambda: accounts.select_card(card["card_id"]),
+        "check_user_card": lambda: accounts.check_user_card(
+            user_account["entity_id"], card["card_id"]
+        ),
+        "check_club_card": lambda: accounts.check_club_card(
+            club["leader"], card["card_id"]
+        ),
+        "select_half_account": lambda: accounts.select_half_account(
+            user_account["id"]
+        ),
+        "select_half_accounts": lambda: accounts.select_half_accounts(1, 25),
+        "select_last_entered_account":
+            lambda: accounts.select_last_entered_account(
+                user_account["name"], user_account["entity_id"], "USER"
+            ),
+        "select_club_accounts": lambda: accounts.select_club_accounts(
+            club["id"], 1, 25
+        ),
+        "select_account_from_card_id":
+            lambda: accounts.select_account_from_card_id(card["card_id"]),
+        "select_club_cards": lambda: accounts.select_club_cards(club["id"]),
+        "select_user_cards": lambda: accounts.select_user_cards(
+            user_account["entity_id"]
+        ),
+        # bookings
+        "select_person_type": lambda: bookings.select_person_type(
+            s["person_type"]["person_type"]
+        ),
+        "select_person_types": lambda: bookings.select_person_types(1, 25),
+        "select_booking": lambda: bookings.select_booking(booking["id"]),
+        "select_club_bookings": lambda: bookings.select_club_bookings(
+            1, 25, club_account["entity_id"]
+        ),
+        "select_user_bookings": lambda: bookings.select_user_bookings(
+            1, 25, user_account["entity_id"]
+        ),
+        "select_batches": lambda: bookings.select_batches(1, 25),
+        "get_details": lambda: bookings.get_details(
+            user_account["entity_id"], "USER", schedule["schedule_id"]
+        ),
+        "select_batch": lambda: bookings.select_batch(booking["batch_ref"]),
+        "select_account_report": lambda: bookings.select_account_report(
+            booking["account_id"]
+        ),
+        "select_seat_occupancy": lambda: bookings.select_seat_occupancy(
+            schedule["schedule_id"]
+        ),
+        "select_assigned_bookings": lambda: bookings.select_assigned_bookings(
+            booking["assigned_user"]
+        ),
+        # clubs
+        "select_leader_clubs": lambda: clubs.select_leader_clubs(
+            club["leader"]
+        ),
+        "select_city": lambda: clubs.select_city(s["city"]["city_name"]),
+        "select_city_by_id": lambda: clubs.select_city_by_id(
+            s["city"]["city_id"]
+        ),
+        "select_club_by_id": lambda: clubs.select_club_by_id(club["id"]),
+        "select_cities": lambda: clubs.select_cities(1, 25),
+        "select_club": lambda: clubs.select_club(club["club_name"]),
+        "select_clubs": lambda: clubs.select_clubs(1, 25),
+        "select_club_members": lambda: clubs.select_club_members(club["id"]),
+        "select_club_with_accounts": lambda: clubs.select_club_with_accounts(
+            club_account["id"]
+        ),
+        "is_club_rep": lambda: clubs.is_club_rep(email),
+        # films
+        "select_hall": lambda: films.select_hall(s["hall"]["hall_name"]),
+        "select_halls": lambda: films.select_halls(1, 25),
+        "select_film": lambda: films.select_film(film["title"]),
+        "select_film_by_id": lambda: films.select_film_by_id(film["film_id"]),
+        "select_films": lambda: films.select_films(1, 25),
+        "select_last_schedule": lambda: films.select_last_schedule(
+            schedule["show_time"], schedule["hall_id"]
+        ),
+        "select_images": lambda: films.select_images(
+            s["film_image"]["film_id"], s["film_image"]["batch"]
+        ),
+        "select_inserted_schedules": lambda: films.select_inserted_schedules(
+            schedule["film_id"], schedule["hall_id"], schedule["show_time"]
+        ),
+        "select_schedule": lambda: films.select_schedule(
+            schedule["schedule_id"]
+        ),
+        "select_schedules": lambda: films.select_schedules(1, 25),
+        "select_all_films": lambda: films.select_all_films(),
+        "select_all_schedules": lambda: films.select_all_schedules(),
+        "select_schedules_by_hall_id":
+            lambda: films.select_schedules_by_hall_id(schedule["hall_id"], 25),
+        "select_conflicting_schedules":
+            lambda: films.select_conflicting_schedules(
+                schedule["hall_id"], schedule["show_time"],
+                schedule["show_time"] + timedelta(hours=3)
+            ),
+        "select_hall_by_id": lambda: films.select_hall_by_id(
+            schedule["hall_id"]
+        ),
+        "select_films_by_ids": lambda: films.select_films_by_ids(
+            [film["film_id"]]
+        ),
+        "select_halls_by_ids": lambda: films.select_halls_by_ids(
+            [schedule["hall_id"]]
+        ),
+        "select_poster_images": lambda: films.select_poster_images(
+            film["film_id"]
+        ),
+        # ledger
+        "select_statement": lambda: ledger.select_statement(
+            user_account["id"], 1, 25
+        ),
+        # sales
+        "select_film_sales": lambda: sales.select_film_sales(),
+        "select_sales_rollups": lambda: sales.select_sales_rollups(
+            1, 25, film_id=film["film_id"]
+        ),
+        # roles
+        "select_role_catalog": lambda: roles.select_role_catalog(),
+        "get_user_role_data": lambda: roles.get_user_role_data(
+            email, s["role"]["role_name"]
+        ),
+        "select_permission_names": lambda: roles.select_permission_names(),
+        # users
+        "select_user_by_email": lambda: users.select_user_by_email(email),
+        "select_login": lambda: users.select_login(email),
+        "select_user_role_ids": lambda: users.select_user_role_ids(email),
+        "select_user_by_id": lambda: users.select_user_by_id(
+            s["user"]["user_id"]
+        ),
+        "select_users": lambda: users.select_users(1, 25),
+        "select_user_directory": lambda: users.select_user_directory(),
+        "select_auth_versions": lambda: users.select_auth_versions(),
+    }
+
+
+def _inline_calls(s: dict) -> dict:
+    """Queries the endpoints build themselves"""
+    booking = s["booking"]
+
+    def run(query):
+        return lambda: all_selection(query)
+
+    return {
+        "booked_seats": run(select(BookingsRecord).where(
+            BookingsRecord.schedule_id == booking["schedule_id"]
+        )),
+        "bookings_by_batch_ref": run(select(BookingsRecord).where(
+            BookingsRecord.batch_ref == booking["batch_ref"]
+        )),
+        "account_bookings": run(select(BookingsRecord).where(
+            BookingsRecord.account_id == booking["account_id"]
+        )),
+        "seat_lock": run(select(SeatLocksRecord).where(
+            and_(
+                SeatLocksRecord.seat == booking["seat_no"],
+                SeatLocksRecord.schedule_id == booking["schedule_id"],
+                SeatLocksRecord.is_manually_closed == False,
+                SeatLocksRecord.created_at >= func.now() -
+                timedelta(minutes=5)
+            )
+        )),
+        "account_cards": run(select(AccountsRecord, CardsRecord).join(
+            CardsRecord, CardsRecord.account_id == AccountsRecord.id
+        ).where(AccountsRecord.id == s["card"]["account_id"])),
+    }
+
+
+async def _capture(calls: dict) -> dict:
+    """Run every call, keeping the SQL each one sent"""
+    captured = {}
+    current = []
+
+    def listener(conn, cursor, statement, parameters, context, executemany):
+        current.append((statement, parameters))
+
+    engines = [x.sync_engine for x in (engine, replica_engine) if x]
+    for _engine in engines:
+        event.listen(_engine, "before_cursor_execute", listener)
+
+    try:
+        for name, call in calls.items():
+            current.clear()
+            try:
+                await call()
+            except Exception as e:
+                # the SQL was still sent, a sample without matches is fine
+                logger.warning(f"{name} raised {e!r}")
+            captured[name] = list(current)
+    finally:
+        for _engine in engines:
+            event.remove(_engine, "before_cursor_execute", listener)
+        await engine.dispose()
+        if replica_engine is not None:
+            await replica_engine.dispose()
+
+    return captured
+
+
+def _explain(connection, captured: dict) -> list:
+    failures = []
+    with connection.cursor() as cursor:
+        for name, statements in captured.items():
+            for statement, parameters in statements:
+                cursor.execute(f"EXPLAIN {statement}", parameters)
+                for row in cursor.fetchall():
+                    table = row["table"] or ""
+                    if row["type"] != "ALL" or table in SMALL_TABLES \
+                            or table.startswith("<"):
+                        continue
+
+                    if row["possible_keys"] is None \
+                            and name not in FULL_READS:
+                        failures.append((name, table, statement))
+                        logger.error(f"{name}: full scan of {table}")
+                    else:
+                        logger.warning(
+                            f"{name}: optimizer scans {table} "
+                            f"(rows={row['rows']})"
+                        )
+    return failures
+
+
+def main():
+    connection = _connect()
+    try:
+        samples = _fetch_samples(connection)
+        calls = _helper_calls(samples)
+        calls.update(_inline_calls(samples))
+
+        captured = asyncio.run(_capture(calls))
+        failures = _explain(connection, captured)
+    finally:
+        connection.close()
+
+    statements = sum(len(x) for x in captured.values())
+    logger.info(f"EXPLAINed {statements} statements from {len(calls)} calls")
+
+    if failures:
+        for name, table, statement in failures:
+            print(f"\n{name} scans {table}:\n{statement}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()